@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import threading
+
+# One deadline for the whole adapter fan-out of a request
+ADAPTER_DEADLINE_SECONDS = 9
+# Keep this much of the Lambda's remaining time for saving and responding
+DEADLINE_HEADROOM_MS = 1000
+# Threads for adapters that only have a synchronous implementation
+SYNC_ADAPTER_WORKERS = 8
+
+_local = threading.local()
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=SYNC_ADAPTER_WORKERS)
+
+
+def get_loop():
+    """
+    The calling thread's event loop, kept across invocations so pooled
+    connections stay open. Background refreshes run on their own thread and loop.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop
+
+
+def run(coro):
+    return get_loop().run_until_complete(coro)
+
+
+def request_deadline(context=None):
+    """Seconds the adapters may use, bounded by what is left of the invocation."""
+    deadline = ADAPTER_DEADLINE_SECONDS
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        remaining_ms = context.get_remaining_time_in_millis() - DEADLINE_HEADROOM_MS
+        deadline = max(0.1, min(deadline, remaining_ms / 1000))
+    return deadline
+
+
+def run_adapters(calls, ctx, timeout=ADAPTER_DEADLINE_SECONDS):
+    """
+    Run adapters concurrently on the event loop with a single deadline.
+
+    Args:
+        calls (dict): Name -> adapter taking the request context. Coroutine
+            functions run on the loop; plain functions go through a thread shim.
+        ctx (dict): Request context passed to every adapter
+        timeout (float): Overall deadline in seconds
+
+    Returns:
+        dict: Name -> result. Adapters that raised or missed the deadline map to
+            {"error": ...}; everything that completed in time is kept.
+    """
+    return run_calls({name: (func, ctx) for name, func in calls.items()}, timeout)
+
+
+def run_calls(calls, timeout=ADAPTER_DEADLINE_SECONDS):
+    """
+    Like run_adapters, but each call brings its own context.
+
+    Used to fetch several cells in one fan-out: calls maps any hashable name,
+    e.g. (h3_cell, source), to an (adapter, ctx) pair, or (adapter, ctx,
+    timeout) to also bound that call on its own within the overall deadline.
+    """
+    return run(gather_with_deadline(calls, timeout))
+
+
+async def gather_with_deadline(calls, timeout):
+    tasks = {name: asyncio.ensure_future(_call(name, *call)) for name, call in calls.items()}
+    if not tasks:
+        return {}
+
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        # Let cancelled requests unwind so their connections go back to the pool
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = {}
+    for name, task in tasks.items():
+        if task in done:
+            results[name] = task.result()
+        else:
+            print(f"[WARNING] {name} timed out after {timeout}s")
+            results[name] = {"error": "Request timed out"}
+    return results
+
+
+async def _call(name, func, ctx, timeout=None):
+    try:
+        if asyncio.iscoroutinefunction(func):
+            return await asyncio.wait_for(func(ctx), timeout)
+        # Compatibility shim for synchronous adapters. The thread cannot be
+        # cancelled, but the request stops waiting for it at the deadline.
+        return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(_executor, func, ctx), timeout)
+    except asyncio.TimeoutError:
+        print(f"[WARNING] {name} timed out after {timeout}s")
+        return {"error": "Request timed out"}
+    except Exception as e:
+        print(f"[ERROR] {name} failed: {e}")
+        return {"error": str(e)}
@@ -0,0 +1,107 @@
+import importlib
+import threading
+
+# One entry per section of a cell record:
+#   fetcher      "module:function", imported on first use. The HTTP stack, the
+#                geocoder and their dependencies are only needed when a section
+#                is actually fetched, so a container that answers from cache
+#                never loads them.
+#   version      bump when the adapter's output changes. Every stored section
+#                records the version that produced it, so a bump re-fetches
+#                only that section (on the next access or scheduler run); the
+#                rest of the record stays valid.
+#   ttl_seconds  freshness; None means the caller's tier TTL
+#   timeout      seconds one call may take, within the request deadline
+#   depends_on   sections this one is computed from; it is refreshed whenever
+#                one of them is
+ADAPTERS = {
+    "air_quality": {
+        "fetcher": "adapters.openweather:get_air_quality_async",
+        "version": 1,
+        "ttl_seconds": None,
+        "timeout": 6,
+        "depends_on": ()
+    },
+    "tap_water": {
+        "fetcher": "adapters.tapwater:is_tap_water_safe",  # sync: offline index, shared geocode lookup as fallback
+        "version": 1,
+        "ttl_seconds": 30 * 86400,  # static country list, effectively immutable
+        "timeout": 6,
+        "depends_on": ()
+    },
+    "uv": {
+        "fetcher": "adapters.uv:get_uv_index_async",
+        "version": 3,  # history and forecast data for an accurate daylight peak
+        "ttl_seconds": None,
+        "timeout": 6,
+        "depends_on": ()
+    },
+    "weather": {
+        "fetcher": "adapters.weather:get_weather_async",
+        "version": 1,
+        "ttl_seconds": None,
+        "timeout": 6,
+        "depends_on": ()
+    },
+    "pollen": {
+        "fetcher": "adapters.pollen:get_pollen_async",
+        "version": 1,
+        "ttl_seconds": 3600,  # upstream data is hourly
+        "timeout": 6,
+        "depends_on": ()
+    }
+}
+# Sections stored before they carried their own version were written by these
+# adapter versions (record data version 3)
+UNVERSIONED_SECTIONS = {"uv": 3}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def adapter_versions():
+    """Section name -> current adapter version"""
+    return {name: adapter["version"] for name, adapter in ADAPTERS.items()}
+
+
+def section_version(name, meta):
+    """Adapter version that wrote a stored section, from its `sources` entry"""
+    return meta.get("version", UNVERSIONED_SECTIONS.get(name, 1))
+
+
+def is_current(name, meta):
+    """True if a stored section was written by the current adapter version"""
+    return section_version(name, meta) == ADAPTERS[name]["version"]
+
+
+def with_dependents(names):
+    """`names` plus every section that depends on one of them, in registry order"""
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for name, adapter in ADAPTERS.items():
+            if name not in selected and selected.intersection(adapter["depends_on"]):
+                selected.add(name)
+                changed = True
+    return [name for name in ADAPTERS if name in selected]
+
+
+def load_adapter(spec):
+    """
+    Resolve an adapter spec to its function, importing the module once.
+
+    Args:
+        spec (str): "package.module:function", e.g. "adapters.uv:get_uv_index_async"
+
+    Returns:
+        callable: The adapter function
+    """
+    func = _loaded.get(spec)
+    if func is None:
+        with _lock:
+            func = _loaded.get(spec)
+            if func is None:
+                module, _, name = spec.partition(":")
+                func = _loaded[spec] = getattr(importlib.import_module(module), name)
+    return func
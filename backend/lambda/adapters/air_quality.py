@@ -1,11 +1,13 @@
-import requests
+from adapters.http_client import sync_get
+
+PROVIDER = "openaq"
 
 def get_air_quality(lat, lon):
     print(f"Calling OpenAQ API for coordinates: lat={lat}, lon={lon}")
 
     try:
         url = f"https://api.openaq.org/v2/latest?coordinates={lat},{lon}&radius=5000"
-        response = requests.get(url)
+        response = sync_get(PROVIDER, url)
         print(f"API status code: {response.status_code}")
 
         response.raise_for_status()
@@ -0,0 +1,118 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import h3
+
+# Precomputed H3 -> country index built by scripts/build_country_index.py.
+#
+# File layout (little endian):
+#   header  16 bytes: magic "H3CI", format version (u16), reserved (u16),
+#                     record count (u32), byte offset of the name table (u32)
+#   cells   record count * u64, sorted compacted H3 cells (resolution <= 6)
+#   codes   record count * u16, index into the name table for each cell
+#   names   UTF-8 JSON list of country names
+#
+# Cells along land borders are left out on purpose so they fall back to the
+# reverse geocoding API instead of guessing.
+INDEX_PATH = os.environ.get(
+    "COUNTRY_INDEX_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "h3_country_index.bin")
+)
+INDEX_RESOLUTION = 6
+MAGIC = b"H3CI"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+
+_index = None
+
+
+class CountryIndex:
+    """Memory-mapped, read-only view of a country index file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, names_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported country index format in {path}")
+
+        view = memoryview(self._mmap)
+        cells_end = HEADER.size + count * 8
+        self._cells = view[HEADER.size:cells_end].cast("Q")
+        self._codes = view[cells_end:cells_end + count * 2].cast("H")
+        self.names = json.loads(bytes(view[names_offset:]).decode("utf-8"))
+
+    def __len__(self):
+        return len(self._cells)
+
+    def lookup(self, h3_cell):
+        """
+        Return the country name for a cell at resolution 6 or finer, or None.
+
+        The cell and each of its coarser parents are looked up in the sorted
+        array, so compacted entries at any resolution are found.
+        """
+        resolution = h3.get_resolution(h3_cell)
+        if resolution > INDEX_RESOLUTION:
+            h3_cell = h3.cell_to_parent(h3_cell, INDEX_RESOLUTION)
+            resolution = INDEX_RESOLUTION
+
+        for res in range(resolution, -1, -1):
+            candidate = h3.str_to_int(h3.cell_to_parent(h3_cell, res) if res < resolution else h3_cell)
+            i = bisect.bisect_left(self._cells, candidate)
+            if i < len(self._cells) and self._cells[i] == candidate:
+                return self.names[self._codes[i]]
+        return None
+
+
+def write_index(path, cells_by_country):
+    """
+    Write an index file.
+
+    Args:
+        path (str): Output file
+        cells_by_country (dict): Country name -> iterable of (compacted) H3 cells,
+            as strings or integers
+    """
+    names = sorted(cells_by_country)
+    records = sorted(
+        (h3.str_to_int(cell) if isinstance(cell, str) else cell, code)
+        for code, name in enumerate(names)
+        for cell in cells_by_country[name]
+    )
+    names_blob = json.dumps(names).encode("utf-8")
+    names_offset = HEADER.size + len(records) * 10
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(records), names_offset))
+        f.write(struct.pack(f"<{len(records)}Q", *(cell for cell, _ in records)))
+        f.write(struct.pack(f"<{len(records)}H", *(code for _, code in records)))
+        f.write(names_blob)
+
+
+def get_index():
+    """Load the bundled index once per container; None if it is not deployed."""
+    global _index
+    if _index is None and os.path.exists(INDEX_PATH):
+        try:
+            _index = CountryIndex(INDEX_PATH)
+            print(f"[INFO] Loaded country index with {len(_index)} cells from {INDEX_PATH}")
+        except Exception as e:
+            print(f"[ERROR] Failed to load country index {INDEX_PATH}: {e}")
+            _index = False
+    return _index or None
+
+
+def lookup_country(h3_cell):
+    """Country name for an H3 cell from the offline index, or None if unresolved."""
+    index = get_index()
+    if index is None or not h3_cell:
+        return None
+    try:
+        return index.lookup(h3_cell)
+    except Exception as e:
+        print(f"[ERROR] Country index lookup failed for {h3_cell}: {e}")
+        return None
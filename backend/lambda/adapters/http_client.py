@@ -0,0 +1,182 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from circuit_breaker import get_breaker
+
+# Connection pool, timeout and retry settings per upstream provider. Every
+# provider gets its own keep-alive pool, created once per warm container, so
+# requests to the same host within and across invocations skip the TCP/TLS
+# handshake. `timeout` (seconds) applies to each request unless the caller
+# passes its own.
+PROVIDERS = {
+    "openweather": {  # air quality and weather share this host
+        "pool_maxsize": 8,
+        "timeout": 5,
+        "retries": 2,
+        "backoff_factor": 0.2,
+        "status_forcelist": (500, 502, 503, 504)
+    },
+    "opencage": {  # quota limited, never retry 402/429
+        "pool_maxsize": 4,
+        "timeout": 5,
+        "retries": 1,
+        "backoff_factor": 0.5,
+        "status_forcelist": (500, 502, 503, 504)
+    },
+    "currentuvindex": {
+        "pool_maxsize": 4,
+        "timeout": 5,
+        "retries": 2,
+        "backoff_factor": 0.2,
+        "status_forcelist": (429, 500, 502, 503, 504)
+    },
+    "open-meteo": {
+        "pool_maxsize": 4,
+        "timeout": 5,
+        "retries": 2,
+        "backoff_factor": 0.2,
+        "status_forcelist": (429, 500, 502, 503, 504)
+    }
+}
+DEFAULT_PROVIDER = {
+    "pool_maxsize": 4,
+    "timeout": 5,
+    "retries": 1,
+    "backoff_factor": 0.2,
+    "status_forcelist": (500, 502, 503, 504)
+}
+
+# Requests in flight per quota limited upstream, across all threads of a
+# container. The slot is held around the HTTP request itself, so a caller that
+# stopped waiting at its deadline still counts until its request finishes.
+# Both providers are only called synchronously.
+PROVIDER_CONCURRENCY = {
+    "openai": int(os.environ.get("SCHEDULER_OPENAI_CONCURRENCY", "4")),
+    "opencage": 2  # free tier allows 1 request/second
+}
+
+_provider_semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in PROVIDER_CONCURRENCY.items()}
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Async clients are bound to the event loop they were opened on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def provider_config(provider):
+    return PROVIDERS.get(provider, DEFAULT_PROVIDER)
+
+
+def get_session(provider):
+    """Return the pooled requests session for an upstream provider."""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            config = provider_config(provider)
+            retry = Retry(
+                total=config["retries"],
+                backoff_factor=config["backoff_factor"],
+                status_forcelist=config["status_forcelist"],
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config["pool_maxsize"], max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+    return session
+
+
+def get_async_client(provider):
+    """Return the async HTTP client for a provider on the running event loop."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(provider)
+    if client is None:
+        config = provider_config(provider)
+        limits = httpx.Limits(
+            max_connections=config["pool_maxsize"],
+            max_keepalive_connections=config["pool_maxsize"]
+        )
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(limits=limits, retries=config["retries"]),
+            follow_redirects=True
+        )
+        clients[provider] = client
+    return client
+
+
+@contextmanager
+def provider_slot(provider):
+    """Bound concurrent calls to a slow or quota limited upstream."""
+    semaphore = _provider_semaphores.get(provider)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def is_healthy(response):
+    """Whether a response counts as a success for the provider's circuit breaker"""
+    return response.status_code < 500 and response.status_code != 429
+
+
+def sync_get(provider, url, **kwargs):
+    """
+    GET through the provider's pooled session, guarded by its circuit breaker
+    and holding one of its PROVIDER_CONCURRENCY slots.
+
+    Raises CircuitOpenError without a request while the breaker is open.
+    """
+    kwargs.setdefault("timeout", provider_config(provider)["timeout"])
+    breaker = get_breaker(provider)
+    breaker.allow()
+    with provider_slot(provider):
+        started, ok = time.monotonic(), False
+        try:
+            response = get_session(provider).get(url, **kwargs)
+            ok = is_healthy(response)
+            return response
+        finally:
+            breaker.record(ok, time.monotonic() - started)
+
+
+async def async_get(provider, url, **kwargs):
+    """
+    GET through the provider's async client with its retry/backoff policy.
+
+    The transport retries failed connections; responses with a retryable
+    status are retried here with exponential backoff. Cancellation (the
+    engine's request deadline) interrupts the backoff immediately. The whole
+    exchange counts as one call for the provider's circuit breaker, and
+    CircuitOpenError is raised without a request while it is open.
+    """
+    config = provider_config(provider)
+    kwargs.setdefault("timeout", config["timeout"])
+    breaker = get_breaker(provider)
+    breaker.allow()
+    started, ok = time.monotonic(), False
+    try:
+        client = get_async_client(provider)
+        for attempt in range(config["retries"] + 1):
+            response = await client.get(url, **kwargs)
+            if response.status_code not in config["status_forcelist"] or attempt == config["retries"]:
+                break
+            await asyncio.sleep(config["backoff_factor"] * (2 ** attempt))
+        ok = is_healthy(response)
+        return response
+    finally:
+        # Timeouts and cancellation by the request deadline count as failures
+        breaker.record(ok, time.monotonic() - started)
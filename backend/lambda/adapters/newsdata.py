@@ -1,8 +1,11 @@
+import json
 import os
 from datetime import datetime, timedelta
 from adapters.openai_service import OpenAIService
 
 API_KEY = os.getenv("OPENAI_API_KEY")
+# A request for several locations returns more tokens than the 10 second default allows
+BATCH_TIMEOUT_SECONDS = 30
 
 def is_recent_news(pub_date_str):
     """Check if the news article is from the past year."""
@@ -31,6 +34,20 @@ def is_recent_news(pub_date_str):
     except Exception:
         return False
 
+def recent_articles(articles):
+    """Articles of an OpenAI response in our shape, without those older than a year."""
+    return [
+        {
+            "title": article.get("title", "No title"),
+            "description": article.get("description", "No description"),
+            "source": article.get("source", "Unknown"),
+            "link": article.get("link", ""),
+            "pub_date": article.get("pub_date", "")
+        }
+        for article in articles
+        if isinstance(article, dict) and is_recent_news(article.get("pub_date"))
+    ]
+
 def fetch_local_health_news(lat, lon, location_name=None, language="en"):
     if not API_KEY:
         raise RuntimeError("Missing OPENAI_API_KEY")
@@ -82,23 +99,10 @@ The pub_date should be in ISO format (YYYY-MM-DD) or a clear date format."""
                 "articles": []
             }
 
-        # Filter out old news
-        recent_articles = [
-            {
-                "title": article.get("title", "No title"),
-                "description": article.get("description", "No description"),
-                "source": article.get("source", "Unknown"),
-                "link": article.get("link", ""),
-                "pub_date": article.get("pub_date", "")
-            }
-            for article in articles
-            if is_recent_news(article.get("pub_date"))
-        ]
-
         return {
             "source": "openai",
             "fetched_at": datetime.utcnow().isoformat(),
-            "articles": recent_articles
+            "articles": recent_articles(articles)
         }
 
     except Exception as e:
@@ -107,4 +111,68 @@ The pub_date should be in ISO format (YYYY-MM-DD) or a clear date format."""
             "source": "openai",
             "error": str(e),
             "articles": []
-        }
\ No newline at end of file
+        }
+
+def fetch_health_news_batch(locations, language="en", service=None):
+    """
+    Fetch health news for several locations with one structured OpenAI request.
+
+    Each location gets an id in the prompt; the answer is split back by id and
+    every article set goes through the same recency filter as a single fetch.
+
+    Args:
+        locations (list): Location names, e.g. "Helsinki, Finland"
+        language (str): Language of the articles
+        service (OpenAIService, optional): Service to use, e.g. with a fake client
+
+    Returns:
+        dict: location -> news dict shaped like `fetch_local_health_news`;
+            locations missing from the answer get an error entry
+    """
+    if not locations:
+        return {}
+    ids = {f"loc{i}": location for i, location in enumerate(locations)}
+
+    prompt = f"""For each location below, find the 3 most recent and relevant news items related to health and environmental risks there.
+For each news item, provide:
+- A clear title
+- A brief description
+- The source (if known)
+- The date (if known)
+
+Format the response as a JSON object with a 'locations' array. Each element has the 'id' of the location
+and an 'articles' array containing its news items. Include every id, with an empty array when there are no
+recent relevant news items. Only include news from the past year, written in language '{language}'.
+Focus on local health risks, environmental issues, and public health concerns.
+
+Locations (JSON):
+{json.dumps([{"id": id, "location": location} for id, location in ids.items()])}"""
+
+    system_message = """You are a helpful assistant that provides current news about health and environmental risks.
+Format your response as a JSON object with a 'locations' array; each element has an 'id' and an 'articles' array.
+Each news item should have: title, description, source, link, and pub_date fields.
+The pub_date should be in ISO format (YYYY-MM-DD) or a clear date format."""
+
+    try:
+        service = service or OpenAIService(timeout=BATCH_TIMEOUT_SECONDS)
+        response = service.get_structured_completion(prompt, system_message)
+    except Exception as e:
+        print(f"[ERROR] OpenAI batch news fetch failed for {len(locations)} locations: {e}")
+        return {location: {"source": "openai", "error": str(e), "articles": []} for location in locations}
+
+    entries = response.get("locations") if isinstance(response, dict) else None
+    by_id = {
+        entry.get("id"): entry
+        for entry in (entries if isinstance(entries, list) else [])
+        if isinstance(entry, dict)
+    }
+    fetched_at = datetime.utcnow().isoformat()
+    results = {}
+    for id, location in ids.items():
+        articles = (by_id.get(id) or {}).get("articles")
+        if not isinstance(articles, list):
+            print(f"[ERROR] No articles for {location} in batch response")
+            results[location] = {"source": "openai", "error": "Missing from batch response", "articles": []}
+            continue
+        results[location] = {"source": "openai", "fetched_at": fetched_at, "articles": recent_articles(articles)}
+    return results
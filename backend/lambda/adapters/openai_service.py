@@ -1,14 +1,23 @@
 import os
-import openai
 import json
 from datetime import datetime
 
 class OpenAIService:
-    def __init__(self):
+    def __init__(self, client=None, timeout=10.0):
+        """
+        Args:
+            client (optional): An OpenAI-compatible client, e.g. `FakeOpenAIClient`
+                for offline runs; by default one is created from OPENAI_API_KEY
+            timeout (float): Request timeout in seconds
+        """
         self.api_key = os.getenv("OPENAI_API_KEY")
+        if client is not None:
+            self.client = client
+            return
         if not self.api_key:
             raise RuntimeError("Missing OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=self.api_key, timeout=10.0)  # 10 second timeout
+        import openai  # heavy (~0.7 s); only processes that call OpenAI load it
+        self.client = openai.OpenAI(api_key=self.api_key, timeout=timeout)
 
     def get_completion(self, prompt, system_message=None, model="gpt-4-turbo-preview", response_format=None):
         """
@@ -1,13 +1,20 @@
 import os
-import requests
+from adapters.http_client import sync_get
 
 OPENCAGE_KEY = os.getenv("OPENCAGE_API_KEY")
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
+PROVIDER = "opencage"
 
-def reverse_geocode(lat, lon):
+def fetch_components(lat, lon):
+    """
+    Reverse geocode a point and return the OpenCage address components.
+
+    Returns an empty dict when OpenCage has no result for the point (e.g. open
+    sea). Raises on missing configuration or request failures.
+    """
     if not OPENCAGE_KEY:
         raise RuntimeError("Missing OPENCAGE_API_KEY")
 
-    url = "https://api.opencagedata.com/geocode/v1/json"
     params = {
         "key": OPENCAGE_KEY,
         "q": f"{lat},{lon}",
@@ -15,21 +22,27 @@ def reverse_geocode(lat, lon):
         "language": "en"
     }
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        results = response.json().get("results", [])
-        if not results:
-            return "Unknown Location"
+    response = sync_get(PROVIDER, OPENCAGE_URL, params=params)
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    if not results:
+        return {}
+    return results[0].get("components", {})
 
-        components = results[0].get("components", {})
-        city = components.get("city") or components.get("town") or components.get("village") or components.get("municipality")
-        country = components.get("country")
-        if city and country:
-            return f"{city}, {country}"
-        elif country:
-            return country
-        return "Unknown Location"
+def format_location(components):
+    """Human readable "City, Country" name from address components."""
+    components = components or {}
+    city = components.get("city") or components.get("town") or components.get("village") or components.get("municipality")
+    country = components.get("country")
+    if city and country:
+        return f"{city}, {country}"
+    elif country:
+        return country
+    return "Unknown Location"
+
+def reverse_geocode(lat, lon):
+    try:
+        return format_location(fetch_components(lat, lon))
     except Exception as e:
         print(f"[ERROR] OpenCage reverse geocoding failed for {lat},{lon}: {e}")
-        return "Unknown Location"
\ No newline at end of file
+        return "Unknown Location"
@@ -1,5 +1,6 @@
-import os
-import requests
+import h3
+from adapters.country_index import lookup_country, INDEX_RESOLUTION
+from geocode_service import get_place
 
 SAFE_COUNTRIES = {
     "Andorra", "Australia", "Austria", "Belgium", "Canada", "Chile", "Croatia",
@@ -10,28 +11,25 @@ SAFE_COUNTRIES = {
     "Sweden", "Switzerland", "United Kingdom", "United States", "South Korea"
 }
 
-OPENCAGE_API_KEY = os.getenv("OPENCAGE_API_KEY")
-OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
-REQUEST_TIMEOUT = 5  # 5 seconds timeout
-
 def is_tap_water_safe(ctx):
     lat, lon = ctx["lat"], ctx["lon"]
 
-    if not OPENCAGE_API_KEY:
-        raise RuntimeError("Missing OPENCAGE_API_KEY")
-
-    params = {
-        "q": f"{lat},{lon}",
-        "key": OPENCAGE_API_KEY,
-        "no_annotations": 1,
-        "language": "en"
-    }
+    # Most cells resolve from the offline index without a network call;
+    # only cells along land borders need the reverse geocoding API
+    h3_cell = ctx.get("h3_cell") or h3.latlng_to_cell(lat, lon, INDEX_RESOLUTION)
+    country = lookup_country(h3_cell)
+    if country:
+        return {
+            "source": "country-index+custom",
+            "country": country,
+            "is_safe": country in SAFE_COUNTRIES
+        }
 
     try:
-        response = requests.get(OPENCAGE_URL, params=params, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        data = response.json()
-        components = data["results"][0]["components"]
+        # Shared with the location lookup of the same request and cached per cell
+        components = get_place(h3_cell, lat, lon)
+        if not components:
+            raise RuntimeError("No reverse geocoding result")
         country = components.get("country", "Unknown")
         
         # Debug logging
@@ -50,5 +48,6 @@ def is_tap_water_safe(ctx):
         return {
             "source": "opencage+custom",
             "country": "Unknown",
-            "is_safe": None
+            "is_safe": None,
+            "error": str(e)
         }
@@ -1,59 +1,75 @@
 import os
-import requests
+from adapters.http_client import sync_get, async_get
 
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 CURRENT_WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
-REQUEST_TIMEOUT = 5  # 5 seconds timeout
-
-def get_weather(ctx):
-    lat, lon = ctx["lat"], ctx["lon"]
+PROVIDER = "openweather"
 
+def _params(lat, lon):
     if not API_KEY:
         raise RuntimeError("Missing OPENWEATHER_API_KEY")
 
-    params = {
+    return {
         "lat": lat,
         "lon": lon,
         "appid": API_KEY,
         "units": "metric"  # Use metric units for temperature
     }
 
+def parse_weather(data):
+    main = data.get("main", {})
+    weather = data.get("weather", [{}])[0] if data.get("weather") else {}
+    wind = data.get("wind", {})
+    clouds = data.get("clouds", {})
+    sys = data.get("sys", {})
+
+    return {
+        "source": "openweathermap",
+        "temperature": {
+            "current": main.get("temp"),
+            "feels_like": main.get("feels_like"),
+            "min": main.get("temp_min"),
+            "max": main.get("temp_max")
+        },
+        "humidity": main.get("humidity"),
+        "pressure": main.get("pressure"),
+        "wind": {
+            "speed": wind.get("speed"),
+            "direction": wind.get("deg")
+        },
+        "weather": {
+            "description": weather.get("description"),
+            "icon": weather.get("icon"),
+            "main": weather.get("main")
+        },
+        "clouds": clouds.get("all"),
+        "visibility": data.get("visibility"),
+        "sunrise": sys.get("sunrise"),
+        "sunset": sys.get("sunset"),
+        "timestamp": data.get("dt")
+    }
+
+def get_weather(ctx):
+    lat, lon = ctx["lat"], ctx["lon"]
+    params = _params(lat, lon)
+
     try:
-        response = requests.get(CURRENT_WEATHER_URL, params=params, timeout=REQUEST_TIMEOUT)
+        response = sync_get(PROVIDER, CURRENT_WEATHER_URL, params=params)
         response.raise_for_status()
-        data = response.json()
-        
-        main = data.get("main", {})
-        weather = data.get("weather", [{}])[0] if data.get("weather") else {}
-        wind = data.get("wind", {})
-        clouds = data.get("clouds", {})
-        sys = data.get("sys", {})
+        return parse_weather(response.json())
 
-        return {
-            "source": "openweathermap",
-            "temperature": {
-                "current": main.get("temp"),
-                "feels_like": main.get("feels_like"),
-                "min": main.get("temp_min"),
-                "max": main.get("temp_max")
-            },
-            "humidity": main.get("humidity"),
-            "pressure": main.get("pressure"),
-            "wind": {
-                "speed": wind.get("speed"),
-                "direction": wind.get("deg")
-            },
-            "weather": {
-                "description": weather.get("description"),
-                "icon": weather.get("icon"),
-                "main": weather.get("main")
-            },
-            "clouds": clouds.get("all"),
-            "visibility": data.get("visibility"),
-            "sunrise": sys.get("sunrise"),
-            "sunset": sys.get("sunset"),
-            "timestamp": data.get("dt")
-        }
+    except Exception as e:
+        print(f"[ERROR] Weather adapter failed for {lat}, {lon}: {e}")
+        return None
+
+async def get_weather_async(ctx):
+    lat, lon = ctx["lat"], ctx["lon"]
+    params = _params(lat, lon)
+
+    try:
+        response = await async_get(PROVIDER, CURRENT_WEATHER_URL, params=params)
+        response.raise_for_status()
+        return parse_weather(response.json())
 
     except Exception as e:
         print(f"[ERROR] Weather adapter failed for {lat}, {lon}: {e}")
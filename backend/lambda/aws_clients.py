@@ -0,0 +1,38 @@
+import threading
+
+# One boto3 client per service, shared by every module (boto3 clients are
+# thread-safe). boto3 is imported and the client built on first use, so
+# loading the handler does not pay for them, and a container pays once
+# instead of once per module that talks to S3.
+_clients = {}
+_lock = threading.Lock()
+
+
+def client(service):
+    """The container's boto3 client for `service`, created on first call."""
+    found = _clients.get(service)
+    if found is None:
+        with _lock:
+            found = _clients.get(service)
+            if found is None:
+                import boto3
+                found = _clients[service] = boto3.client(service)
+    return found
+
+
+def s3_client():
+    return client("s3")
+
+
+# botocore is only loaded with the first client, so errors are recognized by
+# the `response` dict every botocore ClientError carries instead of by class
+def error_code(error):
+    """S3 error code of a botocore ClientError, None for any other exception."""
+    response = getattr(error, "response", None)
+    return (response.get("Error") or {}).get("Code") if isinstance(response, dict) else None
+
+
+def http_status(error):
+    """HTTP status of a botocore ClientError, None for any other exception."""
+    response = getattr(error, "response", None)
+    return (response.get("ResponseMetadata") or {}).get("HTTPStatusCode") if isinstance(response, dict) else None
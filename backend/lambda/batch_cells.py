@@ -0,0 +1,69 @@
+import h3
+from validators import validate_coordinates, validate_h3_cell
+
+H3_RESOLUTION = 6
+# Upper bound on cells per batch request; k=3 around a center is 37 cells
+BATCH_MAX_CELLS = 50
+BATCH_MAX_K = 3
+
+
+def is_batch_request(params):
+    return any(name in params for name in ("h3_ids", "bbox", "k"))
+
+
+def select_cells(params):
+    """
+    Resolve the cells of a batch request from its query parameters.
+
+    Exactly one selection is used, in this order:
+        h3_ids  comma-separated resolution 6 cells
+        bbox    "min_lat,min_lon,max_lat,max_lon"; cells whose center is inside
+        k       with lat/lon, the center cell and its neighbors up to k rings out
+
+    Returns:
+        tuple: (cells, error) with cells de-duplicated in request order, or
+            (None, error message)
+    """
+    if "h3_ids" in params:
+        cells = [cell.strip() for cell in params["h3_ids"].split(",") if cell.strip()]
+        if not cells:
+            return None, "h3_ids must list at least one cell"
+        for cell in cells:
+            is_valid, error = validate_h3_cell(cell)
+            if not is_valid:
+                return None, f"{error}: {cell}"
+    elif "bbox" in params:
+        try:
+            min_lat, min_lon, max_lat, max_lon = (float(v) for v in params["bbox"].split(","))
+        except ValueError:
+            return None, "bbox must be min_lat,min_lon,max_lat,max_lon"
+        for lat, lon in ((min_lat, min_lon), (max_lat, max_lon)):
+            is_valid, error = validate_coordinates(lat, lon)
+            if not is_valid:
+                return None, error
+        if min_lat > max_lat or min_lon > max_lon:
+            return None, "bbox minimum must not exceed its maximum"
+        polygon = h3.LatLngPoly([(min_lat, min_lon), (min_lat, max_lon), (max_lat, max_lon), (max_lat, min_lon)])
+        cells = sorted(h3.h3shape_to_cells(polygon, H3_RESOLUTION))
+        if not cells:
+            # A box smaller than a cell still covers the cell at its center
+            cells = [h3.latlng_to_cell((min_lat + max_lat) / 2, (min_lon + max_lon) / 2, H3_RESOLUTION)]
+    else:
+        try:
+            lat, lon, k = float(params["lat"]), float(params["lon"]), int(params["k"])
+        except KeyError:
+            return None, "k requires lat and lon"
+        except ValueError:
+            return None, "Invalid lat, lon or k format"
+        is_valid, error = validate_coordinates(lat, lon)
+        if not is_valid:
+            return None, error
+        if not 0 <= k <= BATCH_MAX_K:
+            return None, f"k must be between 0 and {BATCH_MAX_K}"
+        center = h3.latlng_to_cell(lat, lon, H3_RESOLUTION)
+        cells = [center] + sorted(set(h3.grid_disk(center, k)) - {center})
+
+    cells = list(dict.fromkeys(cells))
+    if len(cells) > BATCH_MAX_CELLS:
+        return None, f"Batch covers {len(cells)} cells, at most {BATCH_MAX_CELLS} are allowed"
+    return cells, None
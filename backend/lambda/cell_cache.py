@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Upper bounds for the per-container cell cache. Sizes are measured as the
+# serialized JSON length of a record, which is a cheap proxy for its footprint.
+CELL_CACHE_MAX_ENTRIES = int(os.environ.get("CELL_CACHE_MAX_ENTRIES", "2000"))
+CELL_CACHE_MAX_BYTES = int(os.environ.get("CELL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class CellCache:
+    """
+    Bounded in-memory LRU cache of decoded cell records.
+
+    Each entry expires `ttl_seconds` after the record's own `last_updated`
+    timestamp, so a record never outlives the freshness window it was
+    written with. Callers with a stricter TTL (premium tier) pass `max_age`
+    to `get` and see a miss without evicting the entry for everyone else.
+    """
+
+    def __init__(self, max_entries=CELL_CACHE_MAX_ENTRIES, max_bytes=CELL_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (record, size, expires_at, etag, payload)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, max_age=None):
+        """
+        Return the cached record for `key`, or None on a miss.
+
+        Args:
+            key (str): Storage key of the cell
+            max_age (int, optional): Maximum accepted age of the record in seconds
+
+        Returns:
+            dict: The cached record (shared, callers must copy before mutating)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            record, size, expires_at, _, _ = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if max_age is not None and now - _last_updated(record) > max_age:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return record
+
+    def peek(self, key):
+        """
+        Return (record, etag) of an unexpired entry regardless of the caller's TTL.
+
+        Used to revalidate a local copy with a conditional GET. Does not touch
+        counters or recency.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                return None, None
+            return entry[0], entry[3]
+
+    def put(self, key, record, size, ttl_seconds, etag=None, payload=None):
+        """
+        Store a decoded record, evicting least recently used entries to stay within bounds.
+
+        `payload`, the record's serialized JSON if the caller has it, is kept
+        for responses that splice it instead of encoding the record again.
+        """
+        expires_at = _last_updated(record) + ttl_seconds
+        if payload is not None:
+            size += len(payload)
+        if expires_at <= time.time() or size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (record, size, expires_at, etag, payload)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def payload(self, key, record, serialize):
+        """
+        The serialized JSON of a cached record, computed at most once per entry.
+
+        Args:
+            key (str): Storage key of the cell
+            record (dict): The record as returned by `get`
+            serialize (callable): record -> JSON bytes, used when no payload is kept
+
+        Returns:
+            bytes: The payload; not kept when `record` is not the cached entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is record and entry[4] is not None:
+                return entry[4]
+        payload = serialize(record)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is record and entry[4] is None:
+                self._entries[key] = (record, entry[1] + len(payload), entry[2], entry[3], payload)
+                self._bytes += len(payload)
+        return payload
+
+    def invalidate(self, key):
+        """Drop a single entry, e.g. after a forced refresh."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters reported in the `cache_status` block of responses."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+    def _remove(self, key):
+        size = self._entries.pop(key)[1]
+        self._bytes -= size
+
+
+def _last_updated(record):
+    try:
+        return int(record.get("last_updated") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# Module-level instance shared by all invocations served by a warm container
+cell_cache = CellCache()
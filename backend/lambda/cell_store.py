@@ -0,0 +1,167 @@
+import os
+from aws_clients import error_code, http_status, s3_client
+from freshness_manifest import record_write
+from record_codec import decode_record_payload, encode_record
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+# Per-response fields the handler adds to a record; never stored
+TRANSIENT_KEYS = ("rate_limit", "cache_status")
+
+
+def cell_key(h3_cell):
+    return f"cells/{h3_cell}.json"
+
+
+def build_metadata(record):
+    """
+    Object metadata written next to every cell record.
+
+    These values let readers decide freshness from a HEAD request instead of
+    downloading and decoding the whole body. S3 metadata values must be strings.
+    """
+    news = record.get("news") or {}
+    return {
+        "last_updated": str(record.get("last_updated", "")),
+        "data_version": str(record.get("version", "")),
+        "news_fetched_at": news.get("fetched_at") or "",
+        "source_fetched_at": encode_sources(record.get("sources") or {})
+    }
+
+
+def encode_sources(sources):
+    """
+    Pack per-section fetch times as `name:fetched_at[:e][:vN]`, `e` marking a
+    failed fetch and `vN` the adapter version that wrote the section.
+    """
+    parts = []
+    for name, meta in sorted(sources.items()):
+        part = f"{name}:{int(meta.get('fetched_at') or 0)}"
+        if meta.get("error"):
+            part += ":e"
+        if meta.get("version") is not None:
+            part += f":v{meta['version']}"
+        parts.append(part)
+    return ",".join(parts)
+
+
+def decode_sources(value):
+    """Inverse of `encode_sources`; returns None for objects written without it."""
+    if value is None:
+        return None
+    sources = {}
+    for part in filter(None, value.split(",")):
+        fields = part.split(":")
+        try:
+            meta = {"fetched_at": int(fields[1]), "error": "e" in fields[2:]}
+            for flag in fields[2:]:
+                if flag.startswith("v"):
+                    meta["version"] = int(flag[1:])
+        except (IndexError, ValueError):
+            continue
+        sources[fields[0]] = meta
+    return sources
+
+
+def probe_cell(key):
+    """
+    Read only the metadata of a stored cell.
+
+    Returns:
+        dict: etag, size and the parsed metadata (values are None when the
+            object predates the metadata), or None if the object does not exist
+    """
+    try:
+        response = s3_client().head_object(Bucket=BUCKET_NAME, Key=key)
+    except Exception as e:
+        if error_code(e) in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+    metadata = response.get("Metadata") or {}
+    return {
+        "etag": response.get("ETag"),
+        "size": response.get("ContentLength"),
+        "last_updated": _to_int(metadata.get("last_updated")),
+        "version": _to_int(metadata.get("data_version")),
+        "news_fetched_at": metadata.get("news_fetched_at"),
+        "sources": decode_sources(metadata.get("source_fetched_at"))
+    }
+
+
+def read_cell(key, if_none_match=None):
+    """
+    Download and decode a stored cell.
+
+    Returns:
+        tuple: (record, etag, size) as described in `read_cell_payload`
+    """
+    record, etag, size, _ = read_cell_payload(key, if_none_match)
+    return record, etag, size
+
+
+def read_cell_payload(key, if_none_match=None):
+    """
+    Download and decode a stored cell, keeping its JSON text.
+
+    Args:
+        key (str): Storage key of the cell
+        if_none_match (str, optional): ETag of a local copy; S3 skips the body if unchanged
+
+    Returns:
+        tuple: (record, etag, size, payload). record is None when the object
+            matches `if_none_match`; payload is the stored JSON bytes, None for
+            binary codecs. Raises s3.exceptions.NoSuchKey if missing.
+    """
+    params = {"Bucket": BUCKET_NAME, "Key": key}
+    if if_none_match:
+        params["IfNoneMatch"] = if_none_match
+    try:
+        response = s3_client().get_object(**params)
+    except Exception as e:
+        if if_none_match and _is_not_modified(e):
+            return None, if_none_match, 0, None
+        raise
+
+    record, size, payload = decode_record_payload(response["Body"].read(), (response.get("Metadata") or {}).get("codec"))
+    return record, response.get("ETag"), size, payload
+
+
+def write_cell(key, record, cache_control=None):
+    """
+    Encode (`CELL_CODEC`) and store a cell record with its freshness metadata.
+
+    Returns:
+        tuple: (etag, size) of the stored object, size being that of the
+            uncompressed payload
+    """
+    if any(name in record for name in TRANSIENT_KEYS):
+        record = {name: value for name, value in record.items() if name not in TRANSIENT_KEYS}
+    blob, params, size = encode_record(record)
+    metadata = build_metadata(record)
+    params = {
+        **params,
+        "Bucket": BUCKET_NAME,
+        "Key": key,
+        "Body": blob,
+        "Metadata": {**metadata, **params["Metadata"]}
+    }
+    if cache_control:
+        params["CacheControl"] = cache_control
+    response = s3_client().put_object(**params)
+    if record.get("h3_cell"):
+        # Keep the scheduler's freshness manifest in step with the stored cells
+        record_write(record["h3_cell"], metadata)
+    return response.get("ETag"), size
+
+
+def _is_not_modified(error):
+    code = error_code(error)
+    status = http_status(error)
+    return code in ("304", "NotModified") or status == 304
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from aws_clients import error_code, s3_client
+from metrics import emit
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# One breaker per upstream provider, shared by every adapter in the container.
+#   closed     calls go through; the outcome and latency of the last
+#              BREAKER_WINDOW calls are kept
+#   open       entered once BREAKER_MIN_CALLS are recorded and at least
+#              BREAKER_FAILURE_RATE of them failed (exception, 5xx or 429, or
+#              slower than BREAKER_SLOW_CALL_SECONDS). Calls fail at once for
+#              BREAKER_OPEN_SECONDS and the cell keeps its last good section.
+#   half_open  afterwards one probe call at a time goes through: success
+#              closes the breaker, failure opens it again
+BREAKER_WINDOW = int(os.environ.get("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.environ.get("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.environ.get("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("BREAKER_SLOW_CALL_SECONDS", "4"))
+BREAKER_OPEN_SECONDS = int(os.environ.get("BREAKER_OPEN_SECONDS", "30"))
+# Optional: a container that opens a breaker publishes it in
+# `breakers/{provider}.json`; closed breakers elsewhere re-read that object at
+# most every BREAKER_SYNC_SECONDS and open until the same time
+BREAKER_SHARED = os.environ.get("BREAKER_SHARED", "false").lower() == "true"
+BREAKER_SYNC_SECONDS = 10
+BREAKER_PREFIX = "breakers/"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+CONTAINER_ID = uuid.uuid4().hex
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, provider, shared=BREAKER_SHARED, clock=time.time):
+        self.provider = provider
+        self.state = CLOSED
+        self.open_until = 0
+        self._calls = deque(maxlen=BREAKER_WINDOW)  # (ok, seconds)
+        self._probing = False
+        self._shared = shared
+        self._synced_at = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return if a call may go to the provider now, else raise CircuitOpenError."""
+        now = self._clock()
+        if self._shared and self.state == CLOSED and now - self._synced_at >= BREAKER_SYNC_SECONDS:
+            self._sync(now)
+        with self._lock:
+            if self.state == OPEN and now >= self.open_until:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                self._probing = self.state == HALF_OPEN
+                return
+        emit({"CircuitBreakerRejected": 1}, {"Provider": self.provider})
+        raise CircuitOpenError(f"Circuit open for {self.provider}")
+
+    def record(self, ok, seconds):
+        """Record the outcome of a call that `allow` let through."""
+        ok = ok and seconds < BREAKER_SLOW_CALL_SECONDS
+        now = self._clock()
+        opened = False
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if ok:
+                    self._calls.clear()
+                    self._set_state(CLOSED)
+                else:
+                    opened = self._open(now)
+            else:
+                self._calls.append((ok, seconds))
+                if self.state == CLOSED and len(self._calls) >= BREAKER_MIN_CALLS and self._failure_rate() >= BREAKER_FAILURE_RATE:
+                    opened = self._open(now)
+        if opened and self._shared:
+            self._publish()
+
+    def snapshot(self):
+        """State, failure rate and mean latency over the window, for responses and logs."""
+        with self._lock:
+            calls = list(self._calls)
+            snapshot = {
+                "state": self.state,
+                "failure_rate": round(self._failure_rate(), 2),
+                "latency_ms": round(sum(seconds for _, seconds in calls) / len(calls) * 1000) if calls else None
+            }
+            if self.state == OPEN:
+                snapshot["retry_in"] = max(0, round(self.open_until - self._clock()))
+        return snapshot
+
+    def _failure_rate(self):
+        if not self._calls:
+            return 0.0
+        return sum(1 for ok, _ in self._calls if not ok) / len(self._calls)
+
+    def _open(self, now, until=None):
+        self.open_until = until or now + BREAKER_OPEN_SECONDS
+        self._set_state(OPEN)
+        return until is None
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        print(f"[INFO] Circuit breaker for {self.provider}: {self.state} -> {state} (failure rate {self._failure_rate():.2f})")
+        self.state = state
+        emit({"CircuitBreakerOpen": 1 if state == OPEN else 0}, {"Provider": self.provider}, unit="None")
+
+    def _sync(self, now):
+        self._synced_at = now
+        try:
+            response = s3_client().get_object(Bucket=BUCKET_NAME, Key=f"{BREAKER_PREFIX}{self.provider}.json")
+            shared = json.loads(response["Body"].read().decode("utf-8"))
+        except Exception as e:
+            if error_code(e) not in ("NoSuchKey", "404"):
+                print(f"[ERROR] Reading shared breaker for {self.provider} failed: {e}")
+            return
+        if shared.get("container") == CONTAINER_ID:
+            return
+        with self._lock:
+            if self.state == CLOSED and shared.get("open_until", 0) > now:
+                self._open(now, until=shared["open_until"])
+
+    def _publish(self):
+        try:
+            s3_client().put_object(
+                Bucket=BUCKET_NAME,
+                Key=f"{BREAKER_PREFIX}{self.provider}.json",
+                Body=json.dumps({"open_until": self.open_until, "container": CONTAINER_ID}),
+                ContentType="application/json"
+            )
+        except Exception as e:
+            print(f"[ERROR] Publishing breaker for {self.provider} failed: {e}")
+
+
+def get_breaker(provider):
+    """The container's breaker for an upstream provider."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(provider, CircuitBreaker(provider))
+    return breaker
+
+
+def breaker_states():
+    """Provider -> snapshot for every provider called in this container."""
+    return {provider: breaker.snapshot() for provider, breaker in sorted(_breakers.items())}
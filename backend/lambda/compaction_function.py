@@ -0,0 +1,33 @@
+import json
+import os
+from tile_store import compact_tiles, tile_key
+
+# Remove individual cell objects once they are packed into a tile. Off by
+# default. The API and the news scheduler read such cells from their tile,
+# which needs CELL_TILES=true on both functions.
+DELETE_PACKED_CELLS = os.environ.get("DELETE_PACKED_CELLS", "false").lower() == "true"
+
+def lambda_handler(event, context):
+    """
+    Pack `cells/{h3}.json` objects into parent tiles (`tiles/{parent}.bin`).
+
+    The event may list `tiles` to limit the run to those parents.
+    """
+    try:
+        packed = compact_tiles((event or {}).get("tiles"), delete_cells=DELETE_PACKED_CELLS)
+        print(f"Compacted {len(packed)} tiles")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': f'Compacted {len(packed)} tiles',
+                'tiles': {tile_key(tile): count for tile, count in packed.items()}
+            })
+        }
+    except Exception as e:
+        print(f"Error in compaction: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': str(e)
+            })
+        }
@@ -0,0 +1,207 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from aws_clients import error_code, s3_client
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# Log-structured index of cell freshness, so the scheduler does not have to
+# open every cell object to find the ones with old news.
+#
+#   manifest/snapshot.tsv     one line per cell, written by compaction
+#   manifest/log/{id}.tsv     segments of recent writes, appended by any writer
+#
+# Line format (tab separated):
+#   h3_cell  last_updated  news_fetched_at (unix)  data_version  source_fetched_at
+#
+# A cell's newest line wins (by last_updated). The scheduler merges the log
+# into a new snapshot on every run and deletes the segments it consumed.
+SNAPSHOT_KEY = "manifest/snapshot.tsv"
+LOG_PREFIX = "manifest/log/"
+# Buffered entries are written as one segment when either limit is reached,
+# and by every handler before it returns (see `flush`)
+MANIFEST_FLUSH_ENTRIES = 50
+MANIFEST_FLUSH_SECONDS = 30
+
+CONTAINER_ID = uuid.uuid4().hex
+
+_buffer = []
+_buffer_since = None
+_lock = threading.Lock()
+_flushing = False
+
+
+def format_entry(h3_cell, metadata):
+    """A manifest line from the object metadata written by `cell_store.write_cell`."""
+    return "\t".join([
+        h3_cell,
+        metadata.get("last_updated") or "0",
+        str(_to_unix(metadata.get("news_fetched_at"))),
+        metadata.get("data_version") or "0",
+        metadata.get("source_fetched_at") or ""
+    ])
+
+
+def parse_entry(line):
+    """Inverse of `format_entry`: dict with h3_cell, last_updated, news_fetched_at, version, sources (encoded)."""
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) < 5:
+        return None
+    try:
+        return {
+            "h3_cell": fields[0],
+            "last_updated": int(fields[1]),
+            "news_fetched_at": int(fields[2]),
+            "version": int(fields[3]),
+            "sources": fields[4]
+        }
+    except ValueError:
+        return None
+
+
+def record_write(h3_cell, metadata):
+    """Buffer a manifest entry for a cell that was just written."""
+    global _buffer_since
+    with _lock:
+        _buffer.append(format_entry(h3_cell, metadata))
+        if _buffer_since is None:
+            _buffer_since = time.time()
+        due = len(_buffer) >= MANIFEST_FLUSH_ENTRIES or time.time() - _buffer_since >= MANIFEST_FLUSH_SECONDS
+    if due:
+        _flush_in_background()
+
+
+def flush():
+    """
+    Write buffered entries as one log segment. Safe to call at any time.
+
+    Handlers call it before returning: a frozen or reaped container would
+    otherwise keep its entries, and its new cells would never be scheduled.
+    """
+    global _buffer, _buffer_since
+    with _lock:
+        entries, _buffer, _buffer_since = _buffer, [], None
+    if not entries:
+        return
+    key = f"{LOG_PREFIX}{time.time_ns()}-{CONTAINER_ID}.tsv"
+    try:
+        s3_client().put_object(Bucket=BUCKET_NAME, Key=key, Body="\n".join(entries) + "\n", ContentType="text/tab-separated-values")
+    except Exception as e:
+        print(f"[ERROR] Writing manifest segment failed: {e}")
+        with _lock:
+            _buffer = entries + _buffer
+            _buffer_since = _buffer_since or time.time()
+
+
+def _flush_in_background():
+    global _flushing
+    with _lock:
+        if _flushing:
+            return
+        _flushing = True
+
+    def run():
+        global _flushing
+        try:
+            flush()
+        finally:
+            _flushing = False
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def snapshot_exists():
+    try:
+        s3_client().head_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY)
+        return True
+    except Exception as e:
+        if error_code(e) in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def list_segments():
+    paginator = s3_client().get_paginator("list_objects_v2")
+    return [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=LOG_PREFIX)
+        for obj in page.get("Contents", [])
+    ]
+
+
+def iter_manifest(segments):
+    """
+    Stream the merged manifest: the snapshot line by line, with newer entries
+    from the given log segments applied.
+
+    Only the log segments are held in memory; the snapshot is never loaded whole.
+    """
+    recent = {}
+    for key in segments:
+        body = s3_client().get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read().decode("utf-8")
+        for line in body.splitlines():
+            entry = parse_entry(line)
+            if entry and entry["last_updated"] >= recent.get(entry["h3_cell"], {}).get("last_updated", -1):
+                recent[entry["h3_cell"]] = entry
+
+    try:
+        response = s3_client().get_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY)
+        for line in response["Body"].iter_lines():
+            entry = parse_entry(line.decode("utf-8"))
+            if entry is None:
+                continue
+            newer = recent.pop(entry["h3_cell"], None)
+            yield newer if newer is not None and newer["last_updated"] >= entry["last_updated"] else entry
+    except Exception as e:
+        if error_code(e) not in ("NoSuchKey", "404"):
+            raise
+    yield from recent.values()
+
+
+class SnapshotWriter:
+    """
+    Builds a new snapshot while the merged manifest is streamed: entries go
+    line by line to a temporary file (under /tmp on Lambda) that `commit`
+    uploads, so no more than one entry is held in memory.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def add(self, entry):
+        self._file.write(("\t".join([
+            entry["h3_cell"],
+            str(entry["last_updated"]),
+            str(entry["news_fetched_at"]),
+            str(entry["version"]),
+            entry["sources"]
+        ]) + "\n").encode("utf-8"))
+        self.count += 1
+
+    def commit(self, consumed_segments=()):
+        """Store the snapshot and drop the log segments it includes."""
+        self._file.seek(0)
+        s3_client().put_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY, Body=self._file, ContentType="text/tab-separated-values")
+        self.close()
+        for key in consumed_segments:
+            try:
+                s3_client().delete_object(Bucket=BUCKET_NAME, Key=key)
+            except Exception as e:
+                print(f"[ERROR] Deleting manifest segment {key} failed: {e}")
+        print(f"[INFO] Manifest snapshot written with {self.count} cells, {len(consumed_segments)} segments merged")
+
+    def close(self):
+        self._file.close()
+
+
+def _to_unix(value):
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from aws_clients import error_code, s3_client
+from adapters.opencage import fetch_components, format_location
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# A cell's place name almost never changes, keep lookups for a month
+GEOCODE_TTL_SECONDS = 30 * 86400
+# A failed lookup is remembered this long, so callers do not repeat it at once
+GEOCODE_FAILURE_TTL_SECONDS = 60
+GEOCODE_CACHE_MAX_ENTRIES = int(os.environ.get("GEOCODE_CACHE_MAX_ENTRIES", "10000"))
+GEOCODE_WAIT_SECONDS = 8  # how long a concurrent caller waits for an in-flight lookup
+
+_memory = OrderedDict()  # h3_cell -> (components, fetched_at); components None for a failure
+_inflight = {}  # h3_cell -> Future shared by concurrent callers
+_lock = threading.Lock()
+
+
+def geocode_key(h3_cell):
+    return f"geocode/{h3_cell}.json"
+
+
+def get_place(h3_cell, lat, lon):
+    """
+    Return the OpenCage address components for an H3 cell.
+
+    Lookups go through the in-memory cache, then the durable `geocode/` sidecar
+    in S3, and only then the OpenCage API. Concurrent callers for the same cell
+    (the handler and the tap water adapter) share a single lookup, and a
+    failed lookup is not repeated for GEOCODE_FAILURE_TTL_SECONDS.
+
+    Returns:
+        dict: Address components ({} when OpenCage has no result), or None if
+            the lookup failed
+    """
+    with _lock:
+        entry = _memory.get(h3_cell)
+        if entry is not None and time.time() - entry[1] <= (GEOCODE_TTL_SECONDS if entry[0] is not None else GEOCODE_FAILURE_TTL_SECONDS):
+            _memory.move_to_end(h3_cell)
+            return entry[0]
+
+        future = _inflight.get(h3_cell)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[h3_cell] = future
+
+    if not owner:
+        try:
+            return future.result(timeout=GEOCODE_WAIT_SECONDS)
+        except Exception as e:
+            print(f"[ERROR] Waiting for geocode of {h3_cell} failed: {e}")
+            return None
+
+    components = None
+    try:
+        components, fetched_at = _lookup(h3_cell, lat, lon)
+        _remember(h3_cell, components, fetched_at or int(time.time()))
+    finally:
+        with _lock:
+            _inflight.pop(h3_cell, None)
+        future.set_result(components)
+    return components
+
+
+def get_location_name(h3_cell, lat, lon):
+    """"City, Country" for an H3 cell, "Unknown" if the lookup failed."""
+    components = get_place(h3_cell, lat, lon)
+    if components is None:
+        return "Unknown"
+    return format_location(components)
+
+
+def _lookup(h3_cell, lat, lon):
+    stored = _read_sidecar(h3_cell)
+    if stored is not None and time.time() - stored.get("fetched_at", 0) <= GEOCODE_TTL_SECONDS:
+        return stored.get("components") or {}, stored["fetched_at"]
+
+    try:
+        components = fetch_components(lat, lon)
+    except Exception as e:
+        print(f"[ERROR] OpenCage reverse geocoding failed for {h3_cell} ({lat},{lon}): {e}")
+        return None, None
+
+    fetched_at = int(time.time())
+    _write_sidecar(h3_cell, components, fetched_at)
+    return components, fetched_at
+
+
+def _remember(h3_cell, components, fetched_at):
+    with _lock:
+        _memory[h3_cell] = (components, fetched_at)
+        _memory.move_to_end(h3_cell)
+        while len(_memory) > GEOCODE_CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _read_sidecar(h3_cell):
+    try:
+        response = s3_client().get_object(Bucket=BUCKET_NAME, Key=geocode_key(h3_cell))
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except Exception as e:
+        if error_code(e) not in ("NoSuchKey", "404"):
+            print(f"[ERROR] Reading geocode sidecar for {h3_cell} failed: {e}")
+    return None
+
+
+def _write_sidecar(h3_cell, components, fetched_at):
+    try:
+        s3_client().put_object(
+            Bucket=BUCKET_NAME,
+            Key=geocode_key(h3_cell),
+            Body=json.dumps({
+                "h3_cell": h3_cell,
+                "location": format_location(components),
+                "components": components,
+                "fetched_at": fetched_at
+            }),
+            ContentType="application/json"
+        )
+    except Exception as e:
+        print(f"[ERROR] Saving geocode sidecar for {h3_cell} failed: {e}")
@@ -1,38 +1,46 @@
+import hashlib
 import json
-import boto3
 import os
 import time
-import asyncio
-import concurrent.futures
 from datetime import datetime, timezone
-from adapters.openweather import get_air_quality
-from adapters.tapwater import is_tap_water_safe
-from adapters.uv import get_uv_index
-from adapters.weather import get_weather
-from adapters.pollen import get_pollen
-from adapters.opencage import reverse_geocode
-from adapters.newsdata import fetch_local_health_news
+from email.utils import formatdate
 from validators import validate_coordinates, validate_h3_cell, validate_user_tier, validate_headers
-from rate_limiter import check_rate_limit
+from rate_limiter import check_rate_limit, RATE_LIMITS
+from cell_cache import cell_cache
+from freshness_manifest import flush as flush_manifest
+from cell_store import TRANSIENT_KEYS, cell_key, probe_cell, read_cell, read_cell_payload, write_cell
+from adapter_engine import run_calls, request_deadline
+from adapter_registry import ADAPTERS, adapter_versions, is_current, load_adapter, section_version, with_dependents
+from single_flight import acquire_refresh, release_refresh, wait_for_refresh
+from tile_store import TILES_ENABLED, packed_cells_deleted, tile_of, tile_entry, read_tile_cell, read_tile_cells
+from spatial_fallback import SPATIAL_REUSE_ENABLED, derive_sections, neighbor_cells, reusable_sections
+from popularity import record_access
+from news_store import NEWS_TTL_SECONDS, fetched_at_unix, get_news
+from revalidation import grace_seconds, is_revalidation_event, schedule_revalidation
+from metrics import emit
+from circuit_breaker import breaker_states
+from batch_cells import is_batch_request, select_cells
+from concurrent.futures import ThreadPoolExecutor
 import h3
 
-s3 = boto3.client("s3")
-BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
 BASE_TTL_SECONDS = 3600  # default 1 hour for free tier
-NEWS_TTL_SECONDS = 43200  # 12 hours for news
-
-# Version registry - increment when adapters change
-ADAPTER_VERSIONS = {
-    "air_quality": 1,
-    "tap_water": 1, 
-    "uv": 3,  # Updated to use history and forecast data for accurate daylight peak
-    "weather": 1,  # New weather adapter
-    "pollen": 1
-}
-
-# Current overall data version - increment when any adapter changes
+
+# Version of the record layout - increment only when that changes, it
+# invalidates every stored cell. Adapter changes bump their own version in
+# adapter_registry.ADAPTERS, which re-fetches just their section.
 CURRENT_DATA_VERSION = 3
 
+# One fetcher per section of data in a cell record, imported on first use
+SOURCE_FETCHERS = {name: adapter["fetcher"] for name, adapter in ADAPTERS.items()}
+ERROR_RETRY_SECONDS = 300  # failed sections are retried sooner than their TTL
+# A failed fetch (e.g. an open circuit breaker) keeps the section's last good
+# value for up to this long, or the section's TTL if that is longer
+LAST_GOOD_MAX_AGE_SECONDS = int(os.environ.get("LAST_GOOD_MAX_AGE_SECONDS", "86400"))
+
+# Parallel S3 reads, writes and lease calls for batch requests
+BATCH_IO_WORKERS = 16
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_IO_WORKERS)
+
 # CORS configuration
 ALLOWED_ORIGINS = [
     "https://health-exposure.app",  # Production frontend
@@ -43,12 +51,24 @@ ALLOWED_ORIGINS = [
 ]
 
 def lambda_handler(event, context):
+    try:
+        return handle_event(event, context)
+    finally:
+        # Lambda freezes the container once the handler returns, so the cells
+        # written by this invocation reach the freshness manifest now
+        flush_manifest()
+
+def handle_event(event, context):
     # Log the full event for debugging
     print(json.dumps({
         "event": event,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }))
 
+    # Background refresh of cells that were served stale (asynchronous self-invocation)
+    if is_revalidation_event(event):
+        return handle_revalidation(event, context)
+
     # Handle CORS preflight requests
     if event.get("httpMethod") == "OPTIONS":
         return handle_cors(event)
@@ -118,15 +138,14 @@ def lambda_handler(event, context):
         return error_response(400, error)
 
     # Check rate limit
-    allowed, remaining, reset_time = check_rate_limit(user_tier)
+    allowed, remaining, reset_time = check_rate_limit(user_tier, api_key)
+    limit_headers = rate_limit_headers(user_tier, remaining, reset_time)
     if not allowed:
         return {
             "statusCode": 429,
             "headers": {
                 "Content-Type": "application/json",
-                "X-RateLimit-Limit": str(RATE_LIMITS.get(user_tier, RATE_LIMITS['free'])),
-                "X-RateLimit-Remaining": str(remaining),
-                "X-RateLimit-Reset": str(reset_time)
+                **limit_headers
             },
             "body": json.dumps({
                 "error": "Rate limit exceeded",
@@ -135,6 +154,22 @@ def lambda_handler(event, context):
             })
         }
 
+    # Batch mode: many cells behind one auth and rate limit check
+    if is_batch_request(params):
+        cells, error = select_cells(params)
+        if error:
+            return error_response(400, error)
+        try:
+            body = batch_response_body(cells, user_tier, force_refresh, context)
+        except Exception as e:
+            print(f"[ERROR] Unexpected error in batch request: {e}")
+            return error_response(500, f"Internal server error: {str(e)}", origin)
+        body["rate_limit"] = {
+            'remaining': remaining,
+            'reset_time': reset_time
+        }
+        return success_response(body, origin, limit_headers)
+
     # Get coordinates or H3 cell
     if "lat" in params and "lon" in params:
         try:
@@ -155,80 +190,90 @@ def lambda_handler(event, context):
     else:
         return error_response(400, "Missing lat/lon or h3_id")
 
-    TTL_SECONDS = 300 if user_tier == "premium" else BASE_TTL_SECONDS
-    key = f"cells/{h3_cell}.json"
+    TTL_SECONDS = ttl_for_tier(user_tier)
+    key = cell_key(h3_cell)
 
+    rate_limit = {
+        'remaining': remaining,
+        'reset_time': reset_time
+    }
+    grace = 0 if force_refresh else grace_seconds(user_tier)
+    cached, stale = None, list(SOURCE_FETCHERS)
     try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = json.loads(response["Body"].read().decode("utf-8"))
-        
-        # Only use cached data if not forcing refresh and data is not stale
-        if not force_refresh and body.get("last_updated") and not is_stale(body["last_updated"], TTL_SECONDS):
-            # Check if cached data has the current version
-            cached_version = body.get("version", 0)
-            if cached_version < CURRENT_DATA_VERSION:
-                print(f"[INFO] Cache MISS - Old version detected for h3_cell: {h3_cell} (cached: {cached_version}, current: {CURRENT_DATA_VERSION})")
-            else:
-                print(f"[INFO] Cache HIT for h3_cell: {h3_cell}")
-                
-                # Check if news needs refresh based on its own TTL
-                news = body.get('news', {})
-                fetched_at = news.get('fetched_at')
-                refresh_news = False  # Default to using cached news
-                
-                if fetched_at:
-                    try:
-                        dt = datetime.fromisoformat(fetched_at)
-                        refresh_news = dt.timestamp() < time.time() - NEWS_TTL_SECONDS
-                    except Exception:
-                        pass
-                
-                if refresh_news:
-                    print(f"[INFO] News cache expired, refreshing news for h3_cell: {h3_cell}")
-                    location = body.get('location') or 'Unknown'
-                    try:
-                        news = fetch_local_health_news(lat, lon, location)
-                        body['news'] = news
-                        s3.put_object(
-                            Bucket=BUCKET_NAME,
-                            Key=key,
-                            Body=json.dumps(body),
-                            ContentType="application/json"
-                        )
-                    except Exception as e:
-                        print(f"[ERROR] News fetch failed: {e}")
-                        news = {"source": "openai", "error": str(e), "articles": []}
-                        body['news'] = news
-                else:
-                    print(f"[INFO] Using cached news for h3_cell: {h3_cell}")
-                
-                # Add rate limit info to response
-                body['rate_limit'] = {
-                    'remaining': remaining,
-                    'reset_time': reset_time
-                }
-                
-                # Add cache status to response
-                body['cache_status'] = {
-                    'hit': True,
-                    'source': 'S3',
-                    'last_updated': body.get('last_updated'),
-                    'ttl_seconds': TTL_SECONDS,
-                    'force_refresh': force_refresh
-                }
-                
-                return success_response(body, origin)
-        else:
-            if force_refresh:
-                print(f"[INFO] Cache MISS - Force refresh requested for h3_cell: {h3_cell}")
-            else:
-                print(f"[INFO] Cache MISS - Data stale for h3_cell: {h3_cell}")
-    except s3.exceptions.NoSuchKey:
-        print(f"[INFO] Cache MISS - No cached data found for h3_cell: {h3_cell}")
+        record_access(h3_cell)
+        cached, cache_source, stale = (None, None, stale) if force_refresh else load_cached_cell(key, h3_cell, TTL_SECONDS, grace)
+        track_refresh_ahead(cached, stale)
+        if cached is not None and not stale:
+            print(f"[INFO] Cache HIT for h3_cell: {h3_cell}")
+            if is_not_modified(cached, headers):
+                return not_modified_response(cached, TTL_SECONDS, origin, limit_headers)
+            body, served = cached_response_body(cached, key, lat, lon, rate_limit, {
+                'hit': True,
+                'source': cache_source,
+                'last_updated': cached.get('last_updated'),
+                'ttl_seconds': TTL_SECONDS,
+                'force_refresh': force_refresh,
+                'memory_cache': cell_cache.stats(),
+                'circuit_breakers': breaker_states()
+            })
+            return success_response(body, origin, {**cache_headers(served, TTL_SECONDS), **limit_headers})
+        elif cached is not None and within_grace(cached, TTL_SECONDS, grace):
+            # Stale-while-revalidate: answer from storage, refresh off the request path
+            print(f"[INFO] Cache STALE - Serving and revalidating {', '.join(stale)} for h3_cell: {h3_cell}")
+            revalidating = schedule_revalidation([h3_cell], user_tier, revalidate_cells)
+            if is_not_modified(cached, headers):
+                return not_modified_response(cached, TTL_SECONDS, origin, limit_headers)
+            body, served = cached_response_body(cached, key, lat, lon, rate_limit, {
+                'hit': True,
+                'source': 'stale',
+                'stale': True,
+                'stale_sources': stale,
+                'revalidating': bool(revalidating),
+                'last_updated': cached.get('last_updated'),
+                'ttl_seconds': TTL_SECONDS,
+                'force_refresh': force_refresh,
+                'memory_cache': cell_cache.stats(),
+                'circuit_breakers': breaker_states()
+            })
+            return success_response(body, origin, {**cache_headers(served, TTL_SECONDS), **limit_headers})
+        elif force_refresh:
+            print(f"[INFO] Cache MISS - Force refresh requested for h3_cell: {h3_cell}")
+            cell_cache.invalidate(key)
+        elif cached is not None:
+            print(f"[INFO] Cache PARTIAL - Refreshing {', '.join(stale)} for h3_cell: {h3_cell}")
     except Exception as e:
         print(f"Error reading from S3: {e}")
+        cached, stale = None, list(SOURCE_FETCHERS)
+
+    # Only one invocation refreshes a cell at a time. The others wait briefly
+    # for its result and otherwise serve the stale copy. A forced refresh is
+    # explicit and always fetches.
+    lease = None
+    if not force_refresh:
+        lease = acquire_refresh(h3_cell)
+        if lease is None:
+            print(f"[INFO] Refresh in progress elsewhere for h3_cell: {h3_cell}, waiting")
+            since = (cached or {}).get("last_updated") or 0
+            refreshed = wait_for_refresh(lambda: load_refreshed_cell(key, since))
+            if refreshed is not None or cached is not None:
+                record = refreshed if refreshed is not None else cached
+                if is_not_modified(record, headers):
+                    return not_modified_response(record, TTL_SECONDS, origin, limit_headers)
+                body, served = cached_response_body(record, key, lat, lon, rate_limit, {
+                    'hit': True,
+                    'source': 'single_flight' if refreshed is not None else 'stale',
+                    'stale': refreshed is None,
+                    'stale_sources': [] if refreshed is not None else stale,
+                    'last_updated': record.get('last_updated'),
+                    'ttl_seconds': TTL_SECONDS,
+                    'force_refresh': force_refresh,
+                    'memory_cache': cell_cache.stats(),
+                    'circuit_breakers': breaker_states()
+                })
+                return success_response(body, origin, {**cache_headers(served, TTL_SECONDS), **limit_headers})
+            print(f"[INFO] No refreshed copy of h3_cell: {h3_cell} yet, fetching")
 
-    # If we get here, either there was no cached data, it was stale, or force_refresh was true
+    # If we get here, either there was no cached data, some sections were stale, or force_refresh was true
     try:
         print(f"[INFO] Fetching fresh data for h3_cell: {h3_cell}")
         request_context = {
@@ -237,124 +282,685 @@ def lambda_handler(event, context):
             "h3_cell": h3_cell,
             "user_tier": user_tier
         }
+        enriched, fetched, derived = refresh_cell(request_context, cached, stale, TTL_SECONDS, context, allow_derived=not force_refresh)
+        enriched["rate_limit"] = rate_limit
+        enriched["cache_status"] = {
+            'hit': False,
+            'source': 'fresh_data' if not cached else 'partial_refresh',
+            'refreshed': sorted(fetched),
+            'derived': sorted(derived),
+            'last_updated': enriched["last_updated"],
+            'ttl_seconds': TTL_SECONDS,
+            'force_refresh': force_refresh,
+            'memory_cache': cell_cache.stats(),
+            'circuit_breakers': breaker_states()
+        }
 
-        print(f"[INFO] Fetching data for coordinates: {lat}, {lon}")
-        
-        # Get location first (needed for news)
         try:
-            location = reverse_geocode(lat, lon)
-            print(f"[INFO] Location: {location}")
+            etag, size = write_cell(key, enriched, cache_control=f"max-age={TTL_SECONDS}")
+            print(f"[INFO] Successfully saved data to S3")
+            cell_cache.put(key, enriched, size, BASE_TTL_SECONDS, etag)
         except Exception as e:
-            print(f"[ERROR] Reverse geocoding failed: {e}")
-            location = "Unknown"
+            print(f"[ERROR] Failed to save to S3: {e}")
+            return error_response(500, f"Failed to save data: {str(e)}", origin)
+
+        return success_response(enriched, origin, {**cache_headers(enriched, TTL_SECONDS), **limit_headers})
+    except Exception as e:
+        print(f"[ERROR] Unexpected error in data generation: {e}")
+        return error_response(500, f"Internal server error: {str(e)}", origin)
+    finally:
+        release_refresh(h3_cell, lease)
+
+def batch_response_body(cells, user_tier, force_refresh, context=None):
+    """
+    Response body for a batch of cells, each with its own cache_status.
+
+    Stored copies are loaded in parallel; every cell that is missing or has
+    stale sections is refreshed in one combined adapter run. Cells another
+    invocation is refreshing are served stale rather than waited for.
+    """
+    TTL_SECONDS = ttl_for_tier(user_tier)
+    grace = 0 if force_refresh else grace_seconds(user_tier)
+
+    def load(h3_cell):
+        if force_refresh:
+            cell_cache.invalidate(cell_key(h3_cell))
+            return None, None, list(SOURCE_FETCHERS)
+        try:
+            return load_cached_cell(cell_key(h3_cell), h3_cell, TTL_SECONDS, grace)
+        except Exception as e:
+            print(f"Error reading from S3: {e}")
+            return None, None, list(SOURCE_FETCHERS)
+
+    prefetched = prefetch_tiles(cells) if TILES_ENABLED and not force_refresh else set()
+    loaded = dict(zip(cells, _batch_executor.map(load, cells)))
+    for h3_cell in cells:
+        cached, _, stale = loaded[h3_cell]
+        record_access(h3_cell)
+        track_refresh_ahead(cached, stale)
+    # Stale cells within the tier's grace window are served as they are and refreshed in the background
+    revalidate = [h3_cell for h3_cell in cells if loaded[h3_cell][2] and within_grace(loaded[h3_cell][0], TTL_SECONDS, grace)]
+    revalidating = set(schedule_revalidation(revalidate, user_tier, revalidate_cells)) if revalidate else set()
+    misses = [
+        h3_cell for h3_cell in cells
+        if (loaded[h3_cell][0] is None or loaded[h3_cell][2]) and h3_cell not in revalidate
+    ]
+    leases = {} if force_refresh else dict(zip(misses, _batch_executor.map(acquire_refresh, misses)))
+    print(f"[INFO] Batch of {len(cells)} cells, {len(misses)} to refresh")
+
+    bodies = {}
+    to_refresh = []
+    try:
+        for h3_cell in cells:
+            cached, cache_source, stale = loaded[h3_cell]
+            if cached is not None and not stale:
+                bodies[h3_cell] = cell_body(cached, {
+                    'hit': True,
+                    'source': 'tile' if cache_source == 'memory' and h3_cell in prefetched else cache_source,
+                    'last_updated': cached.get('last_updated'),
+                    'ttl_seconds': TTL_SECONDS
+                })
+            elif cached is not None and (h3_cell in revalidate or (h3_cell in leases and leases[h3_cell] is None)):
+                bodies[h3_cell] = cell_body(cached, {
+                    'hit': True,
+                    'source': 'stale',
+                    'stale': True,
+                    'stale_sources': stale,
+                    'revalidating': h3_cell in revalidating,
+                    'last_updated': cached.get('last_updated'),
+                    'ttl_seconds': TTL_SECONDS
+                })
+            else:
+                lat, lon = h3.cell_to_latlng(h3_cell)
+                request_context = {"lat": lat, "lon": lon, "h3_cell": h3_cell, "user_tier": user_tier}
+                to_refresh.append((request_context, cached, stale))
+
+        if to_refresh:
+            refreshed = refresh_cells(to_refresh, TTL_SECONDS, context, allow_derived=not force_refresh)
+
+            def save(item):
+                h3_cell, (record, _, _) = item
+                try:
+                    etag, size = write_cell(cell_key(h3_cell), record, cache_control=f"max-age={TTL_SECONDS}")
+                    cell_cache.put(cell_key(h3_cell), record, size, BASE_TTL_SECONDS, etag)
+                    return True
+                except Exception as e:
+                    print(f"[ERROR] Failed to save {h3_cell} to S3: {e}")
+                    return False
+
+            saved = dict(zip(refreshed, _batch_executor.map(save, refreshed.items())))
+            for request_context, cached, stale in to_refresh:
+                h3_cell = request_context["h3_cell"]
+                record, fetched, derived = refreshed[h3_cell]
+                bodies[h3_cell] = cell_body(record, {
+                    'hit': False,
+                    'source': 'fresh_data' if not cached else 'partial_refresh',
+                    'refreshed': sorted(fetched),
+                    'derived': sorted(derived),
+                    'saved': saved[h3_cell],
+                    'last_updated': record["last_updated"],
+                    'ttl_seconds': TTL_SECONDS
+                })
+    finally:
+        list(_batch_executor.map(lambda item: release_refresh(*item), leases.items()))
 
-        # Fetch all data in parallel with timeout
-        def fetch_with_timeout(func, context, timeout=8):
-            """Fetch data with timeout"""
+    return {
+        "cells": [bodies[h3_cell] for h3_cell in cells],
+        "count": len(cells),
+        "force_refresh": force_refresh,
+        "memory_cache": cell_cache.stats(),
+        "circuit_breakers": breaker_states()
+    }
+
+def handle_revalidation(event, context=None):
+    """Entry point of the asynchronous refresh scheduled by `schedule_revalidation`."""
+    request = event.get("revalidate") or {}
+    user_tier = request.get("user_tier", "free")
+    cells = [h3_cell for h3_cell in request.get("cells") or [] if validate_h3_cell(h3_cell)[0]]
+    if not validate_user_tier(user_tier)[0] or not cells:
+        return {"statusCode": 400, "body": json.dumps({"error": "Invalid revalidation request"})}
+    refreshed = revalidate_cells(cells, user_tier, context)
+    return {"statusCode": 200, "body": json.dumps({"refreshed": refreshed})}
+
+def revalidate_cells(h3_cells, user_tier, context=None):
+    """
+    Refresh cells that were served stale and store the new records.
+
+    Cells another invocation is refreshing, or that were refreshed since they
+    were served, are skipped.
+
+    Returns:
+        list: The cells that were refreshed and saved
+    """
+    TTL_SECONDS = ttl_for_tier(user_tier)
+    leases = dict(zip(h3_cells, _batch_executor.map(acquire_refresh, h3_cells)))
+    saved = []
+    try:
+        requests = []
+        for h3_cell, lease in leases.items():
+            if lease is None:
+                continue
             try:
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(func, context)
-                    return future.result(timeout=timeout)
-            except concurrent.futures.TimeoutError:
-                print(f"[WARNING] {func.__name__} timed out after {timeout}s")
-                return {"error": "Request timed out"}
+                cached, _, stale = load_cached_cell(cell_key(h3_cell), h3_cell, TTL_SECONDS)
             except Exception as e:
-                print(f"[ERROR] {func.__name__} failed: {e}")
-                return {"error": str(e)}
-
-        # Fetch all environmental data in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            # Submit all tasks
-            air_quality_future = executor.submit(fetch_with_timeout, get_air_quality, request_context)
-            tap_water_future = executor.submit(fetch_with_timeout, is_tap_water_safe, request_context)
-            uv_future = executor.submit(fetch_with_timeout, get_uv_index, request_context)
-            humidity_future = executor.submit(fetch_with_timeout, get_weather, request_context)
-            pollen_future = executor.submit(fetch_with_timeout, get_pollen, request_context)
-            
-            # TEMPORARILY COMMENTED OUT: News API call causing timeouts
-            # Create a wrapper function for news that accepts context
-            # def fetch_news_wrapper(context):
-            #     return fetch_local_health_news(lat, lon, location)
-            # news_future = executor.submit(fetch_with_timeout, fetch_news_wrapper, request_context)
-
-            # Wait for all results with timeout
-            try:
-                air_quality = air_quality_future.result(timeout=10)
-                tap_water = tap_water_future.result(timeout=10)
-                uv = uv_future.result(timeout=10)
-                weather = humidity_future.result(timeout=10)
-                pollen = pollen_future.result(timeout=10)
-                # news = news_future.result(timeout=10)
-                news = {"source": "disabled", "articles": [], "note": "News temporarily disabled for testing"}
-                
-                print(f"[INFO] All data fetched successfully")
-            except concurrent.futures.TimeoutError:
-                print(f"[ERROR] Some API calls timed out")
-                # Return partial data
-                air_quality = air_quality_future.result(timeout=1) if not air_quality_future.done() else {"error": "Timeout"}
-                tap_water = tap_water_future.result(timeout=1) if not tap_water_future.done() else {"error": "Timeout"}
-                uv = uv_future.result(timeout=1) if not uv_future.done() else {"error": "Timeout"}
-                weather = humidity_future.result(timeout=1) if not humidity_future.done() else {"error": "Timeout"}
-                pollen = pollen_future.result(timeout=1) if not pollen_future.done() else {"error": "Timeout"}
-                # news = news_future.result(timeout=1) if not news_future.done() else {"error": "Timeout", "articles": []}
-                news = {"source": "disabled", "articles": [], "note": "News temporarily disabled for testing"}
-
-        # Extract humidity from weather data for backward compatibility
-        humidity = None
-        if weather and not weather.get("error"):
-            humidity = {
-                "source": weather.get("source"),
-                "humidity": weather.get("humidity"),
-                "timestamp": weather.get("timestamp")
-            }
+                print(f"Error reading from S3: {e}")
+                cached, stale = None, list(SOURCE_FETCHERS)
+            if cached is not None and not stale:
+                continue
+            lat, lon = h3.cell_to_latlng(h3_cell)
+            request_context = {"lat": lat, "lon": lon, "h3_cell": h3_cell, "user_tier": user_tier}
+            requests.append((request_context, cached, stale))
 
-        enriched = {
-            "h3_cell": h3_cell,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "last_updated": int(time.time()),
-            "location": location,
-            "version": CURRENT_DATA_VERSION,
-            "adapter_versions": ADAPTER_VERSIONS,
-            "data": {
-                "air_quality": air_quality,
-                "tap_water": tap_water,
-                "uv": uv,
-                "weather": weather,
-                "humidity": humidity,
-                "pollen": pollen
-            },
-            "news": news,
-            "rate_limit": {
-                'remaining': remaining,
-                'reset_time': reset_time
-            },
-            "cache_status": {
-                'hit': False,
-                'source': 'fresh_data',
-                'last_updated': int(time.time()),
-                'ttl_seconds': TTL_SECONDS,
-                'force_refresh': force_refresh
+        if requests:
+            for h3_cell, (record, _, _) in refresh_cells(requests, TTL_SECONDS, context).items():
+                try:
+                    etag, size = write_cell(cell_key(h3_cell), record, cache_control=f"max-age={TTL_SECONDS}")
+                    cell_cache.put(cell_key(h3_cell), record, size, BASE_TTL_SECONDS, etag)
+                    saved.append(h3_cell)
+                except Exception as e:
+                    print(f"[ERROR] Failed to save {h3_cell} to S3: {e}")
+    except Exception as e:
+        print(f"[ERROR] Revalidation failed: {e}")
+    finally:
+        list(_batch_executor.map(lambda item: release_refresh(*item), leases.items()))
+
+    print(f"[INFO] Revalidated {len(saved)} of {len(h3_cells)} cells")
+    return saved
+
+def cell_body(record, cache_status):
+    """One cell of a batch response; the rate limit is reported once for the batch."""
+    body = dict(record)  # cached records are shared, never mutate them in place
+    body.pop('rate_limit', None)
+    body['cache_status'] = cache_status
+    return body
+
+def refresh_cell(request_context, cached, stale, ttl_seconds, context=None, allow_derived=True):
+    """
+    Fetch the stale sections of a cell and merge them into the stored record.
+
+    Returns:
+        tuple: (record, fetched, derived) where fetched maps section name -> fresh
+            result and derived section name -> (result, fetched_at) from neighbors
+    """
+    return refresh_cells([(request_context, cached, stale)], ttl_seconds, context, allow_derived)[request_context["h3_cell"]]
+
+def refresh_cells(requests, ttl_seconds, context=None, allow_derived=True):
+    """
+    Refresh several cells with one adapter fan-out under one deadline.
+
+    Args:
+        requests (list): (request_context, cached record or None, stale section names) per cell
+        ttl_seconds (int): The caller's tier TTL
+        context: Lambda context, bounds the deadline
+        allow_derived (bool): Let spatial reuse fill sections from fresh neighbors
+
+    Returns:
+        dict: h3_cell -> (record, fetched, derived) as returned by refresh_cell
+    """
+    derived_by_cell = {}
+    if SPATIAL_REUSE_ENABLED and allow_derived:
+        derived_by_cell = derive_from_neighbors(requests, ttl_seconds)
+
+    # Fetch the stale sections concurrently under one deadline. The location
+    # lookup runs alongside the adapters; the tap water adapter shares its
+    # result through the geocode service.
+    calls = {}
+    for request_context, cached, stale in requests:
+        h3_cell = request_context["h3_cell"]
+        derived = derived_by_cell.get(h3_cell, {})
+        if derived:
+            print(f"[INFO] Reusing {', '.join(derived)} from neighbors of h3_cell: {h3_cell}")
+        to_fetch = [name for name in stale if name not in derived]
+        print(f"[INFO] Fetching {', '.join(to_fetch)} for coordinates: {request_context['lat']}, {request_context['lon']}")
+        for name in to_fetch:
+            calls[(h3_cell, name)] = (load_adapter(SOURCE_FETCHERS[name]), request_context, ADAPTERS[name]["timeout"])
+        # Place names do not change, reuse the stored one when we have it
+        location = (cached or {}).get("location")
+        if not location or location in ("Unknown", "Unknown Location"):
+            calls[(h3_cell, "location")] = (fetch_location, request_context)
+
+    # TEMPORARILY DISABLED: News API call causing timeouts
+    # calls[(h3_cell, "news")] = (lambda ctx: fetch_local_health_news(ctx["lat"], ctx["lon"], location), request_context)
+
+    results = run_calls(calls, timeout=request_deadline(context))
+    if any(isinstance(result, dict) and result.get("error") == "Request timed out" for result in results.values()):
+        print(f"[ERROR] Some API calls timed out")
+    else:
+        print(f"[INFO] All data fetched successfully")
+
+    refreshed = {}
+    for request_context, cached, stale in requests:
+        h3_cell = request_context["h3_cell"]
+        fetched = {name: result for (cell, name), result in results.items() if cell == h3_cell}
+        derived = derived_by_cell.get(h3_cell, {})
+        refreshed[h3_cell] = (merge_cell(h3_cell, cached, fetched, ttl_seconds, derived), fetched, derived)
+    return refreshed
+
+def derive_from_neighbors(requests, ttl_seconds):
+    """
+    Sections of each requested cell that can be filled from fresh neighbors.
+
+    Neighbor records come from the memory cache or are read from S3 in parallel.
+
+    Returns:
+        dict: h3_cell -> {name: (result, fetched_at)}
+    """
+    wanted = {}
+    for request_context, cached, stale in requests:
+        if reusable_sections(stale):
+            wanted[request_context["h3_cell"]] = neighbor_cells(request_context["h3_cell"])
+    if not wanted:
+        return {}
+
+    def load(h3_cell):
+        key = cell_key(h3_cell)
+        record = cell_cache.peek(key)[0]
+        if record is not None:
+            return record
+        try:
+            record, etag, size = read_cell(key)
+        except Exception:
+            return None  # no stored neighbor
+        if record.get("version", 0) >= CURRENT_DATA_VERSION:
+            cell_cache.put(key, record, size, BASE_TTL_SECONDS, etag)
+        return record
+
+    cells = sorted({cell for neighbors in wanted.values() for cell in neighbors} - set(wanted))
+    records = {cell: record for cell, record in zip(cells, _batch_executor.map(load, cells)) if record is not None}
+
+    max_age = lambda name: section_ttl(name, ttl_seconds)
+    derived = {}
+    for request_context, cached, stale in requests:
+        h3_cell = request_context["h3_cell"]
+        if h3_cell in wanted:
+            neighbors = {cell: records[cell] for cell in wanted[h3_cell] if cell in records}
+            derived[h3_cell] = derive_sections(h3_cell, stale, neighbors, max_age)
+    return derived
+
+def fetch_location(ctx):
+    return load_adapter("geocode_service:get_location_name")(ctx["h3_cell"], ctx["lat"], ctx["lon"])
+
+def merge_cell(h3_cell, cached, fetched, ttl_seconds, derived=None):
+    """Merge freshly fetched and derived sections over the ones that are still valid in the stored record."""
+    previous = cached or {}
+    location = previous.get("location")
+    if "location" in fetched:
+        location = fetched.pop("location")
+        if not isinstance(location, str):
+            location = "Unknown"
+        print(f"[INFO] Location: {location}")
+
+    now = int(time.time())
+    data = dict(previous.get("data") or {})
+    sources = dict(previous.get("sources") or {})
+    versions = adapter_versions()
+    for name, result in fetched.items():
+        failed = not result or bool(result.get("error"))
+        last_good_at = last_good(name, data.get(name), sources.get(name) or {}, ttl_seconds, now) if failed else None
+        if last_good_at:
+            # Keep serving the last good value and retry after ERROR_RETRY_SECONDS
+            print(f"[INFO] Keeping last good {name} from {last_good_at} for h3_cell: {h3_cell}")
+            sources[name] = {
+                "fetched_at": now,
+                "ttl_seconds": section_ttl(name, ttl_seconds, True),
+                "version": section_version(name, sources[name]),
+                "error": True,
+                "last_good_at": last_good_at
             }
+            continue
+        data[name] = result
+        sources[name] = {
+            "fetched_at": now,
+            "ttl_seconds": section_ttl(name, ttl_seconds, failed),
+            "version": versions[name]
+        }
+        if failed:
+            sources[name]["error"] = True
+
+    # Sections filled from neighbors expire together with the values they came from
+    for name, (result, fetched_at) in (derived or {}).items():
+        data[name] = result
+        sources[name] = {
+            "fetched_at": fetched_at,
+            "ttl_seconds": section_ttl(name, ttl_seconds),
+            "version": versions[name],
+            "derived_from": result["derived_from"]["cells"]
+        }
+
+    # Extract humidity from weather data for backward compatibility
+    weather = data.get("weather")
+    humidity = None
+    if weather and not weather.get("error"):
+        humidity = {
+            "source": weather.get("source"),
+            "humidity": weather.get("humidity"),
+            "timestamp": weather.get("timestamp")
         }
+    data["humidity"] = humidity
+
+    # News is refreshed on its own schedule, keep what the scheduler stored
+    news = previous.get("news") or {"source": "disabled", "articles": [], "note": "News temporarily disabled for testing"}
+
+    return {
+        "h3_cell": h3_cell,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "last_updated": now,
+        "location": location,
+        "version": CURRENT_DATA_VERSION,
+        "adapter_versions": {name: section_version(name, meta) for name, meta in sorted(sources.items())},
+        "data": data,
+        "sources": sources,
+        "news": news
+    }
+
+def last_good(name, value, meta, ttl_seconds, now):
+    """
+    When the stored value of a section was last fetched successfully, if it may
+    stand in for a failed fetch; None if it is missing, failed, from an older
+    adapter version or too old.
+    """
+    if not isinstance(value, dict) or value.get("error") or not meta.get("fetched_at") or not is_current(name, meta):
+        return None
+    if meta.get("error") and not meta.get("last_good_at"):
+        return None
+    fetched_at = meta.get("last_good_at") or meta["fetched_at"]
+    if now - fetched_at > max(LAST_GOOD_MAX_AGE_SECONDS, section_ttl(name, ttl_seconds)):
+        return None
+    return fetched_at
+
+def cached_response_body(record, key, lat, lon, rate_limit, cache_status):
+    """
+    Serialized response body for a stored record, refreshing its news if they have expired.
+
+    With current news the record's JSON is taken from the memory cache (as
+    stored, or encoded once per entry) and the per-request fields are spliced
+    in, so a hit neither decodes nor encodes the cell payload.
+
+    Returns:
+        tuple: (body, served) where served is the record version in the body,
+            for the response's validators
+    """
+    envelope = {"rate_limit": rate_limit, "cache_status": cache_status}
+    h3_cell = record.get("h3_cell")
+    if not news_expired(record):
+        print(f"[INFO] Using cached news for h3_cell: {h3_cell}")
+        return splice_json(cell_cache.payload(key, record, cell_payload), envelope), record
+
+    # Usually another cell of the same place has refreshed them already
+    print(f"[INFO] News cache expired, refreshing news for h3_cell: {h3_cell}")
+    body = dict(record)  # cached records are shared, never mutate them in place
+    fetched_at = body['news'].get('fetched_at')
+    location = body.get('location') or 'Unknown'
+    try:
+        news = get_news(location, lat, lon)
+        body['news'] = news
+        if news.get('fetched_at') and news['fetched_at'] != fetched_at:
+            etag, size = write_cell(key, body)
+            cell_cache.put(key, dict(body), size, BASE_TTL_SECONDS, etag)
+    except Exception as e:
+        print(f"[ERROR] News fetch failed: {e}")
+        body['news'] = {"source": "openai", "error": str(e), "articles": []}
+
+    served = dict(body)
+    body.update(envelope)
+    return json.dumps(body), served
+
+def news_expired(record):
+    fetched_at = (record.get('news') or {}).get('fetched_at')
+    if not fetched_at:
+        return False
+    try:
+        return datetime.fromisoformat(fetched_at).timestamp() < time.time() - NEWS_TTL_SECONDS
+    except Exception:
+        return False
+
+def cell_payload(record):
+    """JSON of a record without the per-response fields, as UTF-8 bytes"""
+    return json.dumps({name: value for name, value in record.items() if name not in TRANSIENT_KEYS}).encode("utf-8")
+
+def splice_json(payload, envelope):
+    """
+    Add the fields of `envelope` to the JSON object in `payload` without decoding it.
+
+    Args:
+        payload (bytes): A serialized JSON object without the envelope's keys
+        envelope (dict): Small per-response fields
+
+    Returns:
+        str: The combined JSON object
+    """
+    head = payload.rstrip()
+    if not envelope:
+        return head.decode("utf-8")
+    fields = json.dumps(envelope)[1:]
+    if head == b"{}":
+        return "{" + fields
+    return head[:-1].decode("utf-8") + ", " + fields
+
+def cell_etag(record):
+    """
+    Weak ETag of a stored cell version.
+
+    Derived from the fields that change whenever the record is rewritten (the
+    same ones the freshness manifest tracks), so it is equal for every response
+    built from one version, whichever cache served it. Weak because the
+    per-request rate_limit and cache_status fields still differ.
+    """
+    news = record.get("news") or {}
+    version = f'{record.get("h3_cell")}:{record.get("version")}:{record.get("last_updated")}:{news.get("fetched_at") or ""}'
+    return f'W/"{hashlib.sha1(version.encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+def remaining_ttl(record, tier_ttl, now=None):
+    """Seconds until the first section (or the news) of a record goes stale for the caller's tier"""
+    now = now or time.time()
+    sources = record.get("sources") or {}
+    expiries = []
+    for name in SOURCE_FETCHERS:
+        meta = sources.get(name) or {}
+        expiries.append((meta.get("fetched_at") or 0) + section_ttl(name, tier_ttl, meta.get("error", False)))
+    news = record.get("news") or {}
+    if news.get("fetched_at"):
+        expiries.append(fetched_at_unix(news) + NEWS_TTL_SECONDS)
+    return max(0, int(min(expiries) - now))
+
+def cache_headers(record, tier_ttl):
+    """ETag, Cache-Control and Expires for a response built from `record`"""
+    max_age = remaining_ttl(record, tier_ttl)
+    return {
+        "ETag": cell_etag(record),
+        # private: the body carries the caller's rate limit
+        "Cache-Control": f"private, max-age={max_age}",
+        "Expires": formatdate(time.time() + max_age, usegmt=True),
+        "Access-Control-Expose-Headers": "ETag"
+    }
+
+def request_header(headers, name):
+    """Case-insensitive header lookup; clients and proxies differ in casing"""
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def is_not_modified(record, headers):
+    """True if the client already holds the version of `record` it would be served"""
+    if news_expired(record):
+        return False  # the response would carry refreshed news
+    return etag_matches(request_header(headers, "if-none-match"), cell_etag(record))
+
+def load_refreshed_cell(key, since):
+    """The stored record if it was rewritten after `since`, else None."""
+    probe = probe_cell(key)
+    if probe is None or (probe["last_updated"] or 0) <= since:
+        return None
+    body, etag, size = read_cell(key)
+    cell_cache.put(key, body, size, BASE_TTL_SECONDS, etag)
+    return body
+
+def load_cached_cell(key, h3_cell, ttl_seconds, grace_seconds=0):
+    """
+    Return (record, source, stale) for a cached cell.
+
+    record is None when nothing reusable is stored. Otherwise `stale` lists the
+    sections past their own TTL, an empty list being a full hit. Stale cells are
+    detected from object metadata (HEAD) or a conditional GET against the local
+    copy, so a cell with nothing worth reusing (every section expired for more
+    than `grace_seconds`) is never downloaded.
+    """
+    expired_at = time.time() - grace_seconds
+    # Warm containers answer hot cells from memory without an S3 round trip
+    body = cell_cache.get(key, ttl_seconds)
+    source = "memory"
+    if body is None:
+        source = "S3"
+        local, local_etag = cell_cache.peek(key)
+        if local is not None and local_etag is not None:
+            # Our copy is too old for this tier; only download if someone rewrote it
+            body, etag, size, payload = read_cell_payload(key, if_none_match=local_etag)
+            if body is None:
+                body, etag = local, None
+        else:
+            probe = probe_cell(key)
+            if probe is None and TILES_ENABLED:
+                return load_packed_cell(key, h3_cell, ttl_seconds, grace_seconds)
+            if probe is None:
+                print(f"[INFO] Cache MISS - No cached data found for h3_cell: {h3_cell}")
+                return None, None, list(SOURCE_FETCHERS)
+            if probe["version"] is not None and probe["version"] < CURRENT_DATA_VERSION:
+                print(f"[INFO] Cache MISS - Old version detected for h3_cell: {h3_cell} (cached: {probe['version']}, current: {CURRENT_DATA_VERSION})")
+                return None, None, list(SOURCE_FETCHERS)
+            if probe["sources"] is not None and len(stale_sources(probe["sources"], ttl_seconds, expired_at)) == len(SOURCE_FETCHERS):
+                print(f"[INFO] Cache MISS - Data stale for h3_cell: {h3_cell} (from metadata)")
+                return None, None, list(SOURCE_FETCHERS)
+            body, etag, size, payload = read_cell_payload(key)
+
+        cached_version = body.get("version", 0)
+        if cached_version < CURRENT_DATA_VERSION:
+            print(f"[INFO] Cache MISS - Old version detected for h3_cell: {h3_cell} (cached: {cached_version}, current: {CURRENT_DATA_VERSION})")
+            return None, None, list(SOURCE_FETCHERS)
+        if etag:
+            # The stored JSON is kept so hits can splice it instead of re-encoding
+            clean = payload is not None and not any(name in body for name in TRANSIENT_KEYS)
+            cell_cache.put(key, body, size, BASE_TTL_SECONDS, etag, payload if clean else None)
+
+    stale = stale_sources(body.get("sources") or {}, ttl_seconds)
+    if len(stale) == len(SOURCE_FETCHERS):
+        print(f"[INFO] Cache MISS - Data stale for h3_cell: {h3_cell}")
+    return body, source, stale
+
+def load_packed_cell(key, h3_cell, ttl_seconds, grace_seconds=0):
+    """load_cached_cell for a cell that only exists in its parent tile."""
+    entry = tile_entry(h3_cell)
+    if entry is None:
+        print(f"[INFO] Cache MISS - No cached data found for h3_cell: {h3_cell}")
+        return None, None, list(SOURCE_FETCHERS)
+    if (entry["version"] or 0) < CURRENT_DATA_VERSION:
+        print(f"[INFO] Cache MISS - Old version detected for h3_cell: {h3_cell} in tile")
+        return None, None, list(SOURCE_FETCHERS)
+    if len(stale_sources(entry["sources"] or {}, ttl_seconds, time.time() - grace_seconds)) == len(SOURCE_FETCHERS):
+        print(f"[INFO] Cache MISS - Data stale for h3_cell: {h3_cell} (from tile index)")
+        return None, None, list(SOURCE_FETCHERS)
+
+    body, size = read_tile_cell(h3_cell)
+    if body is None:
+        return None, None, list(SOURCE_FETCHERS)
+    cell_cache.put(key, body, size, BASE_TTL_SECONDS)
+    return body, "tile", stale_sources(body.get("sources") or {}, ttl_seconds)
+
+def prefetch_tiles(cells):
+    """
+    Warm the memory cache for a batch from tiles, one ranged GET per tile.
 
+    Only cells the container does not hold yet are read. Where compaction
+    keeps the individual objects, a cell rewritten since it was packed has a
+    newer one, so tile copies older than it are not cached. Where it deletes
+    them the tile is trusted without a HEAD per cell; a cell written since is
+    packed by the next compaction. Records keep no ETag, so a later miss on
+    them goes back through the tile.
+    """
+    by_tile = {}
+    for h3_cell in cells:
+        if cell_cache.peek(cell_key(h3_cell))[0] is None:
+            by_tile.setdefault(tile_of(h3_cell), []).append(h3_cell)
+
+    def read(item):
         try:
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=key,
-                Body=json.dumps(enriched),
-                ContentType="application/json",
-                Metadata={"last_updated": str(enriched["last_updated"])},
-                CacheControl=f"max-age={TTL_SECONDS}"
-            )
-            print(f"[INFO] Successfully saved data to S3")
+            return read_tile_cells(*item)
         except Exception as e:
-            print(f"[ERROR] Failed to save to S3: {e}")
-            return error_response(500, f"Failed to save data: {str(e)}", origin)
+            print(f"[ERROR] Reading tile {item[0]} failed: {e}")
+            return {}
 
-        return success_response(enriched, origin)
-    except Exception as e:
-        print(f"[ERROR] Unexpected error in data generation: {e}")
-        return error_response(500, f"Internal server error: {str(e)}", origin)
+    packed = {}
+    for records in _batch_executor.map(read, by_tile.items()):
+        for h3_cell, (record, size) in records.items():
+            if record.get("version", 0) >= CURRENT_DATA_VERSION:
+                packed[h3_cell] = (record, size)
+
+    def superseded(h3_cell):
+        if packed_cells_deleted(tile_of(h3_cell)):
+            return False
+        try:
+            probe = probe_cell(cell_key(h3_cell))
+        except Exception as e:
+            print(f"[ERROR] Probing {h3_cell} failed: {e}")
+            return True
+        return probe is not None and (probe["last_updated"] or 0) > (packed[h3_cell][0].get("last_updated") or 0)
+
+    prefetched = set()
+    for h3_cell, newer in zip(list(packed), _batch_executor.map(superseded, list(packed))):
+        if not newer:
+            record, size = packed[h3_cell]
+            cell_cache.put(cell_key(h3_cell), record, size, BASE_TTL_SECONDS)
+            prefetched.add(h3_cell)
+    return prefetched
+
+def track_refresh_ahead(cached, stale):
+    """Metric: was a cell the scheduler refreshed ahead of expiry still fresh when requested?"""
+    if cached is not None and cached.get("refreshed_ahead_at"):
+        emit({"RefreshAheadHit": 0 if stale else 1, "RefreshAheadMiss": 1 if stale else 0})
+
+def within_grace(record, tier_ttl, grace_seconds):
+    """True if no section of the record is more than `grace_seconds` past its TTL"""
+    if record is None or grace_seconds <= 0:
+        return False
+    return not stale_sources(record.get("sources") or {}, tier_ttl, at=time.time() - grace_seconds)
+
+def section_ttl(name, tier_ttl, failed=False):
+    """TTL of one section of a cell record for the caller's tier"""
+    ttl = ADAPTERS[name]["ttl_seconds"] or tier_ttl
+    return min(ttl, ERROR_RETRY_SECONDS) if failed else ttl
+
+def stale_sources(sources, tier_ttl, at=None):
+    """
+    Names of the sections that are missing, older than their TTL (as of `at`,
+    default now) or written by an older adapter version, plus their dependents.
+    """
+    now = at or time.time()
+    stale = []
+    for name in SOURCE_FETCHERS:
+        meta = sources.get(name) or {}
+        fetched_at = meta.get("fetched_at")
+        if not fetched_at or now - fetched_at > section_ttl(name, tier_ttl, meta.get("error", False)):
+            stale.append(name)
+        elif not is_current(name, meta):
+            stale.append(name)
+    return with_dependents(stale)
+
+def ttl_for_tier(user_tier):
+    """Seconds a cell stays fresh for a user tier"""
+    return 300 if user_tier == "premium" else BASE_TTL_SECONDS
 
 def is_stale(last_updated_unix, ttl_seconds):
     try:
@@ -375,7 +981,7 @@ def handle_cors(event):
         "headers": {
             "Access-Control-Allow-Origin": origin,
             "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type,x-user-tier,x-api-key",
+            "Access-Control-Allow-Headers": "Content-Type,x-user-tier,x-api-key,If-None-Match",
             "Access-Control-Max-Age": "86400"  # 24 hours
         }
     }
@@ -394,15 +1000,34 @@ def is_valid_api_key(api_key):
     # For now, we'll accept any non-empty key
     return True
 
-def success_response(body, origin=None):
+def rate_limit_headers(user_tier, remaining, reset_time):
+    """X-RateLimit-* headers for the budget left after this request"""
+    return {
+        "X-RateLimit-Limit": str(RATE_LIMITS.get(user_tier, RATE_LIMITS['free'])),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset_time)
+    }
+
+def success_response(body, origin=None, extra_headers=None):
     """Return success response with CORS headers"""
-    headers = {"Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json", **(extra_headers or {})}
     if origin and is_allowed_origin(origin):
         headers["Access-Control-Allow-Origin"] = origin
     return {
         "statusCode": 200,
         "headers": headers,
-        "body": json.dumps(body)
+        "body": body if isinstance(body, str) else json.dumps(body)
+    }
+
+def not_modified_response(record, tier_ttl, origin=None, extra_headers=None):
+    """304 without a body: the client's copy of the cell is current"""
+    headers = {**cache_headers(record, tier_ttl), **(extra_headers or {})}
+    if origin and is_allowed_origin(origin):
+        headers["Access-Control-Allow-Origin"] = origin
+    return {
+        "statusCode": 304,
+        "headers": headers,
+        "body": ""
     }
 
 def error_response(code, message, origin=None):
@@ -0,0 +1,30 @@
+import json
+import time
+
+NAMESPACE = "HealthExposure"
+
+
+def emit(metrics, dimensions=None, unit="Count"):
+    """
+    Print metrics in CloudWatch Embedded Metric Format.
+
+    CloudWatch Logs extracts them as custom metrics, no API call is made.
+
+    Args:
+        metrics (dict): Metric name -> value
+        dimensions (dict, optional): Dimension name -> value
+        unit (str): CloudWatch unit for all metrics in this record
+    """
+    dimensions = dimensions or {}
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics]
+            }]
+        },
+        **dimensions,
+        **metrics
+    }))
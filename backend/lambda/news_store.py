@@ -0,0 +1,189 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from aws_clients import error_code, s3_client
+from adapters.newsdata import fetch_local_health_news
+from single_flight import acquire_refresh, release_refresh, wait_for_refresh
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# News depend only on the place name, which dozens of cells share. They are
+# stored once per normalized location and language in `news/{language}/{slug}.json`;
+# cells keep a copy with the `location_key` it came from.
+NEWS_TTL_SECONDS = 43200  # 12 hours
+NEWS_CACHE_MAX_ENTRIES = int(os.environ.get("NEWS_CACHE_MAX_ENTRIES", "2000"))
+NEWS_WAIT_SECONDS = 30  # how long a concurrent caller in this container waits for an in-flight fetch
+
+_memory = OrderedDict()  # location key -> news
+_inflight = {}  # location key -> Future shared by concurrent callers
+_lock = threading.Lock()
+
+
+def normalize_location(location):
+    """"Helsinki, Finland" -> "helsinki-finland"; accents folded, punctuation dropped."""
+    folded = unicodedata.normalize("NFKD", location).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^a-z0-9]+", "-", folded.casefold()).strip("-")
+    if not slug:
+        # Names without a Latin transliteration keep their own characters
+        slug = re.sub(r"\W+", "-", location.casefold()).strip("-")
+    return slug
+
+
+def location_key(location, language="en"):
+    return f"news/{language}/{normalize_location(location)}.json"
+
+
+def news_location(location, lat, lon):
+    """The place name news are asked for; "Unknown" or empty falls back to coordinates."""
+    if not location or location == "Unknown":
+        return f"{lat:.2f},{lon:.2f}"
+    return location
+
+
+def fetched_at_unix(news):
+    try:
+        return datetime.fromisoformat(news["fetched_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+def get_news(location, lat, lon, language="en", max_age=NEWS_TTL_SECONDS, fetch=fetch_local_health_news):
+    """
+    Health news for a location, shared by every cell with that place name.
+
+    Looks in memory, then in the `news/` store, and calls OpenAI only when both
+    are older than `max_age`. Concurrent callers in a container share one
+    fetch; across containers a lease lets one invocation fetch while the others
+    serve the stored copy (or wait briefly if there is none).
+
+    Args:
+        location (str): Place name of the cell; "Unknown" or empty falls back to coordinates
+        lat (float): Latitude passed to the news prompt
+        lon (float): Longitude passed to the news prompt
+        language (str): Language of the articles
+        max_age (int): Seconds stored news stay usable
+        fetch (callable): fetch(lat, lon, location, language), the OpenAI call
+
+    Returns:
+        dict: News with source, fetched_at, articles and location_key; on
+            failure the stale copy if any, else a news dict with an error
+    """
+    location = news_location(location, lat, lon)
+    key = location_key(location, language)
+
+    with _lock:
+        news = _memory.get(key)
+        if news is not None and time.time() - fetched_at_unix(news) <= max_age:
+            _memory.move_to_end(key)
+            return news
+
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+
+    if not owner:
+        try:
+            return future.result(timeout=NEWS_WAIT_SECONDS)
+        except Exception as e:
+            print(f"[ERROR] Waiting for news of {location} failed: {e}")
+            return _error_news(key, str(e))
+
+    news = None
+    try:
+        news = _lookup(key, location, lat, lon, language, max_age, fetch)
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_result(news)
+    return news
+
+
+def peek_news(location, language="en"):
+    """Stored news of a location from memory or the store, without fetching; None if there are none."""
+    key = location_key(location, language)
+    with _lock:
+        news = _memory.get(key)
+    if news is not None:
+        return news
+    news = _read(key)
+    if news is not None:
+        _remember(key, news)
+    return news
+
+
+def put_news(location, language, news):
+    """Store news fetched elsewhere (e.g. a batched request) for a location."""
+    key = location_key(location, language)
+    news = dict(news, location_key=key)
+    _write(key, news)
+    _remember(key, news)
+    return news
+
+
+def _lookup(key, location, lat, lon, language, max_age, fetch):
+    stored = _read(key)
+    if stored is not None and time.time() - fetched_at_unix(stored) <= max_age:
+        _remember(key, stored)
+        return stored
+
+    lease = acquire_refresh(key)
+    if lease is None:
+        # Another invocation is fetching this location
+        if stored is not None:
+            return stored
+        refreshed = wait_for_refresh(lambda: _read(key))
+        return refreshed if refreshed is not None else _error_news(key, "News refresh in progress")
+
+    try:
+        try:
+            news = dict(fetch(lat, lon, location, language))
+        except Exception as e:
+            print(f"[ERROR] News fetch for {location} failed: {e}")
+            news = _error_news(key, str(e))
+        news["location_key"] = key
+        if news.get("error"):
+            # Keep serving the last good articles rather than an empty list
+            return stored if stored is not None else news
+        _write(key, news)
+        _remember(key, news)
+        print(f"[INFO] Fetched news for {location} ({language})")
+        return news
+    finally:
+        release_refresh(key, lease)
+
+
+def _error_news(key, error):
+    return {"source": "openai", "error": error, "articles": [], "location_key": key}
+
+
+def _remember(key, news):
+    with _lock:
+        _memory[key] = news
+        _memory.move_to_end(key)
+        while len(_memory) > NEWS_CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _read(key):
+    try:
+        response = s3_client().get_object(Bucket=BUCKET_NAME, Key=key)
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except Exception as e:
+        if error_code(e) not in ("NoSuchKey", "404"):
+            print(f"[ERROR] Reading {key} failed: {e}")
+    return None
+
+
+def _write(key, news):
+    try:
+        s3_client().put_object(Bucket=BUCKET_NAME, Key=key, Body=json.dumps(news), ContentType="application/json")
+    except Exception as e:
+        print(f"[ERROR] Saving {key} failed: {e}")
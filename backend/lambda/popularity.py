@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from aws_clients import error_code, s3_client
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# Per-cell access counts, batched per container and merged by the scheduler
+# into a decayed popularity score.
+#
+#   popularity/log/{id}.tsv     "h3_cell<TAB>count" lines flushed by the API
+#   popularity/snapshot.tsv     "#scored_at<TAB>unix" header, then "h3_cell<TAB>score"
+SNAPSHOT_KEY = "popularity/snapshot.tsv"
+LOG_PREFIX = "popularity/log/"
+POPULARITY_FLUSH_SECONDS = 60
+POPULARITY_FLUSH_CELLS = 500  # flush early when this many distinct cells are buffered
+POPULARITY_HALF_LIFE_SECONDS = 6 * 3600  # yesterday's hot cells cool down overnight
+POPULARITY_MAX_TRACKED = 10000
+
+CONTAINER_ID = uuid.uuid4().hex
+
+_counts = Counter()
+_counts_since = None
+_lock = threading.Lock()
+_flushing = False
+
+
+def record_access(h3_cell):
+    """Count one request for a cell; no storage call unless a flush is due."""
+    global _counts_since
+    with _lock:
+        _counts[h3_cell] += 1
+        if _counts_since is None:
+            _counts_since = time.time()
+        due = len(_counts) >= POPULARITY_FLUSH_CELLS or time.time() - _counts_since >= POPULARITY_FLUSH_SECONDS
+    if due:
+        _flush_in_background()
+
+
+def flush():
+    """Write buffered counts as one log segment."""
+    global _counts, _counts_since
+    with _lock:
+        counts, _counts, _counts_since = _counts, Counter(), None
+    if not counts:
+        return
+    body = "".join(f"{h3_cell}\t{count}\n" for h3_cell, count in counts.items())
+    try:
+        s3_client().put_object(Bucket=BUCKET_NAME, Key=f"{LOG_PREFIX}{time.time_ns()}-{CONTAINER_ID}.tsv", Body=body)
+    except Exception as e:
+        print(f"[ERROR] Writing popularity counts failed: {e}")
+        with _lock:
+            _counts.update(counts)
+            _counts_since = _counts_since or time.time()
+
+
+def _flush_in_background():
+    global _flushing
+    with _lock:
+        if _flushing:
+            return
+        _flushing = True
+
+    def run():
+        global _flushing
+        try:
+            flush()
+        finally:
+            _flushing = False
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def hot_cells(limit):
+    """
+    Merge new access counts into the decayed scores and return the hottest cells.
+
+    Consumed log segments are deleted; the snapshot keeps the
+    POPULARITY_MAX_TRACKED highest scores.
+
+    Returns:
+        list: (h3_cell, score) pairs, hottest first, at most `limit`
+    """
+    now = time.time()
+    scores, scored_at = _read_snapshot()
+    decay = 0.5 ** ((now - scored_at) / POPULARITY_HALF_LIFE_SECONDS) if scored_at else 1.0
+    scores = Counter({h3_cell: score * decay for h3_cell, score in scores.items()})
+
+    paginator = s3_client().get_paginator("list_objects_v2")
+    segments = [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=LOG_PREFIX)
+        for obj in page.get("Contents", [])
+    ]
+    for key in segments:
+        body = s3_client().get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read().decode("utf-8")
+        for line in body.splitlines():
+            h3_cell, _, count = line.partition("\t")
+            try:
+                scores[h3_cell] += int(count)
+            except ValueError:
+                continue
+
+    ranked = scores.most_common(POPULARITY_MAX_TRACKED)
+    lines = [f"#scored_at\t{int(now)}"] + [f"{h3_cell}\t{score:.3f}" for h3_cell, score in ranked]
+    s3_client().put_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY, Body="\n".join(lines) + "\n")
+    for key in segments:
+        try:
+            s3_client().delete_object(Bucket=BUCKET_NAME, Key=key)
+        except Exception as e:
+            print(f"[ERROR] Deleting popularity segment {key} failed: {e}")
+    return ranked[:limit]
+
+
+def _read_snapshot():
+    try:
+        body = s3_client().get_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY)["Body"].read().decode("utf-8")
+    except Exception as e:
+        if error_code(e) in ("NoSuchKey", "404"):
+            return {}, None
+        raise
+
+    scores, scored_at = {}, None
+    for line in body.splitlines():
+        name, _, value = line.partition("\t")
+        try:
+            if name == "#scored_at":
+                scored_at = int(value)
+            elif name:
+                scores[name] = float(value)
+        except ValueError:
+            continue
+    return scores, scored_at
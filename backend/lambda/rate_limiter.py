@@ -1,10 +1,13 @@
-import boto3
+import hashlib
 import json
+import math
+import threading
 import time
 import os
-from datetime import datetime, timedelta
+import uuid
+from array import array
+from aws_clients import error_code, http_status, s3_client
 
-s3 = boto3.client("s3")
 BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
 
 # Rate limits per hour
@@ -12,65 +15,276 @@ RATE_LIMITS = {
     'free': 100,
     'premium': 1000
 }
+WINDOW_SECONDS = 3600
 
 # Rate limit data expires after 2 hours (to be safe)
 RATE_LIMIT_TTL = 7200  # 2 hours in seconds
 
-def check_rate_limit(user_tier):
+# Persisted counters are split over N shard objects per client and window so
+# containers rarely contend on the same object
+SHARD_COUNT = int(os.environ.get("RATE_LIMIT_SHARDS", "8"))
+# How often a container flushes its local counts and learns everyone else's
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("RATE_LIMIT_RECONCILE_SECONDS", "10"))
+
+# Upper bound on clients tracked per container (8 bytes of state per slot)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+
+CONTAINER_ID = uuid.uuid4().hex
+
+
+class SlidingWindowTable:
+    """
+    GCRA (generic cell rate algorithm) state for many clients in flat arrays.
+
+    GCRA is a sliding window without a request log: each key keeps a single
+    "theoretical arrival time" (TAT). A request is admitted when it would not
+    push the TAT more than a window ahead of now, so there are no window edges
+    to burst across. State is one float per key in a preallocated array plus
+    a key -> slot dict, so memory is bounded by `capacity`; when the table is
+    full a clock hand reclaims a slot whose key is back at its full budget,
+    or else the oldest slot under the hand.
+    """
+
+    def __init__(self, capacity=RATE_LIMIT_MAX_KEYS, window_seconds=WINDOW_SECONDS):
+        self.capacity = capacity
+        self.window = window_seconds
+        self._slots = {}  # key -> slot index
+        self._keys = [None] * capacity
+        self._tat = array("d", bytes(8 * capacity))
+        self._hand = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, key, now):
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        if len(self._slots) < self.capacity:
+            slot = len(self._slots)
+        else:
+            slot = self._reclaim(now)
+            del self._slots[self._keys[slot]]
+            self.evictions += 1
+        self._slots[key] = slot
+        self._keys[slot] = key
+        self._tat[slot] = now
+        return slot
+
+    def _reclaim(self, now):
+        for _ in range(min(self.capacity, 64)):
+            slot = self._hand
+            self._hand = (self._hand + 1) % self.capacity
+            if self._tat[slot] <= now:
+                return slot
+        return self._hand
+
+    def check(self, key, limit, now):
+        """Admit one request. Returns (allowed, remaining, reset_time)."""
+        interval = self.window / limit
+        tolerance = self.window - interval
+        slot = self._slot(key, now)
+        tat = max(self._tat[slot], now)
+
+        if tat - now > tolerance:
+            # Denied: the next request fits once the TAT is back within tolerance
+            return False, 0, int(tat - tolerance) + 1
+
+        tat += interval
+        self._tat[slot] = tat
+        remaining = min(limit, math.floor((tolerance - (tat - now)) / interval) + 1)
+        return True, max(0, remaining), int(tat) + 1
+
+    def consume(self, key, limit, count, now):
+        """Charge requests admitted elsewhere (other containers) to a key."""
+        interval = self.window / limit
+        slot = self._slot(key, now)
+        self._tat[slot] = min(max(self._tat[slot], now) + count * interval, now + self.window)
+
+
+class InMemoryCounterBackend:
+    """Sharded counters kept in process memory, for tests and local runs."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, window, client, shard, count):
+        with self._lock:
+            key = (window, client, shard)
+            self._counts[key] = self._counts.get(key, 0) + count
+
+    def total(self, window, client):
+        with self._lock:
+            return sum(n for (w, c, _), n in self._counts.items() if w == window and c == client)
+
+
+class S3CounterBackend:
+    """
+    Sharded counters as objects `rate-limits/{window}/{client}/{shard}.json`.
+
+    Each flush is a conditional read-modify-write of one shard, so concurrent
+    containers never lose counts; the total is the sum over all shards.
+    """
+
+    def __init__(self, client=None, bucket=BUCKET_NAME, shard_count=SHARD_COUNT, max_attempts=3):
+        self._client = client
+        self.bucket = bucket
+        self.shard_count = shard_count
+        self.max_attempts = max_attempts
+
+    @property
+    def client(self):
+        return self._client or s3_client()
+
+    def _key(self, window, client, shard):
+        return f"rate-limits/{window}/{client}/{shard}.json"
+
+    def _read(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if error_code(e) in ("NoSuchKey", "404"):
+                return 0, None
+            raise
+        data = json.loads(response["Body"].read().decode("utf-8"))
+        return int(data.get("count", 0)), response.get("ETag")
+
+    def add(self, window, client, shard, count):
+        key = self._key(window, client, shard)
+        for _ in range(self.max_attempts):
+            current, etag = self._read(key)
+            body = json.dumps({
+                "count": current + count,
+                "window": window,
+                "updated_at": int(time.time()),
+                "expires_at": window + RATE_LIMIT_TTL
+            })
+            condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+            try:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType="application/json", **condition)
+                return
+            except Exception as e:
+                status = http_status(e)
+                if status not in (409, 412):
+                    raise
+        raise RuntimeError(f"Could not update rate limit shard {key}")
+
+    def total(self, window, client):
+        return sum(self._read(self._key(window, client, shard))[0] for shard in range(self.shard_count))
+
+
+class RateLimiter:
+    """
+    Per-client rate limiting with no storage calls on the request path.
+
+    Requests are admitted by an in-container sliding window per client and
+    tier (SlidingWindowTable). Every RECONCILE_INTERVAL_SECONDS a background
+    thread flushes the local counts to this container's counter shard and
+    charges each client with what the other containers admitted since the
+    last reconciliation.
+    """
+
+    def __init__(self, backend, limits=RATE_LIMITS, shard_count=SHARD_COUNT,
+                 reconcile_interval=RECONCILE_INTERVAL_SECONDS, background=True,
+                 max_keys=RATE_LIMIT_MAX_KEYS):
+        self.backend = backend
+        self.limits = limits
+        self.shard = int(hashlib.sha256(CONTAINER_ID.encode()).hexdigest(), 16) % shard_count
+        self.reconcile_interval = reconcile_interval
+        self.background = background
+        self._windows = SlidingWindowTable(max_keys)
+        self._pending = {}  # (client, tier) -> requests not yet flushed
+        self._active = set()  # (client, tier) seen since the last reconciliation
+        self._flushed = {}  # (window, client, tier) -> requests this container flushed
+        self._others = {}  # (window, client, tier) -> last seen count of other containers
+        self._lock = threading.Lock()
+        self._reconciling = False
+        self._last_reconcile = time.time()
+
+    def limit(self, tier):
+        return self.limits.get(tier, self.limits['free'])
+
+    def check(self, client, tier):
+        """Returns (allowed: bool, remaining: int, reset_time: int)"""
+        now = time.time()
+        with self._lock:
+            result = self._windows.check((client, tier), self.limit(tier), now)
+            self._active.add((client, tier))
+            if result[0]:
+                self._pending[(client, tier)] = self._pending.get((client, tier), 0) + 1
+
+        if now - self._last_reconcile >= self.reconcile_interval:
+            self._schedule_reconcile()
+        return result
+
+    def _schedule_reconcile(self):
+        with self._lock:
+            if self._reconciling:
+                return
+            self._reconciling = True
+            self._last_reconcile = time.time()
+        if self.background:
+            threading.Thread(target=self.reconcile, daemon=True).start()
+        else:
+            self.reconcile()
+
+    def reconcile(self):
+        """Flush local counts and account for other containers' usage."""
+        try:
+            window = int(time.time() / WINDOW_SECONDS) * WINDOW_SECONDS
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                clients, self._active = self._active, set()
+
+            for (client, tier), count in pending.items():
+                try:
+                    self.backend.add(window, f"{tier}-{client}", self.shard, count)
+                    key = (window, client, tier)
+                    self._flushed[key] = self._flushed.get(key, 0) + count
+                except Exception as e:
+                    print(f"Rate limit flush error: {e}")
+                    with self._lock:
+                        self._pending[(client, tier)] = self._pending.get((client, tier), 0) + count
+
+            for client, tier in clients:
+                key = (window, client, tier)
+                try:
+                    others = self.backend.total(window, f"{tier}-{client}") - self._flushed.get(key, 0)
+                except Exception as e:
+                    print(f"Rate limit reconcile error: {e}")
+                    continue
+                delta = others - self._others.get(key, 0)
+                self._others[key] = others
+                if delta > 0:
+                    with self._lock:
+                        self._windows.consume((client, tier), self.limit(tier), delta, time.time())
+
+            # Forget bookkeeping of past windows
+            for store in (self._flushed, self._others):
+                for key in [k for k in store if k[0] < window]:
+                    del store[key]
+        finally:
+            self._reconciling = False
+
+
+def client_id(api_key):
+    """Stable, non-reversible identifier for a client, safe to use in object keys."""
+    return hashlib.sha256((api_key or "anonymous").encode("utf-8")).hexdigest()[:16]
+
+
+limiter = RateLimiter(S3CounterBackend())
+
+
+def check_rate_limit(user_tier, api_key=None):
     """
     Check if the current request has exceeded the rate limit.
     Returns (allowed: bool, remaining: int, reset_time: int)
     """
     try:
-        # Get current hour timestamp
-        current_hour = int(time.time() / 3600) * 3600
-        key = f"rate-limits/{current_hour}.json"
-        
-        try:
-            # Try to get existing record
-            response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-            data = json.loads(response["Body"].read().decode("utf-8"))
-            
-            # Check if data is expired
-            if data.get("expires_at", 0) < time.time():
-                count = 0
-            else:
-                count = data.get("count", 0)
-            
-            # Validate count is a reasonable number
-            if not isinstance(count, int) or count < 0 or count > 1000000:
-                print(f"Invalid count value: {count}")
-                count = 0
-                
-        except s3.exceptions.NoSuchKey:
-            count = 0
-            
-        # Check against rate limit
-        limit = RATE_LIMITS.get(user_tier, RATE_LIMITS['free'])
-        remaining = max(0, limit - count)
-        allowed = count < limit
-        
-        # Update count if allowed
-        if allowed:
-            expires_at = int(time.time() + RATE_LIMIT_TTL)
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=key,
-                Body=json.dumps({
-                    "count": count + 1,
-                    "hour": current_hour,
-                    "updated_at": int(time.time()),
-                    "expires_at": expires_at
-                }),
-                ContentType="application/json"
-            )
-            
-        # Calculate reset time (next hour)
-        reset_time = current_hour + 3600
-        
-        return allowed, remaining, reset_time
-        
+        return limiter.check(client_id(api_key), user_tier)
     except Exception as e:
         print(f"Rate limit error: {e}")
-        # Fail open in case of S3 issues
-        return True, RATE_LIMITS.get(user_tier, RATE_LIMITS['free']), int(time.time()) + 3600 
\ No newline at end of file
+        # Fail open in case of limiter issues
+        return True, RATE_LIMITS.get(user_tier, RATE_LIMITS['free']), int(time.time()) + 3600
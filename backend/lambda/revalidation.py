@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aws_clients import client
+
+# Stale-while-revalidate: a cell past its TTL, but by no more than its tier's
+# grace window, is served from storage at once and refreshed in the background.
+STALE_GRACE_SECONDS = {
+    "free": int(os.environ.get("STALE_GRACE_SECONDS_FREE", "3600")),
+    "premium": int(os.environ.get("STALE_GRACE_SECONDS_PREMIUM", "600"))
+}
+
+# How the background refresh runs:
+#   invoke   asynchronous invocation of this function (InvocationType=Event);
+#            the default on Lambda, which freezes threads after the response
+#   thread   a worker thread in this process, for long-running servers
+#   inline   synchronously before the response is returned (local runs, tests)
+#   off      no stale serving; expired cells are refreshed on the request path
+FUNCTION_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+REVALIDATE_MODE = os.environ.get("REVALIDATE_MODE") or ("invoke" if FUNCTION_NAME else "thread")
+# A container schedules each cell at most once in this window
+REVALIDATE_DEBOUNCE_SECONDS = 30
+EVENT_KEY = "revalidate"
+
+_scheduled = {}  # h3_cell -> time the last revalidation was scheduled
+_lock = threading.Lock()
+# One worker keeps one event loop (and its pooled connections) for every refresh
+_worker = ThreadPoolExecutor(max_workers=1) if REVALIDATE_MODE == "thread" else None
+
+
+def grace_seconds(user_tier):
+    """How long past its TTL a cell may be served to this tier; 0 disables stale serving."""
+    if REVALIDATE_MODE == "off":
+        return 0
+    return STALE_GRACE_SECONDS.get(user_tier, 0)
+
+
+def is_revalidation_event(event):
+    return isinstance(event, dict) and EVENT_KEY in event
+
+
+def revalidation_event(h3_cells, user_tier):
+    return {EVENT_KEY: {"cells": list(h3_cells), "user_tier": user_tier}}
+
+
+def schedule_revalidation(h3_cells, user_tier, run):
+    """
+    Refresh cells that were served stale without blocking the caller.
+
+    Args:
+        h3_cells (list): Cells to refresh
+        user_tier (str): Tier whose TTL decides which sections are stale
+        run (callable): run(h3_cells, user_tier), the refresh itself; used by
+            the thread and inline modes, the invoke mode calls the handler
+
+    Returns:
+        list: The cells scheduled, without those already scheduled recently
+    """
+    now = time.time()
+    with _lock:
+        due = [h3_cell for h3_cell in h3_cells if now - _scheduled.get(h3_cell, 0) >= REVALIDATE_DEBOUNCE_SECONDS]
+        for h3_cell in due:
+            _scheduled[h3_cell] = now
+        if len(_scheduled) > 10000:
+            for h3_cell in [c for c, at in _scheduled.items() if now - at >= REVALIDATE_DEBOUNCE_SECONDS]:
+                del _scheduled[h3_cell]
+    if not due:
+        return []
+
+    try:
+        if REVALIDATE_MODE == "invoke":
+            client("lambda").invoke(
+                FunctionName=FUNCTION_NAME,
+                InvocationType="Event",
+                Payload=json.dumps(revalidation_event(due, user_tier)).encode("utf-8")
+            )
+        elif REVALIDATE_MODE == "thread":
+            _worker.submit(run, due, user_tier)
+        else:
+            run(due, user_tier)
+    except Exception as e:
+        print(f"[ERROR] Scheduling revalidation failed: {e}")
+        with _lock:
+            for h3_cell in due:
+                _scheduled.pop(h3_cell, None)
+        return []
+
+    print(f"[INFO] Revalidating {len(due)} cells ({REVALIDATE_MODE})")
+    return due
+
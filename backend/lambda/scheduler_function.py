@@ -1,78 +1,117 @@
+import heapq
 import json
-import boto3
 import os
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import h3
-from adapters.newsdata import fetch_local_health_news
-from adapters.opencage import reverse_geocode
+from aws_clients import s3_client
+from adapters.newsdata import fetch_health_news_batch, fetch_local_health_news
+from news_store import fetched_at_unix, get_news, news_location, peek_news, put_news
+from adapters.http_client import PROVIDER_CONCURRENCY, provider_slot
+from geocode_service import get_location_name
+from cell_store import build_metadata, cell_key, decode_sources, encode_sources, probe_cell, read_cell, write_cell
+from tile_store import TILES_ENABLED, load_tile_index, read_cell_or_tile, read_tile_cells, tile_key
+from lambda_function import CURRENT_DATA_VERSION, SOURCE_FETCHERS, refresh_cells, stale_sources, ttl_for_tier
+from single_flight import acquire_refresh, release_refresh
+from popularity import hot_cells
+from metrics import emit
+from freshness_manifest import (
+    SnapshotWriter, flush as flush_manifest, format_entry, iter_manifest, list_segments, parse_entry, snapshot_exists
+)
 
-s3 = boto3.client("s3")
 BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
 NEWS_TTL_SECONDS = 21600  # 6 hours for news
-BATCH_SIZE = 10  # Number of cells to process in one run
+# Upper bound on cells per run; the actual number is sized from the time left
+MAX_BATCH_SIZE = int(os.environ.get("SCHEDULER_MAX_CELLS", "500"))
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "8"))
+# Every cell makes one OpenAI call, so that limit caps how many cells really run at once
+CELL_PARALLELISM = min(SCHEDULER_WORKERS, PROVIDER_CONCURRENCY["openai"])
+DEADLINE_HEADROOM_MS = 5000  # stop starting cells this long before the Lambda timeout
+INITIAL_CELL_SECONDS = 8.0  # per-cell latency estimate before any cell has been timed
+LATENCY_EWMA_ALPHA = 0.3
 CHECK_INTERVAL = 900  # 15 minutes in seconds
+# Refresh-ahead: the most requested cells get their environmental data
+# refreshed when it would expire before the next run (plus a margin)
+POPULAR_CELLS = int(os.environ.get("REFRESH_AHEAD_CELLS", "50"))
+REFRESH_AHEAD_SECONDS = CHECK_INTERVAL + 300
+REFRESH_AHEAD_CHUNK = 10  # cells per combined adapter run
+# Hot cells are kept fresh for this tier's TTL
+REFRESH_AHEAD_TIER = os.environ.get("REFRESH_AHEAD_TIER", "free")
+# Locations per batched OpenAI news request; 1 fetches every location on its own
+NEWS_BATCH_SIZE = int(os.environ.get("SCHEDULER_NEWS_BATCH_SIZE", "8"))
+NEWS_BATCH_SECONDS = 30  # OpenAI timeout of a batched request
+
+# Kept across warm invocations so later runs size their batch from real latencies
+_cell_seconds = INITIAL_CELL_SECONDS
 
 def lambda_handler(event, context):
     try:
-        # List all objects in the cells/ prefix
-        paginator = s3.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=BUCKET_NAME, Prefix='cells/')
-        
-        cells_to_update = []
+        # Popularity only feeds refresh-ahead; without it the news batch still runs
+        try:
+            hot = dict(hot_cells(POPULAR_CELLS))
+        except Exception as e:
+            print(f"[ERROR] Reading popular cells failed: {e}")
+            hot = {}
+        hot_entries = {}
+
+        # Pick the cells with the oldest news from the freshness manifest. The
+        # first run (or an explicit rebuild) builds it from a scan of cells/.
+        flush_manifest()
+        segments = list_segments()
+        rebuild = bool((event or {}).get("rebuild_manifest")) or not snapshot_exists()
+        entries = scan_cells() if rebuild else iter_manifest(segments)
+
+        # The merged manifest becomes the next snapshot; it is spooled to /tmp
+        # while streaming so only the bounded heap below stays in memory
+        snapshot = SnapshotWriter() if rebuild or segments else None
         current_time = time.time()
+
+        def candidates():
+            for entry in entries:
+                if snapshot is not None:
+                    snapshot.add(entry)
+                if entry["h3_cell"] in hot:
+                    hot_entries[entry["h3_cell"]] = entry
+                # Only update if news is older than 6 hours
+                news_age = current_time - entry["news_fetched_at"] if entry["news_fetched_at"] else float('inf')
+                if news_age > NEWS_TTL_SECONDS:
+                    yield news_age, entry["h3_cell"]
+
+        # Oldest news first, only as many cells as fit in this run are kept while streaming
+        batch_size = plan_batch_size(context)
+        try:
+            oldest = heapq.nlargest(batch_size, candidates())
+            if snapshot is not None:
+                snapshot.commit(segments)
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+        cells_to_update = [cell_key(h3_cell) for _, h3_cell in oldest]
         
-        # Find cells that need updating
-        for page in pages:
-            if 'Contents' not in page:
-                continue
-                
-            for obj in page['Contents']:
-                key = obj['Key']
-                if not key.endswith('.json'):
-                    continue
-                    
-                try:
-                    response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-                    body = json.loads(response["Body"].read().decode("utf-8"))
-                    
-                    # Check if news needs updating
-                    news = body.get('news', {})
-                    fetched_at = news.get('fetched_at')
-                    
-                    if fetched_at:
-                        try:
-                            dt = datetime.fromisoformat(fetched_at)
-                            news_age = current_time - dt.timestamp()
-                            
-                            # Only update if news is older than 6 hours
-                            if news_age > NEWS_TTL_SECONDS:
-                                # Add a small random delay to stagger updates
-                                cells_to_update.append((key, news_age))
-                        except Exception:
-                            cells_to_update.append((key, float('inf')))
-                    else:
-                        cells_to_update.append((key, float('inf')))
-                        
-                except Exception as e:
-                    print(f"Error processing {key}: {e}")
-                    continue
-        
-        # Sort cells by news age (oldest first) and take only the batch size
-        cells_to_update.sort(key=lambda x: x[1], reverse=True)
-        cells_to_update = [key for key, _ in cells_to_update[:BATCH_SIZE]]
-        
+        # Popular cells first: keeping them warm matters more than news age
+        try:
+            ahead = refresh_ahead(hot_entries, context)
+        except Exception as e:
+            print(f"[ERROR] Refresh-ahead failed: {e}")
+            ahead = []
+
+        results = []
         if cells_to_update:
-            process_batch(cells_to_update)
-            print(f"Found {len(cells_to_update)} cells with news older than {NEWS_TTL_SECONDS/3600} hours")
+            print(f"Found {len(cells_to_update)} cells with news older than {NEWS_TTL_SECONDS/3600} hours (batch size {batch_size})")
+            bodies = prefetch_news(cells_to_update, context)
+            results = process_batch(cells_to_update, context, bodies)
         else:
             print("No cells need updating at this time")
-            
+
+        updated = [result["key"] for result in results if result["status"] == "updated"]
         return {
             'statusCode': 200,
             'body': json.dumps({
-                'message': f'Processed {len(cells_to_update)} cells',
-                'cells_updated': cells_to_update
+                'message': f'Processed {len(updated)} of {len(cells_to_update)} cells',
+                'cells_updated': updated,
+                'results': results,
+                'refreshed_ahead': ahead,
+                'manifest_rebuilt': rebuild
             })
         }
         
@@ -84,40 +123,277 @@ def lambda_handler(event, context):
                 'error': str(e)
             })
         }
+    finally:
+        # Cells refreshed ahead or updated in this run reach the manifest
+        # before the container is frozen
+        flush_manifest()
 
-def process_batch(cell_keys):
-    for key in cell_keys:
-        try:
-            # Get cell data
-            response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-            body = json.loads(response["Body"].read().decode("utf-8"))
-            
-            # Extract H3 cell and get lat/lon
-            h3_cell = body.get('h3_cell')
-            if not h3_cell:
+def scan_cells():
+    """
+    Manifest entries for every stored cell, from object metadata (HEAD).
+
+    With tiles enabled, cells that only exist in a tile (their individual
+    object was removed by compaction) follow, read from their tiles.
+    """
+    listed = set() if TILES_ENABLED else None
+    paginator = s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix='cells/'):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not key.endswith('.json'):
                 continue
-                
-            lat, lon = h3.cell_to_latlng(h3_cell)
-            location = body.get('location') or reverse_geocode(lat, lon)
-            
-            # Fetch new news
-            news = fetch_local_health_news(lat, lon, location)
-            
-            # Update the body with new news
-            body['news'] = news
-            body['last_updated'] = int(time.time())
-            
-            # Save back to S3
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=key,
-                Body=json.dumps(body),
-                ContentType="application/json",
-                Metadata={"last_updated": str(body["last_updated"])}
-            )
-            
-            print(f"Successfully updated news for cell {h3_cell}")
-            
+            if listed is not None:
+                listed.add(key[len('cells/'):-len('.json')])
+            try:
+                probe = probe_cell(key)
+                if probe is None:
+                    continue
+                fetched_at = probe["news_fetched_at"]
+                if fetched_at is None:
+                    # Objects written before metadata existed need the full download
+                    body, _, _ = read_cell(key)
+                    fetched_at = body.get('news', {}).get('fetched_at')
+                yield parse_entry(format_entry(key[len('cells/'):-len('.json')], {
+                    "last_updated": str(probe["last_updated"] or 0),
+                    "news_fetched_at": fetched_at,
+                    "data_version": str(probe["version"] or 0),
+                    "source_fetched_at": encode_sources(probe["sources"] or {})
+                }))
+            except Exception as e:
+                print(f"Error processing {key}: {e}")
+                continue
+    if listed is not None:
+        yield from scan_tiles(listed)
+
+def scan_tiles(listed):
+    """Manifest entries for the cells of every tile that have no individual object in `listed`."""
+    paginator = s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix='tiles/'):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not key.endswith('.bin'):
+                continue
+            tile = key[len('tiles/'):-len('.bin')]
+            try:
+                index = load_tile_index(tile)
+                packed_only = [h3_cell for h3_cell in (index[0] if index else {}) if h3_cell not in listed]
+                # One ranged GET for the tile's cells; news age is only in the bodies
+                for h3_cell, (record, _) in read_tile_cells(tile, packed_only).items():
+                    yield parse_entry(format_entry(h3_cell, build_metadata(record)))
+            except Exception as e:
+                print(f"Error processing {tile_key(tile)}: {e}")
+                continue
+
+def refresh_ahead(hot_entries, context):
+    """
+    Refresh the environmental sections of hot cells that expire before the next run.
+
+    Each cell is refreshed under its single-flight lease, so a cell that is
+    being refreshed on demand is skipped instead of fetched twice.
+
+    Returns:
+        list: h3 cells that were refreshed and saved
+    """
+    ttl_seconds = ttl_for_tier(REFRESH_AHEAD_TIER)
+    horizon = time.time() + REFRESH_AHEAD_SECONDS
+    due = []
+    for h3_cell, entry in hot_entries.items():
+        if entry["version"] < CURRENT_DATA_VERSION or stale_sources(decode_sources(entry["sources"]) or {}, ttl_seconds, at=horizon):
+            due.append(h3_cell)
+
+    refreshed_cells = []
+    for i in range(0, len(due), REFRESH_AHEAD_CHUNK):
+        left = remaining_seconds(context)
+        if left is not None and left < _cell_seconds:
+            print(f"[WARNING] No time left to refresh {len(due) - i} hot cells ahead")
+            break
+        leases = {h3_cell: acquire_refresh(h3_cell) for h3_cell in due[i:i + REFRESH_AHEAD_CHUNK]}
+        try:
+            requests = []
+            for h3_cell, lease in leases.items():
+                if lease is None:
+                    continue
+                # Re-read under the lease: the manifest may predate an on-demand refresh
+                record, _, _ = read_cell_or_tile(cell_key(h3_cell))
+                current = record if record.get("version", 0) >= CURRENT_DATA_VERSION else None
+                expiring = stale_sources(current.get("sources") or {}, ttl_seconds, at=horizon) if current else list(SOURCE_FETCHERS)
+                if not expiring:
+                    continue
+                lat, lon = h3.cell_to_latlng(h3_cell)
+                request_context = {"lat": lat, "lon": lon, "h3_cell": h3_cell, "user_tier": REFRESH_AHEAD_TIER}
+                requests.append((request_context, current, expiring))
+
+            if requests:
+                for h3_cell, (record, _, _) in refresh_cells(requests, ttl_seconds, context).items():
+                    record["refreshed_ahead_at"] = int(time.time())
+                    write_cell(cell_key(h3_cell), record, cache_control=f"max-age={ttl_seconds}")
+                    refreshed_cells.append(h3_cell)
+        except Exception as e:
+            print(f"[ERROR] Refresh-ahead failed: {e}")
+        finally:
+            for h3_cell, lease in leases.items():
+                release_refresh(h3_cell, lease)
+
+    print(f"[INFO] Refreshed {len(refreshed_cells)} of {len(due)} hot cells ahead of expiry")
+    emit({"RefreshAheadDue": len(due), "RefreshAheadRefreshed": len(refreshed_cells)})
+    return refreshed_cells
+
+def plan_batch_size(context):
+    """How many cells this run can refresh, from the time left and the observed per-cell latency."""
+    usable = remaining_seconds(context)
+    if usable is None:
+        return MAX_BATCH_SIZE
+    # At least one, so the manifest is always streamed to the end
+    return max(1, min(MAX_BATCH_SIZE, int(CELL_PARALLELISM * usable / _cell_seconds)))
+
+def remaining_seconds(context):
+    """Seconds left before the run has to stop, None without a Lambda context."""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    return (context.get_remaining_time_in_millis() - DEADLINE_HEADROOM_MS) / 1000
+
+def prefetch_news(cell_keys, context=None):
+    """
+    Fetch the news of every stale location in the batch, several locations per
+    OpenAI request, and put them in the news store.
+
+    Cells then only copy their location's news; a location missing from a
+    batched answer falls back to its own request in update_cell_news.
+
+    Returns:
+        dict: key -> cell body read on the way, reused by update_cell_news
+    """
+    def read(key):
+        try:
+            return read_cell_or_tile(key)[0]
         except Exception as e:
-            print(f"Error updating cell {key}: {e}")
-            continue 
\ No newline at end of file
+            print(f"Error reading cell {key}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=SCHEDULER_WORKERS) as executor:
+        bodies = dict(zip(cell_keys, executor.map(read, cell_keys)))
+    if NEWS_BATCH_SIZE <= 1:
+        return bodies
+
+    locations = []
+    for body in bodies.values():
+        if not body or not body.get('h3_cell') or not body.get('location'):
+            continue  # unnamed cells are geocoded and fetched one by one
+        location = news_location(body['location'], *h3.cell_to_latlng(body['h3_cell']))
+        if location in locations:
+            continue
+        stored = peek_news(location)
+        if stored is None or time.time() - fetched_at_unix(stored) > NEWS_TTL_SECONDS:
+            locations.append(location)
+    if not locations:
+        return bodies
+
+    def fetch(chunk):
+        left = remaining_seconds(context)
+        if left is not None and left < NEWS_BATCH_SECONDS:
+            return {}
+        with provider_slot("openai"):
+            return fetch_health_news_batch(chunk)
+
+    start = time.time()
+    chunks = [locations[i:i + NEWS_BATCH_SIZE] for i in range(0, len(locations), NEWS_BATCH_SIZE)]
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=PROVIDER_CONCURRENCY["openai"]) as executor:
+        for results in executor.map(fetch, chunks):
+            for location, news in results.items():
+                if not news.get('error'):
+                    put_news(location, "en", news)
+                    fetched += 1
+
+    minutes = (time.time() - start) / 60
+    per_minute = fetched / minutes if minutes > 0 else 0
+    print(f"[INFO] Batched news: {fetched} of {len(locations)} locations in {len(chunks)} requests, {per_minute:.1f} locations/minute")
+    emit({"NewsLocationsFetched": fetched, "NewsRequests": len(chunks)})
+    emit({"NewsLocationsPerMinute": round(per_minute, 1)}, unit="None")
+    return bodies
+
+def process_batch(cell_keys, context=None, bodies=None):
+    """
+    Refresh news for cells concurrently until the run's deadline.
+
+    A cell is only started while the time left covers the expected per-cell
+    latency (an EWMA over previous cells), so the run stops cleanly instead of
+    being killed mid-write. `bodies` holds cell bodies already read by prefetch_news.
+
+    Returns:
+        list: One result per cell: key, status (updated, failed, skipped or
+            unfinished), seconds and error where relevant
+    """
+    global _cell_seconds
+    results = {key: {"key": key, "status": "skipped"} for key in cell_keys}
+    pending = list(cell_keys)
+    running = {}
+
+    # Not a context manager: leaving it would wait for cells still running past the deadline
+    executor = ThreadPoolExecutor(max_workers=SCHEDULER_WORKERS)
+    while pending or running:
+        left = remaining_seconds(context)
+        while pending and len(running) < CELL_PARALLELISM and (left is None or left > _cell_seconds):
+            key = pending.pop(0)
+            running[executor.submit(update_cell_news, key, (bodies or {}).get(key))] = key
+        if not running:
+            break
+
+        done, _ = wait(running, timeout=None if left is None else max(0.1, left), return_when=FIRST_COMPLETED)
+        if not done:
+            # Out of time: report what is still running and stop waiting for it
+            for future, key in running.items():
+                results[key]["status"] = "unfinished"
+            print(f"[WARNING] Scheduler deadline reached with {len(running)} cells in flight")
+            break
+
+        for future in done:
+            key = running.pop(future)
+            result = future.result()
+            results[key] = result
+            _cell_seconds = (1 - LATENCY_EWMA_ALPHA) * _cell_seconds + LATENCY_EWMA_ALPHA * result["seconds"]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"[INFO] Per-cell latency estimate: {_cell_seconds:.2f}s")
+    return [results[key] for key in cell_keys]
+
+def limited_news_fetch(lat, lon, location, language="en"):
+    with provider_slot("openai"):
+        return fetch_local_health_news(lat, lon, location, language)
+
+def update_cell_news(key, body=None):
+    start = time.time()
+    try:
+        # Get cell data
+        if body is None:
+            body, _, _ = read_cell_or_tile(key)
+        
+        # Extract H3 cell and get lat/lon
+        h3_cell = body.get('h3_cell')
+        if not h3_cell:
+            return {"key": key, "status": "failed", "error": "Missing h3_cell", "seconds": time.time() - start}
+            
+        lat, lon = h3.cell_to_latlng(h3_cell)
+        location = body.get('location')
+        if not location:
+            # The geocoder holds an OpenCage slot around its request
+            location = get_location_name(h3_cell, lat, lon)
+        
+        # News are shared per location: only the first cell of a place calls OpenAI
+        news = get_news(location, lat, lon, max_age=NEWS_TTL_SECONDS, fetch=limited_news_fetch)
+        if news.get('error') and not news.get('articles'):
+            return {"key": key, "status": "failed", "error": news['error'], "seconds": round(time.time() - start, 3)}
+
+        # Update the body with new news
+        body['news'] = news
+        body['last_updated'] = int(time.time())
+        
+        # Save back to S3
+        write_cell(key, body)
+        
+        print(f"Successfully updated news for cell {h3_cell}")
+        return {"key": key, "status": "updated", "seconds": round(time.time() - start, 3)}
+        
+    except Exception as e:
+        print(f"Error updating cell {key}: {e}")
+        return {"key": key, "status": "failed", "error": str(e), "seconds": round(time.time() - start, 3)}
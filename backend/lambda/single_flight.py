@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+import uuid
+from aws_clients import error_code, http_status, s3_client
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# A refresh lease outlives the adapter deadline so a slow refresh is not
+# duplicated, but a crashed holder only blocks the cell briefly
+LEASE_SECONDS = 15
+# How long a request that lost the lease waits for the winner's object
+SINGLE_FLIGHT_WAIT_SECONDS = 3
+POLL_INTERVAL_SECONDS = 0.25
+# Conditional creates tried when the lease disappears between create and read
+LEASE_ACQUIRE_ATTEMPTS = 3
+
+CONTAINER_ID = uuid.uuid4().hex
+
+
+class S3LeaseStore:
+    """
+    Leases stored as small objects under `leases/`, taken with conditional writes.
+
+    A lease is created with `IfNoneMatch="*"` and deleted on release, so
+    `leases/` only holds leases in use; one left behind by a crashed holder is
+    taken over once expired with `IfMatch` on the ETag we read, so exactly one
+    writer wins.
+    """
+
+    def __init__(self, client=None, bucket=BUCKET_NAME, prefix="leases/"):
+        self._client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    @property
+    def client(self):
+        return self._client or s3_client()
+
+    def acquire(self, name, owner, ttl_seconds):
+        """Return a token if the lease was taken, None if someone else holds it."""
+        key = f"{self.prefix}{name}"
+        body = json.dumps({"owner": owner, "expires_at": time.time() + ttl_seconds})
+        for _ in range(LEASE_ACQUIRE_ATTEMPTS):
+            try:
+                return self.client.put_object(Bucket=self.bucket, Key=key, Body=body, IfNoneMatch="*")["ETag"]
+            except Exception as e:
+                if not _is_conflict(e):
+                    raise
+
+            # The lease object exists; take it over only if it has expired
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=key)
+            except Exception as e:
+                # Released between our create and read: try to create it again
+                if error_code(e) in ("NoSuchKey", "404"):
+                    continue
+                raise
+            current = json.loads(response["Body"].read().decode("utf-8"))
+            if current.get("expires_at", 0) > time.time():
+                return None
+            try:
+                return self.client.put_object(Bucket=self.bucket, Key=key, Body=body, IfMatch=response["ETag"])["ETag"]
+            except Exception as e:
+                if _is_conflict(e):
+                    return None
+                raise
+        # The lease keeps changing hands, so a refresh is clearly in progress
+        return None
+
+    def release(self, name, token):
+        """Delete the lease, unless it has already been taken over."""
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=f"{self.prefix}{name}", IfMatch=token)
+        except Exception as e:
+            if not _is_conflict(e) and error_code(e) not in ("NoSuchKey", "404"):
+                raise
+
+
+class InMemoryLeaseStore:
+    """Process-local lease store with the same semantics, for tests and local runs."""
+
+    def __init__(self):
+        self._leases = {}  # name -> (token, expires_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, name, owner, ttl_seconds):
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[1] > time.time():
+                return None
+            token = uuid.uuid4().hex
+            self._leases[name] = (token, time.time() + ttl_seconds)
+            return token
+
+    def release(self, name, token):
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] == token:
+                del self._leases[name]
+
+
+lease_store = S3LeaseStore()
+
+
+def set_lease_store(store):
+    """Swap the lease backend, e.g. for an InMemoryLeaseStore in tests."""
+    global lease_store
+    lease_store = store
+
+
+def acquire_refresh(h3_cell):
+    """Try to become the single refresher of a cell; returns a token or None."""
+    try:
+        return lease_store.acquire(f"{h3_cell}.lock", CONTAINER_ID, LEASE_SECONDS)
+    except Exception as e:
+        # Never block a refresh because the lease store is unavailable
+        print(f"[ERROR] Refresh lease for {h3_cell} failed: {e}")
+        return "unleased"
+
+
+def release_refresh(h3_cell, token):
+    if not token or token == "unleased":
+        return
+    try:
+        lease_store.release(f"{h3_cell}.lock", token)
+    except Exception as e:
+        print(f"[ERROR] Releasing refresh lease for {h3_cell} failed: {e}")
+
+
+def wait_for_refresh(is_refreshed, timeout=SINGLE_FLIGHT_WAIT_SECONDS):
+    """
+    Poll until another invocation has written the cell.
+
+    Args:
+        is_refreshed (callable): Returns the refreshed record, or None while still pending
+        timeout (float): Seconds to wait
+
+    Returns:
+        dict: The refreshed record, or None if it did not show up in time
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        try:
+            record = is_refreshed()
+        except Exception as e:
+            print(f"[ERROR] Checking for refreshed cell failed: {e}")
+            return None
+        if record is not None:
+            return record
+    return None
+
+
+def _is_conflict(error):
+    code = error_code(error)
+    status = http_status(error)
+    return code in ("PreconditionFailed", "ConditionalRequestConflict") or status in (409, 412)
@@ -0,0 +1,115 @@
+import os
+import time
+import h3
+from adapter_registry import is_current
+
+# Optional: fill slowly varying sections of a missing cell from neighbors that
+# were fetched recently instead of calling the upstream again.
+SPATIAL_REUSE_ENABLED = os.environ.get("SPATIAL_REUSE", "false").lower() == "true"
+
+# How each section may be derived from neighbors. Sections not listed (UV,
+# weather) are local and always fetched.
+#   nearest    the closest fresh neighbor's value
+#   idw        inverse distance weighted mean of numeric fields over fresh
+#              neighbors, falling back to nearest with a single neighbor
+#   unanimous  the nearest value, only if every fresh neighbor agrees on the
+#              `UNANIMOUS_FIELDS` (tap water changes at country borders)
+SPATIAL_POLICY = {
+    "air_quality": "idw",
+    "pollen": "idw",
+    "tap_water": "unanimous"
+}
+SPATIAL_RING = 1  # the 6 cells around a res 6 cell, centers ~6 km apart
+MIN_IDW_NEIGHBORS = 2
+UNANIMOUS_FIELDS = {"tap_water": ("country", "is_safe")}
+CATEGORICAL_FIELDS = {"aqi"}  # interpolated, then rounded to a valid index
+PASS_THROUGH_FIELDS = {"source", "timestamp"}  # taken from the nearest neighbor
+
+
+def neighbor_cells(h3_cell, k=SPATIAL_RING):
+    return sorted(set(h3.grid_disk(h3_cell, k)) - {h3_cell})
+
+
+def reusable_sections(names):
+    return [name for name in names if name in SPATIAL_POLICY]
+
+
+def derive_sections(h3_cell, names, neighbors, max_age):
+    """
+    Derive sections of a cell from its neighbors' stored records.
+
+    Only values a neighbor fetched itself count; derived values are never
+    chained. Each derived result carries `derived_from` with the method and
+    the cells used.
+
+    Args:
+        h3_cell (str): The cell being refreshed
+        names (list): Section names that need data
+        neighbors (dict): h3_cell -> stored record of neighboring cells
+        max_age (callable): Section name -> seconds a neighbor's value stays usable
+
+    Returns:
+        dict: name -> (result, fetched_at), fetched_at being that of the oldest
+            value used so the derived section expires with its inputs
+    """
+    origin = h3.cell_to_latlng(h3_cell)
+    now = time.time()
+    derived = {}
+    for name in reusable_sections(names):
+        candidates = []
+        for cell, record in neighbors.items():
+            value = (record.get("data") or {}).get(name)
+            meta = (record.get("sources") or {}).get(name) or {}
+            if not isinstance(value, dict) or value.get("error") or value.get("derived_from") or meta.get("error"):
+                continue
+            fetched_at = meta.get("fetched_at")
+            if not fetched_at or now - fetched_at > max_age(name) or not is_current(name, meta):
+                continue
+            distance = h3.great_circle_distance(origin, h3.cell_to_latlng(cell), unit="km")
+            candidates.append((distance, cell, value, fetched_at))
+        if not candidates:
+            continue
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        policy = SPATIAL_POLICY[name]
+        if policy == "unanimous":
+            fields = UNANIMOUS_FIELDS.get(name, ())
+            if len({tuple(value.get(f) for f in fields) for _, _, value, _ in candidates}) > 1:
+                continue
+        if policy == "idw" and len(candidates) >= MIN_IDW_NEIGHBORS:
+            result, method = interpolate(candidates), "idw"
+        else:
+            candidates = candidates[:1]
+            result, method = dict(candidates[0][2]), "nearest"
+
+        result["derived_from"] = {
+            "method": method,
+            "cells": [cell for _, cell, _, _ in candidates]
+        }
+        derived[name] = (result, min(fetched_at for _, _, _, fetched_at in candidates))
+    return derived
+
+
+def interpolate(candidates):
+    """Inverse distance weighted mean of the numeric fields of (distance, cell, value, fetched_at) candidates."""
+    nearest = candidates[0][2]
+    result = {}
+    for field in nearest:
+        if field in PASS_THROUGH_FIELDS:
+            result[field] = nearest[field]
+            continue
+        points = [
+            (1 / max(distance, 0.001) ** 2, value.get(field))
+            for distance, _, value, _ in candidates
+            if _is_number(value.get(field))
+        ]
+        if not points:
+            result[field] = nearest[field]
+            continue
+        mean = sum(weight * x for weight, x in points) / sum(weight for weight, _ in points)
+        result[field] = round(mean) if field in CATEGORICAL_FIELDS else round(mean, 2)
+    return result
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
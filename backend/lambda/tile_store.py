@@ -0,0 +1,331 @@
+import json
+import os
+import struct
+import threading
+import time
+from aws_clients import error_code, http_status, s3_client
+import h3
+from cell_store import encode_sources, decode_sources, read_cell
+from record_codec import CELL_CODEC, decode_record, encode_record
+
+BUCKET_NAME = os.environ.get("BUCKET_NAME", "health-exposure-data")
+
+# Optional storage layout: the res 6 cells under one coarser parent are packed
+# into a single tile object by the compaction job, so a map view reads a
+# region with one ranged GET instead of one GET per cell.
+#
+# Tile layout:
+#   header  12 bytes: magic "H3TL", format version (u16), body codec (u16,
+#                     index into TILE_CODECS; 0 is JSON), index length in bytes (u32)
+#   index   UTF-8 JSON {h3_cell: [offset, length, last_updated, data_version,
+#                     source_fetched_at]}, offsets relative to the end of the index
+#   bodies  the cell records, each encoded on its own, back to back
+#
+# The object's metadata records when compaction packed it (`packed_at`) and
+# whether it removed the packed individual objects (`cells_deleted`).
+TILES_ENABLED = os.environ.get("CELL_TILES", "false").lower() == "true"
+TILE_RESOLUTION = int(os.environ.get("TILE_RESOLUTION", "4"))  # 343 res 6 cells per tile
+MAGIC = b"H3TL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+TILE_CODECS = ["json", "gzip-json", "zstd-json", "msgpack"]
+# First ranged read of a tile; covers the header and index of typical tiles
+INDEX_PROBE_BYTES = 64 * 1024
+# A cached index is revalidated against the tile's ETag after this long, so
+# recompaction reaches warm containers; an unchanged tile answers 304
+TILE_INDEX_TTL_SECONDS = int(os.environ.get("TILE_INDEX_TTL_SECONDS", "300"))
+
+_indexes = {}  # tile -> ((index, data_offset, etag, codec, packed), checked_at)
+_lock = threading.Lock()
+
+
+def tile_of(h3_cell):
+    return h3.cell_to_parent(h3_cell, TILE_RESOLUTION)
+
+
+def tile_key(tile):
+    return f"tiles/{tile}.bin"
+
+
+def pack_tile(records, codec=None):
+    """
+    Serialize cell records into a tile.
+
+    Args:
+        records (dict): h3_cell -> cell record
+        codec (str, optional): Record codec of the bodies, CELL_CODEC by default
+
+    Returns:
+        bytes: The tile object
+    """
+    codec = codec or CELL_CODEC
+    index, bodies, offset = {}, [], 0
+    for h3_cell in sorted(records):
+        record = records[h3_cell]
+        body = encode_record(record, codec)[0]
+        index[h3_cell] = [
+            offset,
+            len(body),
+            record.get("last_updated"),
+            record.get("version"),
+            encode_sources(record.get("sources") or {})
+        ]
+        bodies.append(body)
+        offset += len(body)
+    index_blob = json.dumps(index).encode("utf-8")
+    return HEADER.pack(MAGIC, FORMAT_VERSION, TILE_CODECS.index(codec), len(index_blob)) + index_blob + b"".join(bodies)
+
+
+def unpack_tile(blob):
+    """Inverse of `pack_tile`: h3_cell -> record."""
+    index, data_offset = _parse_index(blob)
+    codec = _header_codec(blob)
+    return {
+        h3_cell: decode_record(blob[data_offset + offset:data_offset + offset + length], codec)[0]
+        for h3_cell, (offset, length, *_) in index.items()
+    }
+
+
+def tile_entry(h3_cell):
+    """
+    Index entry of a cell in its tile, like `probe_cell` for a packed cell.
+
+    Returns:
+        dict: last_updated, version and sources, or None if no tile holds the cell
+    """
+    loaded = load_tile_index(tile_of(h3_cell))
+    if loaded is None or h3_cell not in loaded[0]:
+        return None
+    _, _, last_updated, version, sources = loaded[0][h3_cell]
+    return {"last_updated": last_updated, "version": version, "sources": decode_sources(sources)}
+
+
+def load_tile_index(tile):
+    """
+    Return (index, data_offset, etag, codec, packed) of a tile, cached per
+    container and revalidated after TILE_INDEX_TTL_SECONDS; None if there is
+    no tile. `packed` holds the tile's packed_at and cells_deleted.
+    """
+    with _lock:
+        cached = _indexes.get(tile)
+    if cached is not None and time.time() - cached[1] < TILE_INDEX_TTL_SECONDS:
+        return cached[0]
+
+    params = {"IfNoneMatch": cached[0][2]} if cached is not None and cached[0][2] else {}
+    try:
+        response = s3_client().get_object(Bucket=BUCKET_NAME, Key=tile_key(tile), Range=f"bytes=0-{INDEX_PROBE_BYTES - 1}", **params)
+    except Exception as e:
+        if params and _is_not_modified(e):
+            with _lock:
+                _indexes[tile] = (cached[0], time.time())
+            return cached[0]
+        if error_code(e) in ("NoSuchKey", "404", "InvalidRange"):
+            invalidate_tile(tile)
+            return None
+        raise
+    head, etag = response["Body"].read(), response.get("ETag")
+    metadata = response.get("Metadata") or {}
+    packed = {
+        "packed_at": int(metadata["packed_at"]) if metadata.get("packed_at", "").isdigit() else None,
+        "cells_deleted": metadata.get("cells_deleted") == "true"
+    }
+
+    magic, version, _, index_length = HEADER.unpack_from(head, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported tile format in {tile_key(tile)}")
+    if HEADER.size + index_length > len(head):
+        # Large index: fetch the rest of it from the same tile version
+        response = s3_client().get_object(
+            Bucket=BUCKET_NAME,
+            Key=tile_key(tile),
+            Range=f"bytes={len(head)}-{HEADER.size + index_length - 1}",
+            IfMatch=etag
+        )
+        head += response["Body"].read()
+
+    index, data_offset = _parse_index(head)
+    loaded = (index, data_offset, etag, _header_codec(head), packed)
+    with _lock:
+        _indexes[tile] = (loaded, time.time())
+    return loaded
+
+
+def read_tile_cells(tile, cells):
+    """
+    Read several cells of one tile with a single ranged GET spanning them.
+
+    Returns:
+        dict: h3_cell -> (record, size) for the requested cells the tile holds
+    """
+    for attempt in range(2):
+        loaded = load_tile_index(tile)
+        if loaded is None:
+            return {}
+        index, data_offset, etag, codec, _ = loaded
+        present = [h3_cell for h3_cell in cells if h3_cell in index]
+        if not present:
+            return {}
+
+        start = min(index[h3_cell][0] for h3_cell in present)
+        end = max(index[h3_cell][0] + index[h3_cell][1] for h3_cell in present)
+        try:
+            response = s3_client().get_object(
+                Bucket=BUCKET_NAME,
+                Key=tile_key(tile),
+                Range=f"bytes={data_offset + start}-{data_offset + end - 1}",
+                IfMatch=etag
+            )
+        except Exception as e:
+            if attempt == 0 and _is_precondition_failed(e):
+                # The tile was rewritten since we cached its index
+                invalidate_tile(tile)
+                continue
+            raise
+        span = response["Body"].read()
+        return {
+            h3_cell: decode_record(span[index[h3_cell][0] - start:index[h3_cell][0] - start + index[h3_cell][1]], codec)
+            for h3_cell in present
+        }
+    return {}
+
+
+def read_tile_cell(h3_cell):
+    """A single cell from its tile by byte range: (record, size), or (None, 0)."""
+    return read_tile_cells(tile_of(h3_cell), [h3_cell]).get(h3_cell, (None, 0))
+
+
+def packed_cells_deleted(tile):
+    """True if compaction removed the individual objects of the cells in a tile."""
+    loaded = load_tile_index(tile)
+    return loaded is not None and loaded[4]["cells_deleted"]
+
+
+def read_cell_or_tile(key):
+    """
+    `cell_store.read_cell`, falling back to the cell's tile once compaction
+    removed its individual object.
+
+    Returns:
+        tuple: (record, etag, size); etag is None for a tile copy
+    """
+    try:
+        return read_cell(key)
+    except Exception as e:
+        if not TILES_ENABLED or error_code(e) not in ("NoSuchKey", "404"):
+            raise
+        missing = e
+    record, size = read_tile_cell(key[len("cells/"):-len(".json")])
+    if record is None:
+        raise missing
+    return record, None, size
+
+
+def write_tile(tile, records, cells_deleted=False):
+    """Store a tile; returns its ETag."""
+    response = s3_client().put_object(
+        Bucket=BUCKET_NAME,
+        Key=tile_key(tile),
+        Body=pack_tile(records),
+        ContentType="application/octet-stream",
+        Metadata={"packed_at": str(int(time.time())), "cells_deleted": "true" if cells_deleted else "false"}
+    )
+    invalidate_tile(tile)
+    return response.get("ETag")
+
+
+def invalidate_tile(tile):
+    with _lock:
+        _indexes.pop(tile, None)
+
+
+def compact_tiles(tiles=None, delete_cells=False):
+    """
+    Pack individual `cells/{h3}.json` objects into their parent tiles.
+
+    Cells already in a tile are kept unless a newer individual object exists.
+    With `delete_cells` the packed individual objects are removed, so later
+    reads of those cells go to the tile; an object rewritten while the job
+    ran is left in place (conditional delete).
+
+    Args:
+        tiles (iterable, optional): Only compact these tiles
+        delete_cells (bool): Remove individual objects once packed
+
+    Returns:
+        dict: tile -> number of cells it holds
+    """
+    wanted = set(tiles) if tiles is not None else None
+    grouped = {}
+    paginator = s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix="cells/"):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            h3_cell = key[len("cells/"):-len(".json")] if key.endswith(".json") else None
+            if not h3_cell or not h3.is_valid_cell(h3_cell):
+                continue
+            tile = tile_of(h3_cell)
+            if wanted is None or tile in wanted:
+                grouped.setdefault(tile, []).append((h3_cell, key))
+
+    packed = {}
+    for tile, cells in grouped.items():
+        try:
+            records = _read_tile(tile)
+            etags = {}
+            for h3_cell, key in cells:
+                record, etag, _ = read_cell(key)
+                current = records.get(h3_cell)
+                if current is None or (record.get("last_updated") or 0) >= (current.get("last_updated") or 0):
+                    records[h3_cell] = record
+                etags[key] = etag
+            write_tile(tile, records, cells_deleted=delete_cells)
+            packed[tile] = len(records)
+            print(f"[INFO] Packed {len(cells)} cells into {tile_key(tile)} ({len(records)} total)")
+
+            if delete_cells:
+                for key, etag in etags.items():
+                    try:
+                        s3_client().delete_object(Bucket=BUCKET_NAME, Key=key, IfMatch=etag)
+                    except Exception as e:
+                        if not _is_precondition_failed(e):
+                            raise
+        except Exception as e:
+            print(f"[ERROR] Compacting {tile_key(tile)} failed: {e}")
+    return packed
+
+
+def _read_tile(tile):
+    try:
+        response = s3_client().get_object(Bucket=BUCKET_NAME, Key=tile_key(tile))
+    except Exception as e:
+        if error_code(e) in ("NoSuchKey", "404"):
+            return {}
+        raise
+    return unpack_tile(response["Body"].read())
+
+
+def _parse_index(blob):
+    magic, version, _, index_length = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Unsupported tile format")
+    data_offset = HEADER.size + index_length
+    return json.loads(blob[HEADER.size:data_offset]), data_offset
+
+
+def _header_codec(blob):
+    codec_id = HEADER.unpack_from(blob, 0)[2]
+    if codec_id >= len(TILE_CODECS):
+        raise ValueError(f"Unknown tile codec {codec_id}")
+    return TILE_CODECS[codec_id]
+
+
+def _is_not_modified(error):
+    code = error_code(error)
+    status = http_status(error)
+    return code in ("304", "NotModified") or status == 304
+
+
+def _is_precondition_failed(error):
+    code = error_code(error)
+    status = http_status(error)
+    return code == "PreconditionFailed" or status == 412
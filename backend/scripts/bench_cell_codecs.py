@@ -0,0 +1,168 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+# scripts/bench_cell_codecs.py
+#
+# Compares the record codecs on cell payloads: stored size, encode and decode
+# time, and the latency of a cache hit through lambda_handler that has to read
+# the object from storage (the memory cache is cleared before every request).
+#
+# Real payloads can be downloaded first and passed with --cells:
+#
+#   aws s3 sync s3://health-exposure-data/cells ./cells --exclude "*" --include "*.json"
+#   python scripts/bench_cell_codecs.py --cells ./cells
+#
+# Without --cells a representative record (all sections, three news articles)
+# is used. The handler runs against an in-memory bucket, so the latency
+# reflects CPU cost, not network transfer; multiply the size column by your
+# S3 throughput to estimate the transfer part.
+
+import argparse
+import glob
+import io
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+
+import boto3
+
+
+class MemoryBucket:
+    """The few S3 calls the hit path makes, served from a dict."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **params):
+        body = Body.encode("utf-8") if isinstance(Body, str) else Body
+        self.objects[Key] = (body, params.get("Metadata") or {})
+        return {"ETag": f'"{hash(body) & 0xffffffff:08x}"'}
+
+    def get_object(self, Bucket, Key, **params):
+        body, metadata = self.objects[Key]
+        return {"Body": io.BytesIO(body), "ETag": f'"{hash(body) & 0xffffffff:08x}"', "Metadata": metadata}
+
+    def head_object(self, Bucket, Key, **params):
+        body, metadata = self.objects[Key]
+        return {"ETag": f'"{hash(body) & 0xffffffff:08x}"', "Metadata": metadata, "ContentLength": len(body)}
+
+
+def sample_cell(h3_cell, now):
+    fetched = {"fetched_at": now, "ttl_seconds": 3600}
+    return {
+        "h3_cell": h3_cell,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "last_updated": now,
+        "location": "Helsinki, Finland",
+        "version": 3,
+        "adapter_versions": {"air_quality": 1, "tap_water": 1, "uv": 3, "weather": 1, "pollen": 1},
+        "data": {
+            "air_quality": {"source": "openweathermap", "aqi": 2, "pm2_5": 5.43, "pm10": 8.12, "o3": 61.2, "no2": 7.9, "co": 210.3, "timestamp": now},
+            "tap_water": {"source": "opencage+custom", "country": "Finland", "is_safe": True},
+            "uv": {"source": "currentuvindex.com", "uv_index": 2.4, "timestamp": "2026-05-12T10:00:00Z", "max_uv": 4.1, "max_uv_time": "2026-05-12T13:00:00Z"},
+            "weather": {
+                "source": "openweathermap",
+                "temperature": {"current": 14.2, "feels_like": 13.1, "min": 11.8, "max": 15.6},
+                "humidity": 71, "pressure": 1012,
+                "wind": {"speed": 4.6, "direction": 230},
+                "weather": {"description": "scattered clouds", "icon": "03d", "main": "Clouds"},
+                "clouds": 40, "visibility": 10000, "sunrise": now - 20000, "sunset": now + 30000, "timestamp": now
+            },
+            "pollen": {"source": "open-meteo", "alder": 0.0, "birch": 41.5, "grass": 2.1, "mugwort": 0.0, "olive": 0.0, "ragweed": 0.0, "timestamp": "2026-05-12T10:00"},
+            "humidity": {"source": "openweathermap", "humidity": 71, "timestamp": now}
+        },
+        "sources": {name: dict(fetched) for name in ("air_quality", "tap_water", "uv", "weather", "pollen")},
+        "news": {
+            "source": "openai",
+            "fetched_at": datetime.utcnow().isoformat(),
+            "location_key": "news/en/helsinki-finland.json",
+            "articles": [
+                {
+                    "title": f"Health advisory {i} for the Helsinki region",
+                    "description": "Birch pollen levels are high this week; people with allergies should limit time outdoors in the afternoon.",
+                    "source": "Helsingin Sanomat",
+                    "link": f"https://example.org/news/{i}",
+                    "pub_date": "2026-05-10"
+                }
+                for i in range(3)
+            ]
+        }
+    }
+
+
+def load_cells(path, now):
+    if not path:
+        return [sample_cell("861126d37ffffff", now)]
+    cells = []
+    for name in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(name) as f:
+            cells.append(json.load(f))
+    return cells
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", help="directory of downloaded cell JSON files")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    bucket = MemoryBucket()
+    boto3.client = lambda *a, **kw: bucket  # every module's client reads the in-memory bucket
+    os.environ.setdefault("HEALTH_EXPOSURE_API_KEY", "bench")
+    import lambda_function
+    import record_codec
+    from cell_store import write_cell
+    from record_codec import available_codecs, decode_record, encode_record
+
+    now = int(time.time())
+    cells = load_cells(args.cells, now)
+    print(f"{len(cells)} cell payloads, {statistics.mean(len(json.dumps(c)) for c in cells):.0f} B as json.dumps")
+    print(f"{'codec':<10} {'bytes':>7} {'encode µs':>10} {'decode µs':>10} {'hit p50 ms':>11} {'hit p95 ms':>11}")
+
+    for codec in available_codecs():
+        blobs = [encode_record(cell, codec)[0] for cell in cells]
+        encode = statistics.mean(timed(lambda: encode_record(cell, codec), args.repeat) for cell in cells)
+        decode = statistics.mean(timed(lambda: decode_record(blob, codec), args.repeat) for blob in blobs)
+
+        # End to end: a cache hit that reads and decodes the stored object
+        record_codec.CELL_CODEC = codec
+        cell = dict(cells[0], h3_cell="861126d37ffffff", last_updated=now)
+        cell["sources"] = {name: {"fetched_at": now, "ttl_seconds": 3600} for name in lambda_function.SOURCE_FETCHERS}
+        write_cell("cells/861126d37ffffff.json", cell)
+        event = {
+            "httpMethod": "GET",
+            "queryStringParameters": {"lat": "60.17", "lon": "24.93"},
+            "headers": {"origin": "https://health-exposure.app", "x-api-key": "bench", "x-user-tier": "premium"}
+        }
+        latencies = []
+        stdout, sys.stdout = sys.stdout, io.StringIO()  # the handler logs every request
+        try:
+            for _ in range(args.requests):
+                lambda_function.cell_cache.clear()
+                start = time.perf_counter()
+                lambda_function.lambda_handler(event, None)
+                latencies.append((time.perf_counter() - start) * 1000)
+                sys.stdout.seek(0)
+                sys.stdout.truncate()
+        finally:
+            sys.stdout = stdout
+        latencies.sort()
+
+        print(
+            f"{codec:<10} {statistics.mean(len(blob) for blob in blobs):>7.0f} {encode * 1e6:>10.1f} {decode * 1e6:>10.1f}"
+            f" {latencies[len(latencies) // 2]:>11.3f} {latencies[int(len(latencies) * 0.95)]:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
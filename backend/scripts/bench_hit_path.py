@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+# scripts/bench_hit_path.py
+#
+# CPU time of building a cache-hit response body, before and after splicing:
+#
+#   before (memory)  copy the cached record, add rate_limit/cache_status, json.dumps
+#   before (S3)      json.loads the stored bytes, then the same as above
+#   after            splice the envelope into the stored JSON (no decode, no encode)
+#
+# plus the whole lambda_handler for a memory-cache hit against an in-memory bucket.
+#
+#   python scripts/bench_hit_path.py --repeat 20000
+
+import argparse
+import io
+import json
+import time
+
+import boto3
+from bench_cell_codecs import MemoryBucket, sample_cell
+
+
+def cpu(func, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    bucket = MemoryBucket()
+    boto3.client = lambda *a, **kw: bucket
+    os.environ.setdefault("HEALTH_EXPOSURE_API_KEY", "bench")
+    import lambda_function
+    from cell_store import write_cell
+    from lambda_function import splice_json
+
+    now = int(time.time())
+    record = sample_cell("861126d37ffffff", now)
+    payload = json.dumps(record).encode("utf-8")
+    envelope = {
+        "rate_limit": {"remaining": 97, "reset_time": now + 3600},
+        "cache_status": {"hit": True, "source": "memory", "last_updated": now, "ttl_seconds": 3600,
+                         "force_refresh": False, "memory_cache": {"hits": 10, "misses": 2, "evictions": 0,
+                                                                  "expirations": 0, "entries": 3, "bytes": 7200}}
+    }
+
+    def before_memory():
+        body = dict(record)
+        body.update(envelope)
+        return json.dumps(body)
+
+    def before_s3():
+        body = json.loads(payload.decode("utf-8"))
+        body.update(envelope)
+        return json.dumps(body)
+
+    assert json.loads(splice_json(payload, envelope)) == json.loads(before_memory())
+    print(f"Record: {len(payload)} B")
+    print(f"before (memory hit):  {cpu(before_memory, args.repeat):8.1f} µs")
+    print(f"before (S3 hit):      {cpu(before_s3, args.repeat):8.1f} µs")
+    print(f"after (splice):       {cpu(lambda: splice_json(payload, envelope), args.repeat):8.1f} µs")
+
+    write_cell("cells/861126d37ffffff.json", record)
+    event = {
+        "httpMethod": "GET",
+        "queryStringParameters": {"lat": "60.17", "lon": "24.93"},
+        "headers": {"origin": "https://health-exposure.app", "x-api-key": "bench", "x-user-tier": "free"}
+    }
+    stdout, sys.stdout = sys.stdout, io.StringIO()  # the handler logs every request
+    try:
+        lambda_function.lambda_handler(event, None)  # warm the memory cache
+        start = time.process_time()
+        for _ in range(args.requests):
+            lambda_function.lambda_handler(event, None)
+            sys.stdout.seek(0)
+            sys.stdout.truncate()
+        handler = (time.process_time() - start) / args.requests * 1e6
+    finally:
+        sys.stdout = stdout
+    print(f"lambda_handler, memory hit: {handler:8.1f} µs CPU per request")
+
+
+if __name__ == "__main__":
+    main()
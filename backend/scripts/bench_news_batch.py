@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tests')))
+
+# scripts/bench_news_batch.py
+#
+# Offline throughput of the news pipeline against the fake OpenAI client:
+# locations per minute when each request carries 1..N locations. The fake's
+# latency models a fixed per-request cost plus output time per location.
+#
+#   python scripts/bench_news_batch.py --locations 64 --batch-sizes 1,4,8,16 --latency 2 --per-location 0.5
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from adapters.newsdata import fetch_health_news_batch
+from adapters.openai_service import OpenAIService
+from fake_openai import FakeOpenAIClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent OpenAI requests")
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds per request")
+    parser.add_argument("--per-location", type=float, default=0.5, help="extra seconds per location in a request")
+    parser.add_argument("--scale", type=float, default=0.05, help="speed-up of the simulated latency")
+    args = parser.parse_args()
+
+    locations = [f"Town {i}, Finland" for i in range(args.locations)]
+    print(f"{'batch':>5} {'requests':>8} {'articles':>8} {'locations/min':>14}")
+    for size in [int(value) for value in args.batch_sizes.split(",")]:
+        client = FakeOpenAIClient(latency=args.latency * args.scale, per_location_latency=args.per_location * args.scale)
+        service = OpenAIService(client=client)
+        chunks = [locations[i:i + size] for i in range(0, len(locations), size)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = {}
+            for chunk_results in executor.map(lambda chunk: fetch_health_news_batch(chunk, service=service), chunks):
+                results.update(chunk_results)
+        # Report in unscaled time so the numbers read like production
+        minutes = (time.perf_counter() - start) / args.scale / 60
+
+        articles = sum(len(news["articles"]) for news in results.values() if not news.get("error"))
+        print(f"{size:>5} {client.requests:>8} {articles:>8} {len(results) / minutes:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+# scripts/bench_rate_limiter.py
+#
+# Micro-benchmark of the in-container rate limiter: per-check cost and memory
+# held by the limiter state with many active API keys.
+#
+#   python scripts/bench_rate_limiter.py --keys 100000 --checks 1000000
+
+import argparse
+import random
+import time
+import tracemalloc
+from rate_limiter import InMemoryCounterBackend, RateLimiter, client_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=1000000)
+    args = parser.parse_args()
+
+    clients = [client_id(f"key-{i}") for i in range(args.keys)]
+    random.seed(1)
+    order = [random.choice(clients) for _ in range(args.checks)]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    limiter = RateLimiter(InMemoryCounterBackend(), reconcile_interval=10 ** 9, max_keys=args.keys)
+    # Touch every key once so the table is fully populated
+    for client in clients:
+        limiter.check(client, "free")
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    state_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    denied = 0
+    start = time.perf_counter()
+    for client in order:
+        if not limiter.check(client, "free")[0]:
+            denied += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Active keys:     {args.keys}")
+    print(f"Checks:          {args.checks} ({denied} denied)")
+    print(f"Per check:       {elapsed / args.checks * 1e6:.2f} µs")
+    print(f"Limiter memory:  {state_bytes / 1024 / 1024:.1f} MiB ({state_bytes / args.keys:.0f} B/key)")
+    print(f"  of which TAT array: {len(limiter._windows._tat) * 8 / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
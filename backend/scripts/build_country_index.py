@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+# scripts/build_country_index.py
+#
+# Builds the offline H3 -> country index used by the tap water adapter from a
+# country boundary GeoJSON, e.g. Natural Earth admin 0 countries:
+#
+#   python scripts/build_country_index.py ne_10m_admin_0_countries.geojson
+#
+# The output goes to lambda/adapters/data/ and is packaged with the adapters.
+
+import argparse
+import json
+import time
+import h3.api.basic_int as h3
+from adapters.country_index import write_index, INDEX_PATH, INDEX_RESOLUTION
+
+# Boundary datasets spell a few countries differently from OpenCage, which is
+# what SAFE_COUNTRIES was written against
+NAME_ALIASES = {
+    "United States of America": "United States",
+    "Republic of Korea": "South Korea",
+    "Korea, Republic of": "South Korea",
+    "Czech Rep.": "Czech Republic",
+    "The Netherlands": "Netherlands"
+}
+
+def load_country_cells(geojson_path, name_property):
+    """Assign every resolution 6 cell whose center falls inside a country to that country."""
+    with open(geojson_path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    owners = {}
+    contested = set()
+    for feature in collection["features"]:
+        name = (feature.get("properties") or {}).get(name_property)
+        if not name or not feature.get("geometry"):
+            continue
+        name = NAME_ALIASES.get(name, name)
+
+        for cell in h3.geo_to_cells(feature["geometry"], INDEX_RESOLUTION):
+            if owners.get(cell, name) != name:
+                contested.add(cell)
+            owners[cell] = name
+        print(f"[INFO] {name}: {len(owners)} cells so far")
+
+    return owners, contested
+
+def drop_border_cells(owners, contested):
+    """Leave out cells touching another country; those keep using the geocoding API."""
+    interior = {}
+    for cell, name in owners.items():
+        if cell in contested:
+            continue
+        if any(owners.get(neighbor, name) != name for neighbor in h3.grid_disk(cell, 1)):
+            continue
+        interior.setdefault(name, []).append(cell)
+    return interior
+
+def build_index(geojson_path, output, name_property):
+    started = time.time()
+    owners, contested = load_country_cells(geojson_path, name_property)
+    interior = drop_border_cells(owners, contested)
+
+    compacted = {name: h3.compact_cells(cells) for name, cells in interior.items()}
+    write_index(output, compacted)
+
+    kept = sum(len(cells) for cells in interior.values())
+    records = sum(len(cells) for cells in compacted.values())
+    print(f"[INFO] {len(owners)} cells in {len(compacted)} countries, {len(owners) - kept} border cells left out")
+    print(f"[INFO] Wrote {records} compacted cells to {output} ({os.path.getsize(output)} bytes) in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline H3 -> country index")
+    parser.add_argument("geojson", help="Country boundaries as a GeoJSON FeatureCollection")
+    parser.add_argument("--name-property", default="ADMIN", help="Feature property holding the English country name")
+    parser.add_argument("--output", default=INDEX_PATH)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    build_index(args.geojson, args.output, args.name_property)
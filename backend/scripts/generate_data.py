@@ -1,15 +1,15 @@
 import sys
 import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
 
 # lambda/generate_data.py
 
 import os
-import json
 import boto3
 import h3
 from dotenv import load_dotenv
 from adapters import openweather
+from record_codec import encode_record
 from pathlib import Path
 
 # Load .env from project root
@@ -45,11 +45,12 @@ def generate_and_upload(cell):
         return
 
     key = f"cells/{cell}.json"
+    body, params, _ = encode_record(data)
     s3.put_object(
         Bucket=BUCKET,
         Key=key,
-        Body=json.dumps(data, indent=2),
-        ContentType="application/json",
+        Body=body,
+        **params
     )
     print(f"[UPLOAD] s3://{BUCKET}/{key}")
 
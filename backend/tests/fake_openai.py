@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+# Offline stand-in for `openai.OpenAI`, for tests and benchmarks of the news
+# pipeline: `OpenAIService(client=FakeOpenAIClient())`. It answers the single
+# and batched news prompts with canned articles after a simulated latency.
+
+
+class FakeOpenAIClient:
+    def __init__(self, latency=0.0, per_location_latency=0.0, omit=()):
+        """
+        Args:
+            latency (float): Seconds every request takes
+            per_location_latency (float): Extra seconds per location in a batched request
+            omit (iterable): Location names left out of batched answers
+        """
+        self.latency = latency
+        self.per_location_latency = per_location_latency
+        self.omit = set(omit)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, response_format=None, **kwargs):
+        with self._lock:
+            self.requests += 1
+        prompt = messages[-1]["content"]
+        marker = "Locations (JSON):"
+        if marker in prompt:
+            locations = json.loads(prompt.split(marker, 1)[1])
+            time.sleep(self.latency + self.per_location_latency * len(locations))
+            body = {"locations": [
+                {"id": entry["id"], "articles": self.articles(entry["location"])}
+                for entry in locations
+                if entry["location"] not in self.omit
+            ]}
+        else:
+            time.sleep(self.latency + self.per_location_latency)
+            body = {"articles": self.articles("the requested location")}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(body)))])
+
+    @staticmethod
+    def articles(location):
+        """One recent article and one older than a year, which the recency filter drops."""
+        return [
+            {
+                "title": f"Air quality advisory in {location}",
+                "description": "Fine particle levels are expected to rise this week.",
+                "source": "Fake News Wire",
+                "link": "",
+                "pub_date": (date.today() - timedelta(days=3)).isoformat()
+            },
+            {
+                "title": f"Archive: water main repairs in {location}",
+                "description": "An old item the pipeline must filter out.",
+                "source": "Fake News Wire",
+                "link": "",
+                "pub_date": (date.today() - timedelta(days=800)).isoformat()
+            }
+        ]
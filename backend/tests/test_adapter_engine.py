@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from adapter_engine import run_adapters, run_calls
+
+
+def test_deadline_cancels_slow_adapters_and_keeps_partial_results():
+    cancelled = []
+
+    async def fast(ctx):
+        return {"value": ctx["lat"]}
+
+    async def slow(ctx):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    started = time.time()
+    results = run_adapters({"fast": fast, "slow": slow}, {"lat": 60.0}, timeout=0.2)
+
+    assert time.time() - started < 1
+    assert results["fast"] == {"value": 60.0}
+    assert results["slow"] == {"error": "Request timed out"}
+    assert cancelled == [True]
+
+
+def test_sync_adapters_run_through_shim_and_errors_are_captured():
+    def sync_adapter(ctx):
+        return {"value": ctx["lon"]}
+
+    async def failing(ctx):
+        raise RuntimeError("upstream down")
+
+    results = run_adapters({"sync": sync_adapter, "failing": failing}, {"lon": 24.9}, timeout=1)
+
+    assert results["sync"] == {"value": 24.9}
+    assert results["failing"] == {"error": "upstream down"}
+
+
+def test_per_call_timeout_within_the_deadline():
+    async def slow(ctx):
+        await asyncio.sleep(5)
+
+    async def fast(ctx):
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    started = time.time()
+    results = run_calls({"slow": (slow, {}, 0.1), "fast": (fast, {})}, timeout=2)
+
+    assert time.time() - started < 1
+    assert results == {"slow": {"error": "Request timed out"}, "fast": {"value": 1}}
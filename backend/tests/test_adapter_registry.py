@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import adapter_registry
+from adapter_registry import ADAPTERS, is_current
+from cell_store import decode_sources, encode_sources
+from lambda_function import stale_sources
+
+
+def fresh_sources(now):
+    return {name: {"fetched_at": now, "version": adapter["version"]} for name, adapter in ADAPTERS.items()}
+
+
+def test_version_bump_invalidates_only_that_section(monkeypatch):
+    now = int(time.time())
+    sources = fresh_sources(now)
+    assert stale_sources(sources, 3600) == []
+
+    monkeypatch.setitem(ADAPTERS, "uv", {**ADAPTERS["uv"], "version": ADAPTERS["uv"]["version"] + 1})
+
+    assert stale_sources(sources, 3600) == ["uv"]
+
+
+def test_sections_without_a_version_count_as_written_before_the_registry():
+    assert is_current("uv", {"fetched_at": 1})
+    assert is_current("pollen", {"fetched_at": 1})
+    assert not is_current("uv", {"fetched_at": 1, "version": 2})
+
+
+def test_dependents_are_refreshed_with_their_inputs(monkeypatch):
+    monkeypatch.setitem(ADAPTERS, "pollen", {**ADAPTERS["pollen"], "depends_on": ("weather",)})
+    sources = fresh_sources(int(time.time()))
+    sources["weather"]["fetched_at"] -= 7200
+
+    assert stale_sources(sources, 3600) == ["weather", "pollen"]
+    assert adapter_registry.with_dependents(["air_quality"]) == ["air_quality"]
+
+
+def test_section_versions_survive_the_metadata_encoding():
+    sources = {"uv": {"fetched_at": 100, "version": 4, "error": True}, "pollen": {"fetched_at": 200}}
+
+    decoded = decode_sources(encode_sources(sources))
+
+    assert decoded == {"uv": {"fetched_at": 100, "error": True, "version": 4}, "pollen": {"fetched_at": 200, "error": False}}
+    assert decode_sources("uv:100:e,pollen:200") == {"uv": {"fetched_at": 100, "error": True}, "pollen": {"fetched_at": 200, "error": False}}
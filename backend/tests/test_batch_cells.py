@@ -0,0 +1,34 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import h3
+from batch_cells import BATCH_MAX_CELLS, is_batch_request, select_cells
+
+
+def test_h3_ids_are_validated_and_deduplicated():
+    cell = h3.latlng_to_cell(60.17, 24.93, 6)
+
+    cells, error = select_cells({"h3_ids": f"{cell}, {cell}"})
+    assert error is None and cells == [cell]
+
+    cells, error = select_cells({"h3_ids": f"{cell},not-a-cell"})
+    assert cells is None and "not-a-cell" in error
+
+
+def test_k_ring_starts_with_the_center_cell():
+    cells, error = select_cells({"lat": "60.17", "lon": "24.93", "k": "1"})
+
+    assert error is None
+    assert cells[0] == h3.latlng_to_cell(60.17, 24.93, 6)
+    assert len(cells) == 7
+    assert select_cells({"lat": "60.17", "lon": "24.93", "k": "9"})[0] is None
+
+
+def test_bbox_is_bounded():
+    cells, error = select_cells({"bbox": "60.1,24.8,60.3,25.0"})
+    assert error is None and 0 < len(cells) <= BATCH_MAX_CELLS
+
+    cells, error = select_cells({"bbox": "59,20,62,30"})
+    assert cells is None and "at most" in error
+    assert not is_batch_request({"lat": "60.17", "lon": "24.93"})
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from cell_cache import CellCache
+
+
+def make_record(age_seconds=0):
+    return {"h3_cell": "861f1d48fffffff", "last_updated": int(time.time()) - age_seconds}
+
+
+def test_hit_and_miss_counters():
+    cache = CellCache(max_entries=10, max_bytes=10000)
+    assert cache.get("cells/a.json") is None
+    cache.put("cells/a.json", make_record(), 100, 3600)
+    assert cache.get("cells/a.json")["h3_cell"] == "861f1d48fffffff"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 100
+
+
+def test_entries_expire_with_record_age():
+    cache = CellCache(max_entries=10, max_bytes=10000)
+    # Already older than the TTL, never stored
+    assert not cache.put("cells/old.json", make_record(age_seconds=4000), 100, 3600)
+
+    cache.put("cells/a.json", make_record(age_seconds=600), 100, 3600)
+    # Premium callers with a stricter TTL miss, free tier still hits
+    assert cache.get("cells/a.json", max_age=300) is None
+    assert cache.get("cells/a.json", max_age=3600) is not None
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = CellCache(max_entries=2, max_bytes=250)
+    cache.put("cells/a.json", make_record(), 100, 3600)
+    cache.put("cells/b.json", make_record(), 100, 3600)
+    cache.get("cells/a.json")  # a becomes most recently used
+    cache.put("cells/c.json", make_record(), 100, 3600)
+
+    assert cache.get("cells/b.json") is None
+    assert cache.get("cells/a.json") is not None
+    assert cache.stats()["evictions"] == 1
+
+    cache.put("cells/d.json", make_record(), 200, 3600)
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_peek_ignores_tier_ttl_and_keeps_etag():
+    cache = CellCache(max_entries=10, max_bytes=10000)
+    cache.put("cells/a.json", make_record(age_seconds=600), 100, 3600, etag='"abc"')
+
+    record, etag = cache.peek("cells/a.json")
+    assert record is not None
+    assert etag == '"abc"'
+    assert cache.stats()["hits"] == 0
+
+
+def test_payload_is_serialized_once_per_entry():
+    cache = CellCache(max_entries=10, max_bytes=10000)
+    record = make_record()
+    cache.put("cells/a.json", record, 100, 3600)
+    calls = []
+
+    def serialize(r):
+        calls.append(r)
+        return b'{"h3_cell": "861f1d48fffffff"}'
+
+    first = cache.payload("cells/a.json", cache.get("cells/a.json"), serialize)
+    second = cache.payload("cells/a.json", cache.get("cells/a.json"), serialize)
+
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()["bytes"] == 100 + len(first)
+    # A record that is not the cached entry is serialized but not kept
+    cache.payload("cells/a.json", make_record(), serialize)
+    assert len(calls) == 2
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import pytest
+from circuit_breaker import BREAKER_MIN_CALLS, BREAKER_OPEN_SECONDS, CircuitBreaker, CircuitOpenError
+from lambda_function import merge_cell
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_on_failures_and_recovers_through_a_half_open_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("open-meteo", shared=False, clock=clock)
+    for _ in range(BREAKER_MIN_CALLS):
+        breaker.allow()
+        breaker.record(False, 0.1)
+    assert breaker.snapshot()["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    clock.now += BREAKER_OPEN_SECONDS
+    breaker.allow()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # one probe at a time
+    breaker.record(True, 0.1)
+
+    assert breaker.snapshot() == {"state": "closed", "failure_rate": 0.0, "latency_ms": None}
+    breaker.allow()
+
+
+def test_slow_calls_count_as_failures_and_a_failed_probe_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker("currentuvindex", shared=False, clock=clock)
+    for _ in range(BREAKER_MIN_CALLS):
+        breaker.allow()
+        breaker.record(True, 30)
+    assert breaker.snapshot()["state"] == "open"
+
+    clock.now += BREAKER_OPEN_SECONDS
+    breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.snapshot()["state"] == "open"
+    assert breaker.snapshot()["retry_in"] == BREAKER_OPEN_SECONDS
+
+
+def test_failed_fetch_keeps_the_last_good_section():
+    now = int(time.time())
+    cached = {
+        "data": {"uv": {"uv_index": 2.4}, "pollen": {"birch": 40}},
+        "sources": {"uv": {"fetched_at": now - 4000, "version": 3}, "pollen": {"fetched_at": now - 4000, "version": 1}},
+        "location": "Helsinki, Finland"
+    }
+
+    record = merge_cell("861126d37ffffff", cached, {"uv": None, "pollen": {"birch": 12}}, 3600)
+
+    assert record["data"]["uv"] == {"uv_index": 2.4}
+    assert record["sources"]["uv"]["error"] is True
+    assert record["sources"]["uv"]["last_good_at"] == now - 4000
+    assert record["data"]["pollen"] == {"birch": 12}
+
+    # Still failing on the next attempt: the original fetch time is kept
+    again = merge_cell("861126d37ffffff", record, {"uv": {"error": "Circuit open for currentuvindex"}}, 3600)
+    assert again["data"]["uv"] == {"uv_index": 2.4}
+    assert again["sources"]["uv"]["last_good_at"] == now - 4000
@@ -0,0 +1,32 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import h3
+from adapters.country_index import CountryIndex, write_index
+
+HELSINKI = h3.latlng_to_cell(60.1695, 24.9354, 6)
+STOCKHOLM = h3.latlng_to_cell(59.3293, 18.0686, 6)
+
+
+def test_lookup_resolves_compacted_parents(tmp_path):
+    path = str(tmp_path / "index.bin")
+    # Helsinki is stored through its resolution 3 parent, Stockholm as itself
+    write_index(path, {
+        "Finland": [h3.cell_to_parent(HELSINKI, 3)],
+        "Sweden": [STOCKHOLM]
+    })
+    index = CountryIndex(path)
+
+    assert len(index) == 2
+    assert index.lookup(HELSINKI) == "Finland"
+    assert index.lookup(h3.cell_to_center_child(HELSINKI, 8)) == "Finland"
+    assert index.lookup(STOCKHOLM) == "Sweden"
+
+
+def test_unresolved_cells_return_none(tmp_path):
+    path = str(tmp_path / "index.bin")
+    write_index(path, {"Sweden": [STOCKHOLM]})
+    index = CountryIndex(path)
+
+    assert index.lookup(HELSINKI) is None
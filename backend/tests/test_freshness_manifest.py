@@ -0,0 +1,84 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from cell_store import build_metadata
+from freshness_manifest import format_entry, parse_entry
+
+
+def test_entry_roundtrip_from_cell_metadata():
+    record = {
+        "h3_cell": "861126d37ffffff",
+        "last_updated": 1746720000,
+        "version": 3,
+        "news": {"fetched_at": "2025-05-08T12:00:00+00:00"},
+        "sources": {"uv": {"fetched_at": 1746720000}, "pollen": {"fetched_at": 1746716400, "error": True}}
+    }
+    entry = parse_entry(format_entry(record["h3_cell"], build_metadata(record)))
+
+    assert entry == {
+        "h3_cell": "861126d37ffffff",
+        "last_updated": 1746720000,
+        "news_fetched_at": 1746705600,
+        "version": 3,
+        "sources": "pollen:1746716400:e,uv:1746720000"
+    }
+
+
+def test_missing_news_and_malformed_lines():
+    entry = parse_entry(format_entry("861126d37ffffff", build_metadata({"last_updated": 1, "version": 3})))
+    assert entry["news_fetched_at"] == 0
+    assert parse_entry("861126d37ffffff\tnot-a-number\t0\t3\t") is None
+    assert parse_entry("") is None
+
+
+def test_snapshot_is_spooled_and_uploaded_on_commit(monkeypatch):
+    import freshness_manifest
+
+    class Client:
+        def __init__(self):
+            self.puts, self.deleted = {}, []
+
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            self.puts[Key] = Body.read().decode("utf-8")
+
+        def delete_object(self, Bucket, Key):
+            self.deleted.append(Key)
+
+    client = Client()
+    monkeypatch.setattr(freshness_manifest, "s3_client", lambda: client)
+    snapshot = freshness_manifest.SnapshotWriter()
+    for cell in ("861126d37ffffff", "861126d27ffffff"):
+        snapshot.add(parse_entry(format_entry(cell, build_metadata({"last_updated": 1, "version": 3}))))
+    assert client.puts == {}
+
+    snapshot.commit(["manifest/log/1.tsv"])
+
+    lines = client.puts[freshness_manifest.SNAPSHOT_KEY].splitlines()
+    assert [parse_entry(line)["h3_cell"] for line in lines] == ["861126d37ffffff", "861126d27ffffff"]
+    assert client.deleted == ["manifest/log/1.tsv"]
+
+
+def test_handler_flushes_buffered_entries_before_returning(monkeypatch):
+    import freshness_manifest
+    import lambda_function
+
+    segments = []
+
+    class Client:
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            segments.append((Key, Body))
+
+    monkeypatch.setattr(freshness_manifest, "s3_client", lambda: Client())
+    monkeypatch.setattr(freshness_manifest, "_buffer", [])
+
+    def handle(event, context):
+        freshness_manifest.record_write("861126d37ffffff", build_metadata({"last_updated": 1, "version": 3}))
+        return {"statusCode": 200}
+
+    monkeypatch.setattr(lambda_function, "handle_event", handle)
+
+    assert lambda_function.lambda_handler({}, None) == {"statusCode": 200}
+    assert len(segments) == 1 and segments[0][0].startswith(freshness_manifest.LOG_PREFIX)
+    assert segments[0][1].startswith("861126d37ffffff\t1\t")
+    assert freshness_manifest._buffer == []
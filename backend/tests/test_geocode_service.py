@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import geocode_service
+
+H3_CELL = "861126d37ffffff"
+HELSINKI = {"city": "Helsinki", "country": "Finland"}
+
+
+class NoSuchKey(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}}
+
+
+class Client:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NoSuchKey(Key)
+        return {"Body": io.BytesIO(self.objects[Key].encode("utf-8"))}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+
+def setup(monkeypatch, fetch):
+    client = Client()
+    monkeypatch.setattr(geocode_service, "s3_client", lambda: client)
+    monkeypatch.setattr(geocode_service, "fetch_components", fetch)
+    monkeypatch.setattr(geocode_service, "_memory", OrderedDict())
+    monkeypatch.setattr(geocode_service, "_inflight", {})
+    return client
+
+
+def test_concurrent_callers_share_one_lookup_and_the_sidecar(monkeypatch):
+    calls = []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        time.sleep(0.1)
+        return HELSINKI
+
+    client = setup(monkeypatch, fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(geocode_service.get_place(H3_CELL, 60.17, 24.93))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [HELSINKI] * 5
+    stored = json.loads(client.objects[geocode_service.geocode_key(H3_CELL)])
+    assert stored["components"] == HELSINKI
+    assert stored["location"] == geocode_service.format_location(HELSINKI)
+
+    # A new container answers from the sidecar without calling OpenCage
+    monkeypatch.setattr(geocode_service, "_memory", OrderedDict())
+    assert geocode_service.get_place(H3_CELL, 60.17, 24.93) == HELSINKI
+    assert len(calls) == 1
+
+
+def test_failures_are_remembered_briefly(monkeypatch):
+    calls = []
+
+    def fetch(lat, lon):
+        calls.append((lat, lon))
+        raise RuntimeError("quota exceeded")
+
+    client = setup(monkeypatch, fetch)
+    now = [1000.0]
+    monkeypatch.setattr(geocode_service.time, "time", lambda: now[0])
+
+    assert geocode_service.get_place(H3_CELL, 60.17, 24.93) is None
+    assert geocode_service.get_place(H3_CELL, 60.17, 24.93) is None
+    assert len(calls) == 1
+    assert client.objects == {}
+
+    now[0] += geocode_service.GEOCODE_FAILURE_TTL_SECONDS + 1
+    assert geocode_service.get_place(H3_CELL, 60.17, 24.93) is None
+    assert len(calls) == 2
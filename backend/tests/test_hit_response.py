@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from lambda_function import SOURCE_FETCHERS, cell_etag, cell_payload, etag_matches, remaining_ttl, splice_json
+
+
+def test_envelope_is_spliced_into_the_stored_json():
+    record = {"h3_cell": "861126d37ffffff", "data": {"uv": {"uv_index": 2.4}}}
+    envelope = {"rate_limit": {"remaining": 9}, "cache_status": {"hit": True}}
+
+    body = splice_json(json.dumps(record).encode("utf-8") + b"\n", envelope)
+
+    assert json.loads(body) == {**record, **envelope}
+    assert json.loads(splice_json(b"{}", envelope)) == envelope
+
+
+def test_payload_drops_fields_of_an_earlier_response():
+    record = {"h3_cell": "861126d37ffffff", "rate_limit": {"remaining": 1}, "cache_status": {"hit": False}}
+
+    assert json.loads(cell_payload(record)) == {"h3_cell": "861126d37ffffff"}
+
+
+def test_etag_identifies_the_stored_version():
+    record = {"h3_cell": "861126d37ffffff", "version": 3, "last_updated": 1700000000,
+              "news": {"fetched_at": "2026-10-17T08:00:00"}}
+    served = {**record, "rate_limit": {"remaining": 4}, "cache_status": {"hit": True, "source": "memory"}}
+
+    assert cell_etag(served) == cell_etag(record)
+    assert cell_etag({**record, "last_updated": 1700000300}) != cell_etag(record)
+    assert cell_etag({**record, "news": {"fetched_at": "2026-10-17T20:00:00"}}) != cell_etag(record)
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = cell_etag({"h3_cell": "861126d37ffffff", "last_updated": 1})
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"abc", {etag[2:]}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abc"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_max_age_is_the_first_section_to_expire_for_the_tier():
+    now = 1700000000
+    record = {"sources": {name: {"fetched_at": now - 100} for name in SOURCE_FETCHERS}}
+
+    assert remaining_ttl(record, 300, now) == 200
+    assert remaining_ttl(record, 3600, now) == 3500
+    record["sources"]["uv"] = {"fetched_at": now - 100, "error": True}
+    assert remaining_ttl(record, 3600, now) == 200
+    assert remaining_ttl(record, 60, now) == 0
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from adapters import http_client
+
+
+class FakeResponse:
+    status_code = 200
+
+
+def test_sync_get_holds_a_provider_slot_around_the_request(monkeypatch):
+    limit = http_client.PROVIDER_CONCURRENCY["opencage"]
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    class Session:
+        def get(self, url, **kwargs):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return FakeResponse()
+
+    monkeypatch.setattr(http_client, "get_session", lambda provider: Session())
+    with ThreadPoolExecutor(max_workers=limit * 4) as executor:
+        responses = list(executor.map(lambda _: http_client.sync_get("opencage", "https://example.test"), range(limit * 4)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert active["max"] == limit
+
+
+def test_sessions_are_pooled_per_provider_with_their_config(monkeypatch):
+    monkeypatch.setattr(http_client, "_sessions", {})
+    opencage = http_client.get_session("opencage")
+    weather = http_client.get_session("openweather")
+
+    assert http_client.get_session("opencage") is opencage
+    assert weather is not opencage
+    for provider, session in (("opencage", opencage), ("openweather", weather)):
+        adapter = session.get_adapter("https://example.test")
+        assert adapter._pool_maxsize == http_client.PROVIDERS[provider]["pool_maxsize"]
+        assert adapter.max_retries.total == http_client.PROVIDERS[provider]["retries"]
+
+
+def test_async_clients_are_pooled_per_provider_and_loop():
+    async def clients():
+        client = http_client.get_async_client("open-meteo")
+        try:
+            assert http_client.get_async_client("open-meteo") is client
+            return client._transport._pool._max_connections
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(clients()) == http_client.PROVIDERS["open-meteo"]["pool_maxsize"]
+
+
+def test_requests_use_the_provider_timeout_unless_given(monkeypatch):
+    calls = []
+
+    class Session:
+        def get(self, url, **kwargs):
+            calls.append(kwargs)
+            return FakeResponse()
+
+    monkeypatch.setattr(http_client, "get_session", lambda provider: Session())
+    http_client.sync_get("currentuvindex", "https://example.test")
+    http_client.sync_get("currentuvindex", "https://example.test", timeout=1)
+
+    assert calls == [{"timeout": http_client.PROVIDERS["currentuvindex"]["timeout"]}, {"timeout": 1}]
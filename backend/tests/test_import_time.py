@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+# Cumulative import time of the handler module, in milliseconds. Measured at
+# about 150 ms; the budget leaves room for slower CI machines.
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "500"))
+# Loaded on first use only; none of them may come in with the handler
+DEFERRED_MODULES = ("boto3", "botocore", "openai", "requests", "httpx", "geocode_service", "adapters.uv")
+
+
+def import_times(module):
+    """Module -> cumulative microseconds, from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=LAMBDA_DIR, capture_output=True, text=True,
+        env={**os.environ, "HEALTH_EXPOSURE_API_KEY": "test"}
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_handler_import_stays_within_budget():
+    times = import_times("lambda_function")
+
+    assert times["lambda_function"] / 1000 < IMPORT_BUDGET_MS
+    assert [name for name in DEFERRED_MODULES if name in times] == []
@@ -0,0 +1,32 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from adapters.newsdata import fetch_health_news_batch
+from adapters.openai_service import OpenAIService
+from fake_openai import FakeOpenAIClient
+
+
+def test_one_request_is_split_back_per_location():
+    client = FakeOpenAIClient()
+    locations = ["Helsinki, Finland", "Espoo, Finland", "Oslo, Norway"]
+
+    results = fetch_health_news_batch(locations, service=OpenAIService(client=client))
+
+    assert client.requests == 1
+    assert list(results) == locations
+    for location in locations:
+        articles = results[location]["articles"]
+        # The fake also returns an article older than a year, which is filtered out
+        assert [article["title"] for article in articles] == [f"Air quality advisory in {location}"]
+        assert results[location]["fetched_at"]
+
+
+def test_location_missing_from_the_answer_gets_an_error():
+    client = FakeOpenAIClient(omit={"Oslo, Norway"})
+
+    results = fetch_health_news_batch(["Helsinki, Finland", "Oslo, Norway"], service=OpenAIService(client=client))
+
+    assert results["Helsinki, Finland"]["articles"]
+    assert results["Oslo, Norway"]["error"] == "Missing from batch response"
+    assert results["Oslo, Norway"]["articles"] == []
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import news_store
+from news_store import get_news, location_key, normalize_location
+
+
+def test_locations_normalize_to_one_key():
+    assert normalize_location("Helsinki, Finland") == "helsinki-finland"
+    assert normalize_location("  HELSINKI,  finland ") == "helsinki-finland"
+    assert normalize_location("Zürich, Switzerland") == "zurich-switzerland"
+    assert location_key("Helsinki, Finland", "fi") == "news/fi/helsinki-finland.json"
+
+
+def test_concurrent_cells_of_one_location_share_a_fetch(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(news_store, "_memory", news_store.OrderedDict())
+    monkeypatch.setattr(news_store, "_read", lambda key: stored.get(key))
+    monkeypatch.setattr(news_store, "_write", stored.__setitem__)
+    monkeypatch.setattr(news_store, "acquire_refresh", lambda name: "token")
+    monkeypatch.setattr(news_store, "release_refresh", lambda name, token: None)
+    calls = []
+
+    def fetch(lat, lon, location, language):
+        calls.append(location)
+        time.sleep(0.1)
+        return {"source": "openai", "fetched_at": datetime.utcnow().isoformat(), "articles": [{"title": "x"}]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_news("Helsinki, Finland", 60.17, 24.93, fetch=fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # A later cell of the same city is answered from memory
+    results.append(get_news("helsinki, finland", 60.2, 24.9, fetch=fetch))
+
+    assert calls == ["Helsinki, Finland"]
+    assert [news["articles"] for news in results] == [[{"title": "x"}]] * 6
+    assert results[0]["location_key"] in stored
+
+
+def test_failed_fetch_keeps_serving_the_stored_articles(monkeypatch):
+    old = {"source": "openai", "fetched_at": "2020-01-01T00:00:00", "articles": [{"title": "old"}]}
+    monkeypatch.setattr(news_store, "_memory", news_store.OrderedDict())
+    monkeypatch.setattr(news_store, "_read", lambda key: old)
+    monkeypatch.setattr(news_store, "_write", lambda key, news: None)
+    monkeypatch.setattr(news_store, "acquire_refresh", lambda name: "token")
+    monkeypatch.setattr(news_store, "release_refresh", lambda name, token: None)
+
+    news = get_news("Oslo, Norway", 59.9, 10.7, fetch=lambda *args: {"source": "openai", "error": "timeout", "articles": []})
+
+    assert news["articles"] == [{"title": "old"}]
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import lambda_function
+from adapter_registry import adapter_versions
+
+H3_CELL = "861126d37ffffff"
+
+
+def make_record(stale_name, now):
+    ttl = lambda_function.BASE_TTL_SECONDS
+    sources = {
+        name: {"fetched_at": now - ttl - 60 if name == stale_name else now - 60, "ttl_seconds": ttl, "version": version}
+        for name, version in adapter_versions().items()
+    }
+    data = {name: {"source": "stored", "value": name} for name in sources}
+    return {"h3_cell": H3_CELL, "location": "Helsinki, Finland", "version": lambda_function.CURRENT_DATA_VERSION,
+            "data": data, "sources": sources, "news": {"articles": []}}
+
+
+def test_only_the_stale_section_is_refetched_and_merged(monkeypatch):
+    now = int(time.time())
+    cached = make_record("uv", now)
+    calls = []
+
+    def load_adapter(spec):
+        def adapter(ctx):
+            calls.append((spec, ctx["h3_cell"]))
+            return {"source": "fresh", "uv_index": 3.1}
+        return adapter
+
+    monkeypatch.setattr(lambda_function, "load_adapter", load_adapter)
+    stale = lambda_function.stale_sources(cached["sources"], lambda_function.BASE_TTL_SECONDS)
+    assert stale == ["uv"]
+
+    ctx = {"lat": 60.17, "lon": 24.93, "h3_cell": H3_CELL, "user_tier": "free"}
+    record, fetched, _ = lambda_function.refresh_cells([(ctx, cached, stale)], lambda_function.BASE_TTL_SECONDS, allow_derived=False)[H3_CELL]
+
+    assert calls == [(lambda_function.SOURCE_FETCHERS["uv"], H3_CELL)]
+    assert fetched == {"uv": {"source": "fresh", "uv_index": 3.1}}
+    assert record["data"]["uv"] == {"source": "fresh", "uv_index": 3.1}
+    assert record["sources"]["uv"]["fetched_at"] >= now
+    # Every other section and its fetch time are kept as stored
+    for name in cached["sources"]:
+        if name != "uv":
+            assert record["data"][name] == cached["data"][name]
+            assert record["sources"][name] == cached["sources"][name]
+    assert record["location"] == "Helsinki, Finland"
+    assert lambda_function.stale_sources(record["sources"], lambda_function.BASE_TTL_SECONDS) == []
+
+
+def test_forced_refresh_drops_the_memory_copy_first(monkeypatch):
+    now = int(time.time())
+    cached = dict(make_record("uv", now), last_updated=now - 60)
+    key = lambda_function.cell_key(H3_CELL)
+    assert lambda_function.cell_cache.put(key, cached, 100, lambda_function.BASE_TTL_SECONDS, "old")
+    seen = []
+
+    def refresh_cells(to_refresh, ttl_seconds, context=None, allow_derived=True):
+        seen.append(lambda_function.cell_cache.peek(key)[0])
+        return {ctx["h3_cell"]: (dict(cached, last_updated=now), {}, {}) for ctx, _, _ in to_refresh}
+
+    monkeypatch.setattr(lambda_function, "refresh_cells", refresh_cells)
+    monkeypatch.setattr(lambda_function, "record_access", lambda h3_cell: None)
+    monkeypatch.setattr(lambda_function, "write_cell", lambda key, record, cache_control=None: ("new", 100))
+
+    body = lambda_function.batch_response_body([H3_CELL], "free", True)
+
+    assert seen == [None]
+    assert body["cells"][0]["cache_status"]["source"] == "fresh_data"
+    assert lambda_function.cell_cache.peek(key)[1] == "new"
+    lambda_function.cell_cache.invalidate(key)
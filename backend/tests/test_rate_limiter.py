@@ -0,0 +1,66 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+from rate_limiter import InMemoryCounterBackend, RateLimiter, SlidingWindowTable
+
+
+def test_bucket_limits_each_client_separately():
+    limiter = RateLimiter(InMemoryCounterBackend(), limits={'free': 3}, reconcile_interval=3600)
+
+    results = [limiter.check("a", "free")[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    # Another client has its own budget
+    allowed, remaining, _ = limiter.check("b", "free")
+    assert allowed and remaining == 2
+
+
+def test_reconcile_drains_usage_from_other_containers():
+    backend = InMemoryCounterBackend()
+    ours = RateLimiter(backend, limits={'free': 10}, reconcile_interval=3600, background=False)
+    theirs = RateLimiter(backend, limits={'free': 10}, reconcile_interval=3600, background=False)
+
+    ours.check("a", "free")
+    for _ in range(6):
+        theirs.check("a", "free")
+    theirs.reconcile()
+    ours.reconcile()
+
+    # 1 used here, 6 elsewhere
+    assert ours.check("a", "free")[1] == 2
+    # A second reconcile does not count the same usage twice
+    ours.reconcile()
+    assert ours.check("a", "free")[1] == 1
+
+
+def test_sliding_window_has_no_edge_burst():
+    table = SlidingWindowTable(capacity=4, window_seconds=3600)
+    now = 3600 * 1000 - 1  # one second before an hour boundary
+
+    assert all(table.check("a", 10, now)[0] for _ in range(10))
+    # Crossing the hour does not hand out a fresh budget
+    allowed, remaining, retry_at = table.check("a", 10, now + 2)
+    assert not allowed and remaining == 0
+    # One request frees up every window / limit seconds
+    assert retry_at <= now + 361
+    assert table.check("a", 10, now + 361)[0]
+
+
+def test_table_size_is_bounded():
+    table = SlidingWindowTable(capacity=2, window_seconds=3600)
+    for i in range(5):
+        table.check(f"key-{i}", 10, 1000.0)
+
+    assert len(table) == 2
+    assert table.evictions == 3
+
+
+def test_last_admitted_request_reports_zero_remaining():
+    table = SlidingWindowTable(capacity=4, window_seconds=3600)
+    now = 1000.0
+    for _ in range(99):
+        table.check("a", 100, now)
+
+    allowed, remaining, _ = table.check("a", 100, now + 0.5)
+    assert allowed and remaining == 0
+    assert table.check("a", 100, now + 0.5)[0] is False
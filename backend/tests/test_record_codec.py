@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import pytest
+from record_codec import available_codecs, decode_record, encode_record
+
+RECORD = {
+    "h3_cell": "861126d37ffffff",
+    "last_updated": 1746720000,
+    "data": {"air_quality": {"aqi": 2, "pm2_5": 5.43}, "tap_water": {"country": "Suomi – Finland", "is_safe": True}},
+    "news": {"articles": []}
+}
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_roundtrip_and_metadata(codec):
+    blob, params, size = encode_record(RECORD, codec)
+
+    assert params["Metadata"] == {"codec": codec}
+    assert decode_record(blob, codec) == (RECORD, size)
+
+
+def test_objects_without_codec_metadata_are_plain_json():
+    legacy = json.dumps(RECORD, indent=2).encode("utf-8")
+    assert decode_record(legacy)[0] == RECORD
+
+
+def test_gzip_is_smaller_deterministic_and_marked_for_http():
+    blob, params, size = encode_record(RECORD, "gzip-json")
+
+    assert encode_record(RECORD, "gzip-json")[0] == blob
+    assert params["ContentEncoding"] == "gzip"
+    assert size == len(json.dumps(RECORD).encode("utf-8"))
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        encode_record(RECORD, "bzip2")
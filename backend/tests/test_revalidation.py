@@ -0,0 +1,45 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import revalidation
+from revalidation import is_revalidation_event, revalidation_event, schedule_revalidation
+
+
+def test_inline_revalidation_runs_once_per_debounce_window(monkeypatch):
+    monkeypatch.setattr(revalidation, "REVALIDATE_MODE", "inline")
+    monkeypatch.setattr(revalidation, "_scheduled", {})
+    runs = []
+
+    def run(cells, user_tier):
+        runs.append((cells, user_tier))
+
+    assert schedule_revalidation(["861126d37ffffff"], "free", run) == ["861126d37ffffff"]
+    assert schedule_revalidation(["861126d37ffffff", "861126d27ffffff"], "free", run) == ["861126d27ffffff"]
+    assert runs == [(["861126d37ffffff"], "free"), (["861126d27ffffff"], "free")]
+
+
+def test_failed_dispatch_can_be_retried(monkeypatch):
+    monkeypatch.setattr(revalidation, "REVALIDATE_MODE", "inline")
+    monkeypatch.setattr(revalidation, "_scheduled", {})
+
+    def failing(cells, user_tier):
+        raise RuntimeError("no capacity")
+
+    assert schedule_revalidation(["861126d37ffffff"], "free", failing) == []
+    assert schedule_revalidation(["861126d37ffffff"], "free", lambda cells, user_tier: None) == ["861126d37ffffff"]
+
+
+def test_grace_window_per_tier_and_off_switch(monkeypatch):
+    monkeypatch.setattr(revalidation, "REVALIDATE_MODE", "thread")
+    assert revalidation.grace_seconds("premium") < revalidation.grace_seconds("free")
+    monkeypatch.setattr(revalidation, "REVALIDATE_MODE", "off")
+    assert revalidation.grace_seconds("free") == 0
+
+
+def test_revalidation_event_is_not_an_api_request():
+    event = revalidation_event(["861126d37ffffff"], "premium")
+
+    assert is_revalidation_event(event)
+    assert event["revalidate"] == {"cells": ["861126d37ffffff"], "user_tier": "premium"}
+    assert not is_revalidation_event({"httpMethod": "GET", "queryStringParameters": {}})
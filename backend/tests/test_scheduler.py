@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import scheduler_function
+from cell_store import decode_sources
+import single_flight
+from single_flight import InMemoryLeaseStore
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.end = time.time() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.end - time.time()) * 1000)
+
+
+def test_batch_stops_before_the_deadline(monkeypatch):
+    def update(key, body=None):
+        time.sleep(0.2)
+        return {"key": key, "status": "updated", "seconds": 0.2}
+
+    monkeypatch.setattr(scheduler_function, "update_cell_news", update)
+    monkeypatch.setattr(scheduler_function, "_cell_seconds", 0.2)
+    keys = [f"cells/{i}.json" for i in range(40)]
+    context = FakeContext(scheduler_function.DEADLINE_HEADROOM_MS + 700)
+
+    start = time.time()
+    results = scheduler_function.process_batch(keys, context)
+
+    assert time.time() - start < 1.0
+    assert [result["key"] for result in results] == keys
+    statuses = {result["status"] for result in results}
+    assert statuses <= {"updated", "skipped"}
+    updated = sum(result["status"] == "updated" for result in results)
+    assert scheduler_function.CELL_PARALLELISM <= updated < len(keys)
+
+
+def test_batch_size_follows_remaining_time(monkeypatch):
+    monkeypatch.setattr(scheduler_function, "_cell_seconds", 2.0)
+    headroom = scheduler_function.DEADLINE_HEADROOM_MS
+
+    assert scheduler_function.plan_batch_size(FakeContext(headroom + 20500)) == scheduler_function.CELL_PARALLELISM * 10
+    assert scheduler_function.plan_batch_size(FakeContext(headroom)) == 1
+    assert scheduler_function.plan_batch_size(None) == scheduler_function.MAX_BATCH_SIZE
+
+
+def test_refresh_ahead_only_refreshes_sections_expiring_before_next_run(monkeypatch):
+    now = int(time.time())
+    ttl = scheduler_function.ttl_for_tier(scheduler_function.REFRESH_AHEAD_TIER)
+    fresh = ",".join(f"{name}:{now}" for name in scheduler_function.SOURCE_FETCHERS)
+    expiring = fresh.replace(f"uv:{now}", f"uv:{now - ttl + 60}")
+    version = scheduler_function.CURRENT_DATA_VERSION
+    hot_entries = {
+        "861126d37ffffff": {"version": version, "sources": fresh},
+        "861126d27ffffff": {"version": version, "sources": expiring},
+        "861126d07ffffff": {"version": version, "sources": expiring},
+    }
+    store = InMemoryLeaseStore()
+    monkeypatch.setattr(single_flight, "lease_store", store)
+    # Refreshed on demand by another invocation right now
+    store.acquire("861126d07ffffff.lock", "api", 60)
+    requested, written = [], {}
+
+    def read(key):
+        h3_cell = key.split("/")[1].split(".")[0]
+        return {"version": version, "sources": decode_sources(hot_entries[h3_cell]["sources"])}, None, 0
+
+    def refresh(requests, ttl, context):
+        requested.extend(requests)
+        return {ctx["h3_cell"]: (dict(record), ["uv"], {}) for ctx, record, _ in requests}
+
+    monkeypatch.setattr(scheduler_function, "read_cell_or_tile", read)
+    monkeypatch.setattr(scheduler_function, "refresh_cells", refresh)
+    monkeypatch.setattr(scheduler_function, "write_cell", lambda key, record, cache_control=None: written.setdefault(key, record))
+
+    refreshed = scheduler_function.refresh_ahead(hot_entries, FakeContext(60000))
+
+    assert refreshed == ["861126d27ffffff"]
+    assert [names for _, _, names in requested] == [["uv"]]
+    assert written["cells/861126d27ffffff.json"]["refreshed_ahead_at"] >= now
+    # The lease is released after the refresh
+    assert store.acquire("861126d27ffffff.lock", "api", 60) is not None
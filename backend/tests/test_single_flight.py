@@ -0,0 +1,121 @@
+import io
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import single_flight
+from single_flight import InMemoryLeaseStore, wait_for_refresh
+
+
+def test_only_one_holder_until_release():
+    store = InMemoryLeaseStore()
+    token = store.acquire("861126d37ffffff.lock", "a", 15)
+
+    assert token is not None
+    assert store.acquire("861126d37ffffff.lock", "b", 15) is None
+
+    store.release("861126d37ffffff.lock", token)
+    assert store.acquire("861126d37ffffff.lock", "b", 15) is not None
+
+
+def test_expired_lease_can_be_taken_over():
+    store = InMemoryLeaseStore()
+    stale_token = store.acquire("861126d37ffffff.lock", "a", -1)
+    token = store.acquire("861126d37ffffff.lock", "b", 15)
+
+    assert token is not None
+    # The original holder releasing late must not drop the new lease
+    store.release("861126d37ffffff.lock", stale_token)
+    assert store.acquire("861126d37ffffff.lock", "c", 15) is None
+
+
+def test_wait_for_refresh_returns_new_record_or_times_out(monkeypatch):
+    monkeypatch.setattr(single_flight, "POLL_INTERVAL_SECONDS", 0.01)
+    attempts = []
+
+    def refreshed():
+        attempts.append(1)
+        return {"last_updated": 2} if len(attempts) >= 3 else None
+
+    assert wait_for_refresh(refreshed, timeout=1) == {"last_updated": 2}
+    assert wait_for_refresh(lambda: None, timeout=0.05) is None
+
+
+class Conflict(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}, "ResponseMetadata": {"HTTPStatusCode": 412}}
+
+
+class NoSuchKey(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}, "ResponseMetadata": {"HTTPStatusCode": 404}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects, self.version, self.puts = {}, 0, 0
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, IfMatch=None):
+        self.puts += 1
+        if (IfNoneMatch and Key in self.objects) or (IfMatch and self.objects.get(Key, (None,))[0] != IfMatch):
+            raise Conflict()
+        self.version += 1
+        self.objects[Key] = (f'"{self.version}"', Body)
+        return {"ETag": f'"{self.version}"'}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NoSuchKey()
+        etag, body = self.objects[Key]
+        return {"ETag": etag, "Body": io.BytesIO(body.encode("utf-8"))}
+
+    def delete_object(self, Bucket, Key, IfMatch=None):
+        if IfMatch and Key in self.objects and self.objects[Key][0] != IfMatch:
+            raise Conflict()
+        self.objects.pop(Key, None)
+
+
+def test_s3_lease_is_deleted_on_release_unless_taken_over():
+    client = FakeS3()
+    store = single_flight.S3LeaseStore(client=client, bucket="test")
+    token = store.acquire("861126d37ffffff.lock", "a", 15)
+    store.release("861126d37ffffff.lock", token)
+    assert client.objects == {}
+
+    stale_token = store.acquire("861126d37ffffff.lock", "a", -1)
+    token = store.acquire("861126d37ffffff.lock", "b", 15)
+    # A late release of the expired lease leaves the new holder's lease in place
+    store.release("861126d37ffffff.lock", stale_token)
+    assert client.objects["leases/861126d37ffffff.lock"][0] == token
+
+
+def test_s3_lease_released_before_read_is_created_again():
+    class ReleasedBeforeRead(FakeS3):
+        def get_object(self, Bucket, Key):
+            # The holder releases between our conflicting create and this read
+            self.objects.pop(Key, None)
+            return super().get_object(Bucket, Key)
+
+    client = ReleasedBeforeRead()
+    store = single_flight.S3LeaseStore(client=client, bucket="test")
+    client.objects["leases/861126d37ffffff.lock"] = ('"0"', "{}")
+
+    token = store.acquire("861126d37ffffff.lock", "a", 15)
+    assert token is not None and token != "unleased"
+    assert client.objects["leases/861126d37ffffff.lock"][0] == token
+
+
+def test_s3_lease_that_keeps_changing_hands_is_left_alone():
+    class Churning(FakeS3):
+        def put_object(self, Bucket, Key, Body, IfNoneMatch=None, IfMatch=None):
+            # Another holder recreates the lease before every one of our writes
+            self.objects[Key] = ('"0"', "{}")
+            return super().put_object(Bucket, Key, Body, IfNoneMatch, IfMatch)
+
+        def get_object(self, Bucket, Key):
+            self.objects.pop(Key, None)
+            return super().get_object(Bucket, Key)
+
+    client = Churning()
+    store = single_flight.S3LeaseStore(client=client, bucket="test")
+
+    assert store.acquire("861126d37ffffff.lock", "a", 15) is None
+    assert client.puts == single_flight.LEASE_ACQUIRE_ATTEMPTS
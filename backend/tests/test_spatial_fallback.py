@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import h3
+from spatial_fallback import derive_sections, neighbor_cells
+
+CENTER = h3.latlng_to_cell(60.17, 24.93, 6)
+
+
+def record(sections, fetched_at=None):
+    fetched_at = fetched_at or int(time.time())
+    return {
+        "data": sections,
+        "sources": {name: {"fetched_at": fetched_at} for name in sections}
+    }
+
+
+def test_idw_and_provenance():
+    a, b = neighbor_cells(CENTER)[:2]
+    neighbors = {
+        a: record({"air_quality": {"source": "openweathermap", "aqi": 2, "pm2_5": 4.0}}),
+        b: record({"air_quality": {"source": "openweathermap", "aqi": 3, "pm2_5": 8.0}})
+    }
+    derived = derive_sections(CENTER, ["air_quality", "uv"], neighbors, lambda name: 3600)
+
+    result, _ = derived["air_quality"]
+    assert 4.0 <= result["pm2_5"] <= 8.0
+    assert result["aqi"] in (2, 3)
+    assert result["derived_from"]["method"] == "idw"
+    assert set(result["derived_from"]["cells"]) == {a, b}
+    # UV is local and never derived
+    assert "uv" not in derived
+
+
+def test_disagreeing_stale_or_derived_neighbors_are_not_used():
+    a, b, c = neighbor_cells(CENTER)[:3]
+    neighbors = {
+        a: record({"tap_water": {"country": "Finland", "is_safe": True}}),
+        b: record({"tap_water": {"country": "Russia", "is_safe": False}}),
+        c: record({"pollen": {"birch": 10.0}}, fetched_at=int(time.time()) - 7200)
+    }
+    neighbors[a]["data"]["pollen"] = {"birch": 5.0, "derived_from": {"method": "nearest", "cells": [c]}}
+    neighbors[a]["sources"]["pollen"] = {"fetched_at": int(time.time())}
+
+    assert derive_sections(CENTER, ["tap_water", "pollen"], neighbors, lambda name: 3600) == {}
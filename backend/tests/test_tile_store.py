@@ -0,0 +1,108 @@
+import io
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'lambda')))
+
+import h3
+from tile_store import HEADER, TILE_RESOLUTION, pack_tile, tile_of, unpack_tile, _parse_index
+
+
+def test_pack_roundtrip_with_byte_ranges():
+    center = h3.latlng_to_cell(60.17, 24.93, 6)
+    records = {
+        cell: {"h3_cell": cell, "last_updated": 1746720000, "version": 3,
+               "sources": {"uv": {"fetched_at": 1746720000}}}
+        for cell in h3.grid_disk(center, 1)
+    }
+    blob = pack_tile(records)
+
+    assert unpack_tile(blob) == records
+    # Each index entry addresses exactly one record for ranged reads
+    index, data_offset = _parse_index(blob)
+    offset, length, last_updated, version, sources = index[center]
+    assert blob[data_offset + offset:data_offset + offset + length].startswith(b'{"h3_cell": "' + center.encode())
+    assert (last_updated, version, sources) == (1746720000, 3, "uv:1746720000")
+    assert data_offset == HEADER.size + len(blob[HEADER.size:data_offset])
+
+
+def test_tile_is_the_coarser_parent():
+    cell = h3.latlng_to_cell(60.17, 24.93, 6)
+    assert h3.get_resolution(tile_of(cell)) == TILE_RESOLUTION
+    assert cell in h3.cell_to_children(tile_of(cell), 6)
+
+
+def test_tile_bodies_use_the_codec_in_the_header():
+    cell = h3.latlng_to_cell(60.17, 24.93, 6)
+    records = {cell: {"h3_cell": cell, "data": {"uv": {"uv_index": 2.4}}}}
+    blob = pack_tile(records, codec="gzip-json")
+
+    assert HEADER.unpack_from(blob, 0)[2] == 1
+    assert unpack_tile(blob) == records
+
+
+def test_cached_index_is_revalidated_after_its_ttl(monkeypatch):
+    import tile_store
+
+    cell = h3.latlng_to_cell(60.17, 24.93, 6)
+    tile = tile_of(cell)
+
+    class Client:
+        def __init__(self):
+            self.blob, self.etag, self.gets = pack_tile({cell: {"h3_cell": cell, "last_updated": 1}}), '"v1"', []
+
+        def get_object(self, Bucket, Key, Range, IfNoneMatch=None, **kwargs):
+            self.gets.append(IfNoneMatch)
+            if IfNoneMatch == self.etag:
+                error = Exception("Not Modified")
+                error.response = {"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}
+                raise error
+            start, end = (int(part) for part in Range[len("bytes="):].split("-"))
+            return {"Body": io.BytesIO(self.blob[start:end + 1]), "ETag": self.etag}
+
+    client = Client()
+    now = [1000.0]
+    monkeypatch.setattr(tile_store, "s3_client", lambda: client)
+    monkeypatch.setattr(tile_store.time, "time", lambda: now[0])
+    monkeypatch.setattr(tile_store, "_indexes", {})
+
+    assert tile_store.tile_entry(cell)["last_updated"] == 1
+    now[0] += tile_store.TILE_INDEX_TTL_SECONDS - 1
+    assert tile_store.tile_entry(cell)["last_updated"] == 1
+    assert client.gets == [None]
+
+    # Unchanged tile: a 304 keeps the cached index
+    now[0] += 2
+    assert tile_store.tile_entry(cell)["last_updated"] == 1
+    assert client.gets == [None, '"v1"']
+
+    # Recompacted tile: the new index replaces the cached one
+    client.blob, client.etag = pack_tile({cell: {"h3_cell": cell, "last_updated": 2}}), '"v2"'
+    now[0] += tile_store.TILE_INDEX_TTL_SECONDS
+    assert tile_store.tile_entry(cell)["last_updated"] == 2
+
+
+def test_tile_records_whether_packed_cells_were_deleted(monkeypatch):
+    import tile_store
+
+    cell = h3.latlng_to_cell(60.17, 24.93, 6)
+    objects = {}
+
+    class Client:
+        def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+            objects[Key] = (Body, Metadata)
+            return {"ETag": '"v1"'}
+
+        def get_object(self, Bucket, Key, Range, **kwargs):
+            body, metadata = objects[Key]
+            start, end = (int(part) for part in Range[len("bytes="):].split("-"))
+            return {"Body": io.BytesIO(body[start:end + 1]), "ETag": '"v1"', "Metadata": metadata}
+
+    monkeypatch.setattr(tile_store, "s3_client", lambda: Client())
+    monkeypatch.setattr(tile_store, "_indexes", {})
+
+    tile_store.write_tile(tile_of(cell), {cell: {"h3_cell": cell}}, cells_deleted=True)
+    assert tile_store.packed_cells_deleted(tile_of(cell))
+    assert tile_store.load_tile_index(tile_of(cell))[4]["packed_at"] is not None
+
+    tile_store.write_tile(tile_of(cell), {cell: {"h3_cell": cell}})
+    assert not tile_store.packed_cells_deleted(tile_of(cell))